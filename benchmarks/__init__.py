@@ -0,0 +1,5 @@
+import os
+
+# offline benchmarks never reach the BSE API; settings.py only needs these to parse
+os.environ.setdefault("BSE_INDIRA_API_PARAMS_Live", "{}")
+os.environ.setdefault("BSE_INDIRA_API_PARAMS_Hist", "{}")
@@ -0,0 +1,91 @@
+"""
+Legacy per-rule categorization (loop + pandas str.contains) vs the compiled CategoryEngine.
+    python -m benchmarks.bench_categorizer
+"""
+import re
+import time
+import pandas as pd
+from config.constants import CATEGORY_MAP
+from utils.category_engine import CategoryEngine
+from benchmarks import synthetic
+
+
+def legacy_loop(records):
+    rules = {
+        cat: (re.compile(r["HeadLine"], re.I) if r.get("HeadLine") else None, re.compile(r["NewsBody"], re.I) if r.get("NewsBody") else None)
+        for cat, r in CATEGORY_MAP.items()
+    }
+    out = []
+    for rec in records:
+        desc = str(rec.get("Descriptor", "")).strip()
+        head = str(rec.get("HeadLine", "")).lower()
+        body = str(rec.get("NewsBody", "")).lower()
+        if desc in CATEGORY_MAP:
+            out.append(desc)
+            continue
+        out.append(next((cat for cat, (h, b) in rules.items() if (h and h.search(head)) or (b and b.search(body))), "General"))
+    return out
+
+
+def legacy_pandas(df):
+    df = df.copy()
+    df["HeadLine"] = df["HeadLine"].astype(str).str.lower().str.strip()
+    df["NewsBody"] = df["NewsBody"].fillna("").astype(str).str.lower().str.strip()
+    df["Descriptor"] = df["Descriptor"].astype(str).str.strip()
+    df["category"] = None
+    df.loc[df["Descriptor"].isin(CATEGORY_MAP.keys()), "category"] = df["Descriptor"]
+    for cat, rule in CATEGORY_MAP.items():
+        mask = df["category"].isna()
+        conds = []
+        if rule.get("HeadLine"):
+            conds.append(df["HeadLine"].str.contains(rule["HeadLine"], case=False, na=False))
+        if rule.get("NewsBody"):
+            conds.append(df["NewsBody"].str.contains(rule["NewsBody"], case=False, na=False))
+        if not conds:
+            continue
+        combined = conds[0]
+        for c in conds[1:]:
+            combined |= c
+        df.loc[mask & combined, "category"] = cat
+    return df["category"].fillna("General").tolist()
+
+
+def timed(fn, *args, repeat=3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def run(sizes=(1_000, 10_000, 100_000)) -> list:
+    rows = []
+    for n in sizes:
+        records = synthetic.announcements(n)
+        df = pd.DataFrame(records)
+        heads, bodies, descs = df["HeadLine"].tolist(), df["NewsBody"].tolist(), df["Descriptor"].tolist()
+
+        t_loop, cats_loop = timed(legacy_loop, records)
+        t_pandas, cats_pandas = timed(legacy_pandas, df)
+        # a fresh engine per repeat: memo starts cold, compile time included
+        t_one, cats_one = timed(lambda: [e.categorize(d, h, b) for e in [CategoryEngine(CATEGORY_MAP)] for d, h, b in zip(descs, heads, bodies)])
+        t_many, cats_many = timed(lambda: CategoryEngine(CATEGORY_MAP).categorize_many(descs, heads, bodies))
+
+        assert cats_loop == cats_pandas == cats_one == cats_many, "category mismatch between implementations"
+        rows.append({
+            "n": n,
+            "legacy_loop_s": t_loop,
+            "legacy_pandas_s": t_pandas,
+            "engine_per_record_s": t_one,
+            "engine_batch_s": t_many,
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    for row in run():
+        print(
+            f"n={row['n']:>7} | legacy loop {row['legacy_loop_s']*1000:8.1f} ms | legacy pandas {row['legacy_pandas_s']*1000:8.1f} ms"
+            f" | engine/record {row['engine_per_record_s']*1000:8.1f} ms | engine batch {row['engine_batch_s']*1000:8.1f} ms"
+        )
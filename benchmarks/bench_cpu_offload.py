@@ -0,0 +1,79 @@
+"""
+Pandas categorization through CpuOffloader: records/sec and worst event-loop stall per mode and worker count.
+    python -m benchmarks.bench_cpu_offload [n]
+Process mode scales with cores; thread mode mainly keeps the loop responsive (pandas/regex hold the GIL).
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+from config.constants import CATEGORY_MAP
+from core.company_master import CompanyMasterCache
+from core.cpu_offload import CpuOffloader
+from utils.categorize_with_filter import FilterCategorize, engine_for
+from benchmarks import synthetic
+
+
+def make_categorizer(codes, offloader):
+    master = CompanyMasterCache(snapshot_path=os.devnull, refresh_mode="off")
+    master._replace([{"_id": code, "bsecode": code, "isin": f"INE{code}", "nsesymbol": f"SYM{code}"} for code in codes], source="bench")
+    categorizer = FilterCategorize.__new__(FilterCategorize)  # no Mongo needed for categorization
+    categorizer.logger = logging.getLogger("bench_cpu_offload")
+    categorizer.company_master = master
+    categorizer.category_map = CATEGORY_MAP
+    categorizer.engine = engine_for(CATEGORY_MAP)
+    categorizer.offloader = offloader
+    return categorizer
+
+
+async def timed_run(categorizer, docs):
+    """Wall time of helper_pandas and the longest gap a 10 ms ticker saw meanwhile."""
+    stall, done = 0.0, asyncio.Event()
+
+    async def ticker():
+        nonlocal stall
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.01)
+            stall = max(stall, time.perf_counter() - t0 - 0.01)
+
+    tick = asyncio.create_task(ticker())
+    t0 = time.perf_counter()
+    records = await categorizer.helper_pandas(docs)
+    elapsed = time.perf_counter() - t0
+    done.set()
+    await tick
+    return elapsed, stall, records
+
+
+def run(n=100_000, worker_counts=None, chunk_size=5000) -> list:
+    cpus = os.cpu_count() or 1
+    worker_counts = worker_counts or sorted({1, 2, cpus})
+    codes = synthetic.company_codes()
+    docs = synthetic.announcements(n, codes)
+    configs = [("off", 1)] + [(mode, w) for mode in ("thread", "process") for w in worker_counts]
+
+    rows, baseline = [], None
+    for mode, workers in configs:
+        offloader = CpuOffloader(mode=mode, workers=workers, chunk_size=chunk_size)
+        categorizer = make_categorizer(codes, offloader)
+        try:
+            asyncio.run(timed_run(categorizer, docs[: chunk_size * workers]))  # warm-up: pool start, worker imports
+            elapsed, stall, records = asyncio.run(timed_run(categorizer, docs))
+        finally:
+            offloader.shutdown()
+        ids = [(r["news_id"], r["category"], r["Tradedate"]) for r in records]
+        baseline = baseline if baseline is not None else ids
+        assert ids == baseline, f"{mode}/{workers}: output differs from the inline run"
+        rows.append({"mode": mode, "workers": workers, "n": n, "seconds": elapsed,
+                     "records_per_sec": n / elapsed, "max_loop_stall_ms": stall * 1000})
+    return rows
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"cpus={os.cpu_count()} n={n}")
+    for row in run(n):
+        print(f"{row['mode']:>7} x{row['workers']:<2} | {row['seconds']*1000:8.1f} ms | {row['records_per_sec']:9.0f} rec/s"
+              f" | max loop stall {row['max_loop_stall_ms']:8.1f} ms")
@@ -0,0 +1,46 @@
+"""
+helper_forloop vs helper_pandas per batch size, to set LEN_PANDAS_MIN_DOCS from data.
+    python -m benchmarks.bench_crossover
+"""
+import asyncio
+import copy
+import time
+from config.constants import LEN_PANDAS_MIN_DOCS
+from core.cpu_offload import CpuOffloader
+from benchmarks import synthetic
+from benchmarks.bench_cpu_offload import make_categorizer
+
+SIZES = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1_000, 5_000)
+
+
+def best_of(fn, batches):
+    """Best wall time over the prepared batches (each batch is consumed once; forloop mutates records)."""
+    best = float("inf")
+    for batch in batches:
+        t0 = time.perf_counter()
+        asyncio.run(fn(batch))
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(sizes=SIZES, repeat=5) -> dict:
+    codes = synthetic.company_codes()
+    categorizer = make_categorizer(codes, CpuOffloader(mode="off"))  # pure CPU cost, no executor hop
+    rows = []
+    for n in sizes:
+        docs = synthetic.announcements(n, codes, seed=n)
+        t_loop = best_of(categorizer.helper_forloop, [copy.deepcopy(docs) for _ in range(repeat)])
+        t_pandas = best_of(categorizer.helper_pandas, [copy.deepcopy(docs) for _ in range(repeat)])
+        rows.append({"n": n, "forloop_s": t_loop, "pandas_s": t_pandas, "pandas_faster": t_pandas < t_loop})
+
+    # smallest size from which pandas wins at every larger measured size
+    crossover = next((r["n"] for i, r in enumerate(rows) if all(x["pandas_faster"] for x in rows[i:])), None)
+    return {"rows": rows, "suggested_len_pandas_min_docs": crossover, "current_len_pandas_min_docs": LEN_PANDAS_MIN_DOCS}
+
+
+if __name__ == "__main__":
+    result = run()
+    for row in result["rows"]:
+        print(f"n={row['n']:>6} | forloop {row['forloop_s']*1000:9.2f} ms | pandas {row['pandas_s']*1000:9.2f} ms"
+              f" | {'pandas' if row['pandas_faster'] else 'forloop'}")
+    print(f"suggested LEN_PANDAS_MIN_DOCS={result['suggested_len_pandas_min_docs']} (current {result['current_len_pandas_min_docs']})")
@@ -0,0 +1,95 @@
+"""
+Tradedate parsing: legacy strptime loop / pd.to_datetime(dayfirst) vs utils.date_parser.
+    python -m benchmarks.bench_date_parser
+"""
+import time
+from datetime import datetime
+import pandas as pd
+from utils import date_parser
+from utils.date_parser import normalize_tradedate, normalize_tradedate_series, parse_datetime
+from benchmarks import synthetic
+
+
+def legacy_loop(values):
+    out = []
+    for v in values:
+        try:
+            out.append(datetime.strptime(v, "%d/%m/%Y %H:%M:%S").strftime("%Y-%m-%d %H:%M:%S"))
+        except Exception:
+            out.append(None)
+    return out
+
+
+def legacy_pandas(series):
+    parsed = pd.to_datetime(series, errors="coerce", dayfirst=True)
+    return parsed.dt.strftime("%Y-%m-%d %H:%M:%S").tolist()
+
+
+def legacy_normalize_datetime(values):
+    out = []
+    for v in values:
+        for fmt in date_parser.KNOWN_FORMATS:
+            try:
+                out.append(datetime.strptime(str(v), fmt))
+                break
+            except ValueError:
+                continue
+        else:
+            out.append(None)
+    return out
+
+
+def cold(fn):
+    """Time with the parse memo emptied first, so caching only helps within the run."""
+    def wrapped(*args):
+        normalize_tradedate.cache_clear()
+        date_parser._parse_string.cache_clear()
+        return fn(*args)
+    return wrapped
+
+
+def timed(fn, *args, repeat=3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def run(sizes=(10_000, 100_000, 1_000_000)) -> list:
+    rows = []
+    for n in sizes:
+        values = synthetic.tradedates(n)
+        series = pd.Series(values, dtype=object)
+        iso = synthetic.tradedates(n, fmt="%Y-%m-%dT%H:%M:%S")
+
+        t_loop, out_loop = timed(legacy_loop, values)
+        t_pandas, out_pandas = timed(legacy_pandas, series)
+        t_new_loop, out_new_loop = timed(cold(lambda v: [normalize_tradedate(x) for x in v]), values)
+        t_new_series, out_new_series = timed(cold(lambda s: normalize_tradedate_series(s).tolist()), series)
+        # worst case for the format list: the last known format
+        t_multi, out_multi = timed(legacy_normalize_datetime, iso, repeat=1)
+        t_parse, out_parse = timed(cold(lambda v: [parse_datetime(x) for x in v]), iso, repeat=1)
+
+        assert out_loop == out_pandas == out_new_loop == out_new_series, "Tradedate mismatch between implementations"
+        assert out_multi == out_parse, "parse_datetime mismatch"
+        rows.append({
+            "n": n,
+            "legacy_loop_s": t_loop,
+            "legacy_pandas_s": t_pandas,
+            "normalize_tradedate_s": t_new_loop,
+            "normalize_tradedate_series_s": t_new_series,
+            "legacy_normalize_datetime_s": t_multi,
+            "parse_datetime_s": t_parse,
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    for row in run():
+        print(
+            f"n={row['n']:>8} | loop {row['legacy_loop_s']*1000:8.1f} -> {row['normalize_tradedate_s']*1000:7.1f} ms"
+            f" | pandas {row['legacy_pandas_s']*1000:8.1f} -> {row['normalize_tradedate_series_s']*1000:7.1f} ms"
+            f" | multi-format {row['legacy_normalize_datetime_s']*1000:8.1f} -> {row['parse_datetime_s']*1000:7.1f} ms"
+        )
@@ -0,0 +1,77 @@
+"""
+Regression + timing: row-wise/groupby-loop format_category_docs vs the vectorized version.
+    python -m benchmarks.bench_format_category_docs
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+import pandas as pd
+from benchmarks import synthetic
+from utils.reports_divider import ReportsDivider
+from core.cpu_offload import CpuOffloader
+
+
+def legacy_format_category_docs(df, category, short_cat, existing_report_id_mapping):
+    df = df.sort_values(by="Tradedate", ascending=True)
+    df["dt_obj"] = pd.to_datetime(df["Tradedate"], errors="coerce")
+    df["month"] = df["dt_obj"].dt.month
+    df["year"] = df["dt_obj"].dt.year
+    df["Qtr"] = pd.cut(df["month"], bins=[0, 3, 6, 9, 12], labels=["Q3", "Q4", "Q1", "Q2"], include_lowest=True)
+    df["FinYear"] = df.apply(lambda x: x["year"] - 1 if x["Qtr"] in ["Q3", "Q4"] else x["year"], axis=1)
+    df["base_report_id"] = (df["company"] + "_" + short_cat + "_FY" + df["year"].astype(str) + df["Qtr"].astype(str))
+    final_rows = []
+    for base_id, group in df.groupby("base_report_id", sort=False):
+        start_count = existing_report_id_mapping.get(base_id, 0)
+        group = group.sort_values(by="dt_obj", ascending=True).reset_index(drop=True)
+        group["count"] = range(start_count + 1, start_count + 1 + len(group))
+        group["report_id"] = group["base_report_id"] + "_" + group["count"].astype(str)
+        final_rows.append(group)
+    df = pd.concat(final_rows, ignore_index=True)
+    df["datecode"] = df["dt_obj"].dt.strftime("%Y%m%d")
+    structured_df = pd.DataFrame({
+        "company": df["company"], "symbolmap": df.get("symbolmap"), "news_id": df.get("news_id"),
+        "datecode": df["datecode"], "Year": df["FinYear"], "Qtr": df["Qtr"], "dt_tm": df["Tradedate"],
+        "url": df.get("ATTACHMENTURL"), "report_id": df["report_id"], "report_type": category,
+        "report_line": df.get("NewsBody"), "count": df["count"],
+        "document_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    })
+    return structured_df.to_dict(orient="records")
+
+
+def _comparable(records):
+    return [{k: (str(v) if k == "Qtr" else v) for k, v in r.items() if k != "document_date"} for r in records]
+
+
+def make_divider():
+    divider = ReportsDivider.__new__(ReportsDivider)  # no Mongo needed for formatting
+    divider.logger = logging.getLogger("bench_format_category_docs")
+    divider.offloader = CpuOffloader(mode="off")
+    return divider
+
+
+def run(sizes=(1_000, 10_000, 50_000), repeat=3) -> list:
+    divider = make_divider()
+    rows = []
+    for n in sizes:
+        df = pd.DataFrame(synthetic.categorized_docs(n))
+        existing = {f"{c}_IP_FY2024Q1": 3 for c in df["company"].unique()[:20]}
+
+        best_legacy = best_new = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            legacy = legacy_format_category_docs(df.copy(), "Investor Presentation", "IP", existing)
+            best_legacy = min(best_legacy, time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            new = asyncio.run(divider.format_category_docs(df.copy(), "Investor Presentation", "IP", existing))
+            best_new = min(best_new, time.perf_counter() - t0)
+
+        assert _comparable(legacy) == _comparable(new), f"output mismatch at n={n}"
+        rows.append({"n": n, "legacy_s": best_legacy, "vectorized_s": best_new})
+    return rows
+
+
+if __name__ == "__main__":
+    for row in run():
+        print(f"n={row['n']:>6} | legacy {row['legacy_s']*1000:9.1f} ms | vectorized {row['vectorized_s']*1000:8.1f} ms"
+              f" | x{row['legacy_s'] / row['vectorized_s']:.1f}")
@@ -0,0 +1,56 @@
+"""
+ReportsDivider.insert_in_batches against the in-memory Mongo stand-in: insert vs upsert mode,
+with per-call latency and a share of already-stored news_ids.
+    python -m benchmarks.bench_insert_in_batches
+"""
+import asyncio
+import logging
+import time
+from core.news_id_cache import NewsIdCache
+from utils.batch_writer import MongoBatchWriter
+from utils.reports_divider import ReportsDivider
+from benchmarks import synthetic
+from benchmarks.fake_mongo import FakeCollection
+
+
+def make_divider(collection, write_mode="insert", batch_size=1000, max_in_flight=4):
+    divider = ReportsDivider.__new__(ReportsDivider)  # Mongo replaced by FakeCollection
+    divider.logger = logging.getLogger("bench_insert_in_batches")
+    divider.logger.setLevel(logging.WARNING)
+    divider.write_mode = write_mode
+    divider.writer = MongoBatchWriter(divider.logger, batch_size=batch_size, max_in_flight=max_in_flight)
+    divider.news_id_cache = NewsIdCache()
+    divider.collection_all_ann = collection
+    divider.upsert_keys = {collection.name: "news_id"}
+    return divider
+
+
+async def insert_once(n, mode, latency_sec, dup_ratio, max_in_flight):
+    collection = FakeCollection("AllAnnouncements", latency_sec=latency_sec)
+    divider = make_divider(collection, write_mode=mode, max_in_flight=max_in_flight)
+    docs = synthetic.categorized_docs(n, seed=n)
+    preloaded = int(n * dup_ratio)
+    if preloaded:
+        await collection.insert_many([dict(d) for d in docs[:preloaded]])
+    t0 = time.perf_counter()
+    ok = await divider.insert_in_batches(collection, [dict(d) for d in docs])
+    elapsed = time.perf_counter() - t0
+    assert ok and len(collection.docs) == n, f"expected {n} stored docs, found {len(collection.docs)}"
+    return elapsed
+
+
+def run(sizes=(10_000, 50_000), modes=("insert", "upsert"), latency_sec=0.02, dup_ratio=0.1, in_flight=(1, 4)) -> list:
+    rows = []
+    for n in sizes:
+        for mode in modes:
+            for max_in_flight in in_flight:
+                elapsed = asyncio.run(insert_once(n, mode, latency_sec, dup_ratio, max_in_flight))
+                rows.append({"n": n, "mode": mode, "max_in_flight": max_in_flight, "latency_ms": latency_sec * 1000,
+                             "dup_ratio": dup_ratio, "seconds": elapsed, "docs_per_sec": n / elapsed})
+    return rows
+
+
+if __name__ == "__main__":
+    for row in run():
+        print(f"n={row['n']:>6} | {row['mode']:>6} | in-flight {row['max_in_flight']} | {row['seconds']*1000:8.1f} ms"
+              f" | {row['docs_per_sec']:9.0f} docs/s")
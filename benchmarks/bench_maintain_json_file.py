@@ -0,0 +1,59 @@
+"""
+BSEAnnouncementPipeline.maintain_json_file: first append of a batch, then a re-append with
+half the records already archived (the digest index filters them out). The call itself only
+queues the batch, so the time until the day-partitioned archive has drained is reported as well.
+    python -m benchmarks.bench_maintain_json_file
+"""
+import asyncio
+import logging
+import tempfile
+import time
+from core.bse_pipeline import BSEAnnouncementPipeline
+from benchmarks import synthetic
+
+
+def make_pipeline(archive_dir):
+    pipeline = BSEAnnouncementPipeline.__new__(BSEAnnouncementPipeline)  # no API client / Mongo needed
+    pipeline.logger = logging.getLogger("bench_maintain_json_file")
+    pipeline.logger.setLevel(logging.WARNING)
+    pipeline.archive_dir = archive_dir
+    pipeline._archives = {}
+    return pipeline
+
+
+async def archive_twice(n, archive_dir):
+    pipeline = make_pipeline(archive_dir)
+    docs = synthetic.categorized_docs(n, seed=n)
+    first, second = docs[: n // 2], docs  # second batch repeats the first half
+    t0 = time.perf_counter()
+    await pipeline.maintain_json_file(first, data_type="filter", fetch_type="hist")
+    t_first = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    await pipeline.maintain_json_file(second, data_type="filter", fetch_type="hist")
+    t_second = time.perf_counter() - t0
+    archive = pipeline._archives["categorized_announcements_hist"]
+    await asyncio.to_thread(archive.close)
+    t_drained = time.perf_counter() - t0 + t_first
+
+    lines = sum(1 for day in archive.partitions() for _ in archive.iter_partition(day))
+    assert lines == n, f"expected {n} archived lines, found {lines}"
+    manifests = [archive.read_manifest(day) for day in archive.partitions()]
+    ratio = sum(m["raw_bytes"] for m in manifests) / max(sum(m["bytes"] for m in manifests), 1)
+    return t_first, t_second, t_drained, ratio
+
+
+def run(sizes=(1_000, 10_000, 50_000)) -> list:
+    rows = []
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            t_first, t_second, t_drained, ratio = asyncio.run(archive_twice(n, tmp))
+        rows.append({"n": n, "first_append_s": t_first, "half_duplicate_append_s": t_second, "drained_s": t_drained,
+                     "docs_per_sec": n / t_drained, "compression_ratio": ratio})
+    return rows
+
+
+if __name__ == "__main__":
+    for row in run():
+        print(f"n={row['n']:>6} | first half {row['first_append_s']*1000:8.1f} ms | full batch (half dup)"
+              f" {row['half_duplicate_append_s']*1000:8.1f} ms | drained {row['drained_s']*1000:8.1f} ms"
+              f" | {row['docs_per_sec']:9.0f} docs/s | x{row['compression_ratio']:.1f} smaller")
@@ -0,0 +1,75 @@
+"""
+main.py --replay path: archived raw announcements → FilterCategorize → ReportsDivider (upsert) with no API,
+against the in-memory Mongo stand-in. Runs the same archive twice; the second pass must upsert in place.
+    python -m benchmarks.bench_replay [n]
+"""
+import asyncio
+import sys
+import tempfile
+import time
+from datetime import datetime
+from core.replay import ArchiveReplay
+from utils.jsonl_archive import DayPartitionedArchive
+from benchmarks import synthetic
+from benchmarks.load_test import build_pipeline, install_company_master
+
+
+class ShadowDb(dict):
+    """db_async stand-in: db[name] -> FakeCollection, created on first use."""
+
+    def __init__(self, latency_sec: float = 0.0):
+        super().__init__()
+        self.latency_sec = latency_sec
+
+    def __missing__(self, name):
+        from benchmarks.fake_mongo import FakeCollection
+        unique = ("news_id", "report_id") if name.startswith("AllReports") else ("news_id",)
+        self[name] = FakeCollection(name, unique_keys=unique, latency_sec=self.latency_sec)
+        return self[name]
+
+
+async def replay_twice(n, archive_dir, days=30, mongo_latency_ms=0.0, shadow_suffix=None, batch_size=5000):
+    codes = synthetic.company_codes()
+    install_company_master(codes)
+    start = datetime(2024, 4, 1)
+    archive = DayPartitionedArchive(archive_dir, "hist_announcements")
+    archive.submit(synthetic.announcements(n, codes, start=start, days=days))
+    await asyncio.to_thread(archive.close)
+
+    pipeline, collections = build_pipeline("http://127.0.0.1:9/", mongo_latency_sec=mongo_latency_ms / 1000)
+    if shadow_suffix:
+        pipeline.divider.db_async = ShadowDb(mongo_latency_ms / 1000)
+    try:
+        await pipeline.startup()
+        replay = ArchiveReplay(pipeline, batch_size=batch_size, shadow_suffix=shadow_suffix, archive_dir=archive_dir)
+        source = (start, datetime(2024, 4, days))
+        t0 = time.perf_counter()
+        first = await replay.run(source)
+        t_first = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        second = await replay.run(source)
+        t_second = time.perf_counter() - t0
+    finally:
+        await pipeline.close()
+
+    stored = pipeline.divider.collection_all_ann
+    assert first["records"] == second["records"] == n, (first, second)
+    assert len(stored.docs) == first["categorized"] == second["categorized"], "second pass must upsert in place"
+    return t_first, t_second, first
+
+
+def run(sizes=(10_000, 50_000), mongo_latency_ms=2.0) -> list:
+    rows = []
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            t_first, t_second, stats = asyncio.run(replay_twice(n, tmp, mongo_latency_ms=mongo_latency_ms))
+        rows.append({"n": n, "latency_ms": mongo_latency_ms, "first_pass_s": t_first, "second_pass_s": t_second,
+                     "categorized": stats["categorized"], "records_per_sec": n / t_first})
+    return rows
+
+
+if __name__ == "__main__":
+    sizes = tuple(int(a) for a in sys.argv[1:]) or (10_000, 50_000)
+    for row in run(sizes):
+        print(f"n={row['n']:>6} | first pass {row['first_pass_s']:6.2f}s | re-run (upserts) {row['second_pass_s']:6.2f}s"
+              f" | {row['records_per_sec']:8.0f} rec/s | {row['categorized']} categorized")
@@ -0,0 +1,211 @@
+"""
+Local stand-in for the BSE "Indira" announcements API: same POST contract as BSE_INDIRA_API_URL
+(tradedt / hr / min / sec payload, list of records or {"Error_Msg": "No Record found"}),
+with synthetic per-day volume, lognormal latency, and injected timeouts and 5xx answers.
+    python -m benchmarks.bse_stub_server [--port 8089] [--records-per-day 2000] [--error-rate 0.05] ...
+Point the client at it with BSECorpAnnouncementClient(api_url=...) or BSE_INDIRA_API_URL=http://127.0.0.1:8089/.
+"""
+import argparse
+import asyncio
+import math
+import random
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from aiohttp import web
+from benchmarks import synthetic
+
+NO_RECORD = {"Error_Msg": "No Record found"}
+Z_99 = 2.326  # standard normal 99th percentile
+
+
+@dataclass
+class StubConfig:
+    records_per_day: int = 2000
+    weekend_ratio: float = 0.1          # weekend volume as a share of a weekday
+    day_jitter: float = 0.2             # +/- share of per-day volume, fixed per tradedt
+    burst_from: datetime = None         # results season: days in [burst_from, burst_to] get burst_multiplier x volume
+    burst_to: datetime = None
+    burst_multiplier: float = 1.0
+    latency_ms_median: float = 50.0
+    latency_ms_p99: float = 400.0
+    timeout_rate: float = 0.0           # share of requests held for hang_sec (past the client timeout)
+    hang_sec: float = 60.0
+    error_rate: float = 0.0             # share of requests answered with one of error_statuses
+    error_statuses: tuple = (500, 502, 503)
+    companies: int = 500
+    seed: int = 1
+    cached_days: int = 64
+
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    ok: int = 0
+    empty: int = 0
+    errors_injected: int = 0
+    timeouts_injected: int = 0
+    bad_requests: int = 0
+    records_served: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    status_counts: dict = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {k: v for k, v in self.__dict__.items() if k != "in_flight"}
+
+
+class BseStubServer:
+    def __init__(self, config: StubConfig = None):
+        self.config = config or StubConfig()
+        self.stats = StubStats()
+        self.codes = synthetic.company_codes(self.config.companies, seed=self.config.seed)
+        self._rnd = random.Random(self.config.seed)
+        self._days = OrderedDict()  # tradedt -> records sorted by Tradedate (LRU)
+        self._runner = None
+        self.url = None
+        # lognormal with the configured median and p99
+        self._mu = math.log(max(self.config.latency_ms_median, 0.001))
+        self._sigma = max(math.log(max(self.config.latency_ms_p99, 0.001) / max(self.config.latency_ms_median, 0.001)), 0.0) / Z_99
+
+    # ------------------ DATA ------------------
+    def day_volume(self, day: datetime) -> int:
+        cfg = self.config
+        rnd = random.Random(cfg.seed * 1_000_003 + day.toordinal())
+        n = cfg.records_per_day * (cfg.weekend_ratio if day.weekday() >= 5 else 1.0)
+        n *= 1 + rnd.uniform(-cfg.day_jitter, cfg.day_jitter)
+        if cfg.burst_from and cfg.burst_to and cfg.burst_from <= day <= cfg.burst_to:
+            n *= cfg.burst_multiplier
+        return max(int(n), 0)
+
+    def day_records(self, tradedt: str) -> list:
+        """Deterministic records for a tradedt; the same day always yields the same news_ids."""
+        if tradedt in self._days:
+            self._days.move_to_end(tradedt)
+            return self._days[tradedt]
+        day = datetime.strptime(tradedt, "%Y%m%d")
+        records = synthetic.announcements(self.day_volume(day), self.codes, start=day, days=1, seed=zlib.crc32(tradedt.encode()) ^ self.config.seed)
+        # "HH:MM:SS" sorts like the time of day
+        records.sort(key=lambda r: r["Tradedate"][11:])
+        self._days[tradedt] = records
+        if len(self._days) > self.config.cached_days:
+            self._days.popitem(last=False)
+        return records
+
+    def select(self, payload: dict, now: datetime = None) -> list:
+        """Records of payload["tradedt"] at or after hr:min:sec; today's stop at the current time."""
+        tradedt = payload["tradedt"]
+        datetime.strptime(tradedt, "%Y%m%d")  # ValueError -> 400
+        since = f"{int(payload.get('hr', 0)):02d}:{int(payload.get('min', 0)):02d}:{int(payload.get('sec', 0)):02d}"
+        now = now or datetime.now()
+        if tradedt > now.strftime("%Y%m%d"):
+            return []
+        until = now.strftime("%H:%M:%S") if tradedt == now.strftime("%Y%m%d") else "24:00:00"
+        return [r for r in self.day_records(tradedt) if since <= r["Tradedate"][11:] <= until]
+
+    # ------------------ HTTP ------------------
+    def _latency_sec(self) -> float:
+        if self.config.latency_ms_median <= 0:
+            return 0.0
+        return self._rnd.lognormvariate(self._mu, self._sigma) / 1000
+
+    def _count(self, status: int):
+        self.stats.status_counts[status] = self.stats.status_counts.get(status, 0) + 1
+
+    async def handle(self, request: web.Request) -> web.Response:
+        stats = self.stats
+        stats.requests += 1
+        stats.in_flight += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        try:
+            try:
+                payload = await request.json()
+                records = self.select(payload)
+            except (ValueError, KeyError, TypeError) as e:
+                stats.bad_requests += 1
+                self._count(400)
+                return web.json_response({"Error_Msg": f"bad request: {e}"}, status=400)
+
+            roll = self._rnd.random()
+            if roll < self.config.timeout_rate:
+                stats.timeouts_injected += 1
+                await asyncio.sleep(self.config.hang_sec)
+            await asyncio.sleep(self._latency_sec())
+            if roll >= self.config.timeout_rate and roll < self.config.timeout_rate + self.config.error_rate:
+                stats.errors_injected += 1
+                status = self._rnd.choice(self.config.error_statuses)
+                self._count(status)
+                return web.Response(status=status, text="Service Unavailable")
+
+            self._count(200)
+            if not records:
+                stats.empty += 1
+                return web.json_response(NO_RECORD)
+            stats.ok += 1
+            stats.records_served += len(records)
+            return web.json_response(records)
+        finally:
+            stats.in_flight -= 1
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/{tail:.*}", self.handle)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve in the running loop; port 0 picks a free one. Returns the URL to POST to."""
+        self._runner = web.AppRunner(self.app(), handle_signals=False)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_host, bound_port = self._runner.addresses[0][:2]
+        self.url = f"http://{bound_host}:{bound_port}/"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    """StubConfig flags, shared with benchmarks.load_test."""
+    d = StubConfig()
+    parser.add_argument("--records-per-day", type=int, default=d.records_per_day)
+    parser.add_argument("--weekend-ratio", type=float, default=d.weekend_ratio)
+    parser.add_argument("--burst-from", type=lambda s: datetime.strptime(s, "%Y-%m-%d"), default=None)
+    parser.add_argument("--burst-to", type=lambda s: datetime.strptime(s, "%Y-%m-%d"), default=None)
+    parser.add_argument("--burst-multiplier", type=float, default=d.burst_multiplier)
+    parser.add_argument("--latency-ms-median", type=float, default=d.latency_ms_median)
+    parser.add_argument("--latency-ms-p99", type=float, default=d.latency_ms_p99)
+    parser.add_argument("--timeout-rate", type=float, default=d.timeout_rate)
+    parser.add_argument("--hang-sec", type=float, default=d.hang_sec)
+    parser.add_argument("--error-rate", type=float, default=d.error_rate)
+    parser.add_argument("--companies", type=int, default=d.companies)
+    parser.add_argument("--seed", type=int, default=d.seed)
+
+
+def config_from_args(args) -> StubConfig:
+    return StubConfig(
+        records_per_day=args.records_per_day, weekend_ratio=args.weekend_ratio,
+        burst_from=args.burst_from, burst_to=args.burst_to, burst_multiplier=args.burst_multiplier,
+        latency_ms_median=args.latency_ms_median, latency_ms_p99=args.latency_ms_p99,
+        timeout_rate=args.timeout_rate, hang_sec=args.hang_sec, error_rate=args.error_rate,
+        companies=args.companies, seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local BSE Indira API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    server = BseStubServer(config_from_args(args))
+    print(f"🧪 BSE stub serving on http://{args.host}:{args.port}/ | {server.config}")
+    web.run_app(server.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
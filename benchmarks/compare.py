@@ -0,0 +1,43 @@
+"""
+Side-by-side of two run_all JSON files: every numeric timing / throughput, matched by benchmark and row.
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import json
+import sys
+
+# row fields that identify a row rather than measure it
+KEY_FIELDS = ("n", "mode", "workers", "max_in_flight", "latency_ms", "dup_ratio")
+
+
+def _rows(result):
+    return result["rows"] if isinstance(result, dict) else result
+
+
+def _key(row):
+    return tuple((k, row[k]) for k in KEY_FIELDS if k in row)
+
+
+def compare(old: dict, new: dict):
+    print(f"old {old.get('commit', '?')[:10]} ({old.get('profile')})  →  new {new.get('commit', '?')[:10]} ({new.get('profile')})")
+    for name, new_result in new["results"].items():
+        if name not in old["results"]:
+            continue
+        old_rows = {_key(r): r for r in _rows(old["results"][name])}
+        for row in _rows(new_result):
+            before = old_rows.get(_key(row))
+            if not before:
+                continue
+            label = " ".join(f"{k}={v}" for k, v in _key(row))
+            for field, value in row.items():
+                if field in KEY_FIELDS or not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue
+                prev = before.get(field)
+                if isinstance(prev, (int, float)) and prev:
+                    print(f"{name:>22} | {label:<40} | {field:<32} {prev:12.4f} → {value:12.4f}  (x{value / prev:.2f})")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    with open(sys.argv[1], encoding="utf-8") as a, open(sys.argv[2], encoding="utf-8") as b:
+        compare(json.load(a), json.load(b))
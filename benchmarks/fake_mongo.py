@@ -0,0 +1,238 @@
+"""
+In-memory stand-in for the motor collections the pipeline writes to.
+Covers the calls the writer, divider, caches and ledgers make, with optional per-call latency
+and unique keys that raise the same BulkWriteError (code 11000) a real unique index would.
+"""
+import asyncio
+import copy
+import itertools
+from datetime import datetime
+from types import SimpleNamespace
+from pymongo.errors import BulkWriteError
+
+_ids = itertools.count(1)
+
+
+def _get(doc, key):
+    for part in key.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return None
+        doc = doc[part]
+    return doc
+
+
+def _same_type(a, b) -> bool:
+    # BSON only orders values within a type bracket (strings with strings, dates with dates)
+    numeric = (int, float)
+    return (isinstance(a, numeric) and isinstance(b, numeric)) or type(a) is type(b)
+
+
+def _match_value(value, cond) -> bool:
+    if not isinstance(cond, dict) or not any(k.startswith("$") for k in cond):
+        return value == cond
+    for op, arg in cond.items():
+        if op == "$in":
+            ok = value in arg
+        elif op == "$nin":
+            ok = value not in arg
+        elif op == "$ne":
+            ok = value != arg
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            if value is None or not _same_type(value, arg):
+                return False
+            ok = {"$gt": value > arg, "$gte": value >= arg, "$lt": value < arg, "$lte": value <= arg}[op]
+        elif op == "$type":
+            ok = {"string": isinstance(value, str), "date": isinstance(value, datetime)}.get(arg, False)
+        elif op == "$exists":
+            ok = (value is not None) == bool(arg)
+        else:
+            raise NotImplementedError(f"fake_mongo: operator {op}")
+        if not ok:
+            return False
+    return True
+
+
+def matches(doc, query) -> bool:
+    for key, cond in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, q) for q in cond):
+                return False
+        elif not _match_value(_get(doc, key), cond):
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return copy.copy(doc)
+    include = [k for k, v in projection.items() if v and k != "_id"]
+    out = {k: doc[k] for k in include if k in doc}
+    if projection.get("_id", 1):
+        out["_id"] = doc["_id"]
+    return out
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+        self._limit = 0
+
+    def sort(self, key, direction=1):
+        self._docs.sort(key=lambda d: (_get(d, key) is None, str(_get(d, key))), reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def _result(self):
+        return self._docs[: self._limit] if self._limit else self._docs
+
+    async def to_list(self, length=None):
+        return self._result()
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self._result():
+            yield doc
+
+
+class FakeCollection:
+    def __init__(self, name: str, unique_keys=("news_id",), latency_sec: float = 0.0):
+        self.name = name
+        self.unique_keys = tuple(unique_keys)
+        self.latency_sec = latency_sec
+        self.docs = {}  # _id -> doc
+        self._unique = {key: {} for key in self.unique_keys}  # key -> value -> _id
+        self.calls = 0
+
+    async def _io(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency_sec)
+
+    def with_options(self, **kwargs):
+        return self
+
+    def _conflict(self, doc):
+        return any(doc.get(k) is not None and doc.get(k) in self._unique[k] for k in self.unique_keys)
+
+    def _store(self, doc):
+        doc.setdefault("_id", next(_ids))
+        self.docs[doc["_id"]] = doc
+        for k in self.unique_keys:
+            if doc.get(k) is not None:
+                self._unique[k][doc[k]] = doc["_id"]
+
+    # ------------------ WRITES ------------------
+    async def insert_many(self, docs, ordered=False):
+        await self._io()
+        inserted, errors = [], []
+        for i, doc in enumerate(docs):
+            if self._conflict(doc):
+                errors.append({"index": i, "code": 11000, "errmsg": "E11000 duplicate key error"})
+                continue
+            self._store(doc)  # motor sets _id on the caller's dict as well
+            inserted.append(doc["_id"])
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted), "nUpserted": 0, "nMatched": 0})
+        return SimpleNamespace(inserted_ids=inserted)
+
+    def _apply_update(self, doc, update):
+        for op, fields in update.items():
+            for k, v in fields.items():
+                if op == "$set":
+                    doc[k] = v
+                elif op == "$inc":
+                    doc[k] = doc.get(k, 0) + v
+                elif op == "$max":
+                    doc[k] = v if doc.get(k) is None else max(doc[k], v)
+                else:
+                    raise NotImplementedError(f"fake_mongo: update {op}")
+
+    def _lookup(self, query):
+        """First match; single-key equality on _id or a unique key is an index hit like in Mongo."""
+        if len(query) == 1:
+            (key, value), = query.items()
+            if not isinstance(value, dict):
+                if key == "_id":
+                    return self.docs.get(value)
+                if key in self._unique:
+                    return self.docs.get(self._unique[key].get(value))
+        return next((d for d in self.docs.values() if matches(d, query)), None)
+
+    def _update(self, query, update, upsert):
+        target = self._lookup(query)
+        if target is not None:
+            self._apply_update(target, update)
+            return target, False
+        if not upsert:
+            return None, False
+        doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        self._apply_update(doc, update)
+        self._store(doc)
+        return doc, True
+
+    async def bulk_write(self, ops, ordered=False):
+        await self._io()
+        matched = upserted = 0
+        errors = []
+        for i, op in enumerate(ops):
+            if op._upsert and self._lookup(op._filter) is None:
+                # the upserted doc would collide on another unique key, like a real unique index
+                probe = {k: v for k, v in op._filter.items() if not k.startswith("$") and not isinstance(v, dict)}
+                probe.update(op._doc.get("$set", {}))
+                if self._conflict(probe):
+                    errors.append({"index": i, "code": 11000, "errmsg": "E11000 duplicate key error"})
+                    continue
+            _, created = self._update(op._filter, op._doc, op._upsert)
+            upserted += created
+            matched += not created
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": 0, "nUpserted": upserted, "nMatched": matched})
+        return SimpleNamespace(matched_count=matched, modified_count=matched, upserted_count=upserted)
+
+    async def delete_many(self, query):
+        await self._io()
+        doomed = [d for d in self.docs.values() if matches(d, query)]
+        for doc in doomed:
+            del self.docs[doc["_id"]]
+            for k in self.unique_keys:
+                if self._unique[k].get(doc.get(k)) == doc["_id"]:
+                    del self._unique[k][doc[k]]
+        return SimpleNamespace(deleted_count=len(doomed))
+
+    async def update_one(self, query, update, upsert=False):
+        await self._io()
+        _, created = self._update(query, update, upsert)
+        return SimpleNamespace(upserted_id=None, matched_count=int(not created))
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        await self._io()
+        before = copy.deepcopy(self._lookup(query))
+        doc, _ = self._update(query, update, upsert)
+        return doc if return_document else before
+
+    async def create_index(self, keys, **options):
+        return options.get("name")
+
+    # ------------------ READS ------------------
+    def find(self, query=None, projection=None):
+        self.calls += 1
+        return FakeCursor([_project(d, projection) for d in self.docs.values() if matches(d, query)])
+
+    async def find_one(self, query=None, projection=None):
+        await self._io()
+        return next((_project(d, projection) for d in self.docs.values() if matches(d, query)), None)
+
+    async def distinct(self, key, query=None):
+        await self._io()
+        return list({_get(d, key) for d in self.docs.values() if matches(d, query) and _get(d, key) is not None})
+
+    async def count_documents(self, query=None):
+        await self._io()
+        return sum(1 for d in self.docs.values() if matches(d, query))
@@ -0,0 +1,229 @@
+"""
+End-to-end load test: the full BSEAnnouncementPipeline (fetch → categorize → divide → insert)
+against the local BSE stub server, reporting records/sec, p50/p99 cycle time and peak RSS.
+    python -m benchmarks.load_test --mode hist --from 2024-05-01 --to 2024-05-31 --records-per-day 5000 \\
+        --burst-from 2024-05-10 --burst-to 2024-05-20 --burst-multiplier 4 --error-rate 0.05 --timeout-rate 0.01
+    python -m benchmarks.load_test --mode live --cycles 10 --interval-sec 5
+A live cycle is one fetch_and_process call; in hist mode (streaming) a cycle is one day's categorize + insert.
+--mongo fake (default) swaps every collection for benchmarks.fake_mongo; --mongo real writes to the
+configured MONGO_URI / DB_NAME, so point those at a scratch database first.
+--stub-url uses an already running `python -m benchmarks.bse_stub_server` and keeps its memory out of the RSS figure.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import sys
+import time
+from datetime import datetime
+import numpy as np
+from config.settings import (
+    COLLECTION_ALL_ANN,
+    COLLECTION_ALL_REPORTS,
+    COLLECTION_METADATA_UPDATES,
+    COLLECTION_HIST_LEDGER,
+    COLLECTION_REPORT_COUNTERS,
+    COLLECTION_MASTER,
+)
+from core.bse_pipeline import BSEAnnouncementPipeline
+from core.company_master import CompanyMasterCache
+from core.datetime_migration import DatetimeMigration
+from core.resources import SharedResources
+from benchmarks import synthetic
+from benchmarks.bse_stub_server import BseStubServer, StubConfig, add_stub_arguments, config_from_args
+from benchmarks.fake_mongo import FakeCollection
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def install_company_master(codes: list):
+    """Shared master built from the stub's scrip codes, so FilterCategorize never loads CompanyMaster from Mongo."""
+    master = CompanyMasterCache(snapshot_path=os.devnull, refresh_mode="off")
+    cmap = synthetic.company_dict(codes)
+    master._replace(
+        [{"_id": code, "bsecode": code, "isin": entry["company"], "nsesymbol": entry["symbolmap"]["NSE"],
+          "companyname": entry["symbolmap"]["Company_Name"]} for code, entry in cmap.items()],
+        source="load_test",
+    )
+    SharedResources._company_master = master
+    return master
+
+
+def use_fake_mongo(pipeline, latency_sec: float = 0.0) -> dict:
+    """Point the categorizer, divider, ledger and migration at in-memory collections."""
+    collections = {
+        "collection_all_ann": FakeCollection(COLLECTION_ALL_ANN, latency_sec=latency_sec),
+        "collection_all_reports": FakeCollection(COLLECTION_ALL_REPORTS, unique_keys=("news_id", "report_id"), latency_sec=latency_sec),
+        "collection_metadata_updates": FakeCollection(COLLECTION_METADATA_UPDATES, unique_keys=(), latency_sec=latency_sec),
+        "collection_hist_ledger": FakeCollection(COLLECTION_HIST_LEDGER, unique_keys=(), latency_sec=latency_sec),
+        "collection_report_counters": FakeCollection(COLLECTION_REPORT_COUNTERS, unique_keys=(), latency_sec=latency_sec),
+        "collection_master": FakeCollection(COLLECTION_MASTER, unique_keys=(), latency_sec=latency_sec),
+    }
+    for owner in (pipeline.categorizer, pipeline.divider):
+        for attr, collection in collections.items():
+            setattr(owner, attr, collection)
+    pipeline.hist_ledger.collection = collections["collection_hist_ledger"]
+    pipeline.datetime_migration = DatetimeMigration(
+        collections["collection_metadata_updates"],
+        [(collections["collection_all_ann"], "Tradedate"), (collections["collection_all_reports"], "dt_tm")],
+        pipeline.logger,
+    )
+    return collections
+
+
+def build_pipeline(api_url: str, mongo: str = "fake", mongo_latency_sec: float = 0.0, client_timeout_sec: float = None,
+                   retry_delay_sec: float = None, verbose: bool = False):
+    pipeline = BSEAnnouncementPipeline(api_url=api_url)
+    collections = use_fake_mongo(pipeline, mongo_latency_sec) if mongo == "fake" else None
+    if client_timeout_sec is not None:
+        pipeline.bse_client.timeout_sec = client_timeout_sec
+    if retry_delay_sec is not None:
+        pipeline.bse_client.retry_delay_sec = retry_delay_sec
+    if not verbose:
+        for logger in (pipeline.logger, pipeline.bse_client.logger, pipeline.categorizer.logger, pipeline.divider.logger):
+            logger.setLevel(logging.WARNING)
+    return pipeline, collections
+
+
+def instrument(pipeline) -> list:
+    """Record (records, seconds, ok) of every process_announcements call."""
+    samples = []
+    process = pipeline.process_announcements
+
+    async def timed(announcements, *args, **kwargs):
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            ok = await process(announcements, *args, **kwargs)
+            return ok
+        finally:
+            samples.append((len(announcements), time.perf_counter() - t0, bool(ok)))
+
+    pipeline.process_announcements = timed
+    return samples
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"p50": None, "p99": None, "max": None}
+    arr = np.asarray(values)
+    return {"p50": float(np.percentile(arr, 50)), "p99": float(np.percentile(arr, 99)), "max": float(arr.max())}
+
+
+async def load_test(mode: str = "hist", from_date: datetime = datetime(2024, 5, 1), to_date: datetime = datetime(2024, 5, 31),
+                    cycles: int = 5, interval_sec: float = 0.0, stub: StubConfig = None, stub_url: str = None,
+                    mongo: str = "fake", mongo_latency_ms: float = 0.0, client_timeout_sec: float = None,
+                    retry_delay_sec: float = None, verbose: bool = False) -> dict:
+    server = None
+    if stub_url is None:
+        server = BseStubServer(stub)
+        stub_url = await server.start()
+    config = server.config if server else (stub or StubConfig())
+    if mongo == "fake":
+        install_company_master(synthetic.company_codes(config.companies, seed=config.seed))
+
+    pipeline, collections = build_pipeline(stub_url, mongo, mongo_latency_ms / 1000, client_timeout_sec, retry_delay_sec, verbose)
+    samples = instrument(pipeline)
+    cycle_times, ok_cycles = [], 0
+    try:
+        await pipeline.startup()
+        started = time.perf_counter()
+        if mode == "hist":
+            await pipeline.fetch_and_process(fetch_type="hist", from_date=from_date, to_date=to_date)
+            cycle_times = [seconds for _, seconds, _ in samples]
+            ok_cycles = sum(ok for _, _, ok in samples)
+        else:
+            lastnews_dt_tm = None
+            for i in range(cycles):
+                t0 = time.perf_counter()
+                run_start_time = datetime.now().replace(second=0, microsecond=0)
+                is_fetch = await pipeline.fetch_and_process(lastnews_dt_tm=lastnews_dt_tm)
+                cycle_times.append(time.perf_counter() - t0)
+                if is_fetch:
+                    ok_cycles += 1
+                    lastnews_dt_tm = run_start_time
+                if interval_sec and i < cycles - 1:
+                    await asyncio.sleep(interval_sec)
+        wall = time.perf_counter() - started
+    finally:
+        await pipeline.close()
+        if server:
+            await server.stop()
+
+    records = sum(n for n, _, _ in samples)
+    stats = pipeline.bse_client.last_run_stats
+    return {
+        "mode": mode,
+        "mongo": mongo,
+        "wall_seconds": wall,
+        "records": records,
+        "records_per_sec": records / wall if wall else None,
+        "cycles": len(cycle_times),
+        "ok_cycles": ok_cycles,
+        "cycle_seconds": percentiles(cycle_times),
+        "peak_rss_mb": peak_rss_mb(),
+        "stored": {name: len(c.docs) for name, c in collections.items()} if collections else None,
+        "fetch_stats": stats.summary() if stats else None,
+        "concurrency": pipeline.bse_client.limiter.status(),
+        "stub": server.stats.as_dict() if server else None,
+    }
+
+
+def run(mode="hist", days=10, records_per_day=2000, error_rate=0.02, latency_ms_median=20.0, latency_ms_p99=200.0) -> list:
+    """Short hist run for benchmarks.run_all, flattened into one comparable row."""
+    stub = StubConfig(records_per_day=records_per_day, error_rate=error_rate,
+                      latency_ms_median=latency_ms_median, latency_ms_p99=latency_ms_p99)
+    start = datetime(2024, 5, 1)
+    report = asyncio.run(load_test(mode=mode, from_date=start, to_date=start.replace(day=days), stub=stub, retry_delay_sec=0.1))
+    return [{"mode": mode, "n": report["records"], "seconds": report["wall_seconds"], "records_per_sec": report["records_per_sec"],
+             "cycle_p50_sec": report["cycle_seconds"]["p50"], "cycle_p99_sec": report["cycle_seconds"]["p99"],
+             "peak_rss_mb": report["peak_rss_mb"]}]
+
+
+def main():
+    day = lambda s: datetime.strptime(s, "%Y-%m-%d")
+    parser = argparse.ArgumentParser(description="End-to-end pipeline load test against the local BSE stub")
+    parser.add_argument("--mode", choices=("hist", "live"), default="hist")
+    parser.add_argument("--from", dest="from_date", type=day, default=datetime(2024, 5, 1))
+    parser.add_argument("--to", dest="to_date", type=day, default=datetime(2024, 5, 31))
+    parser.add_argument("--cycles", type=int, default=5, help="live mode: fetch_and_process calls")
+    parser.add_argument("--interval-sec", type=float, default=0.0, help="live mode: pause between cycles")
+    parser.add_argument("--stub-url", default=None, help="use a running stub server instead of an in-process one")
+    parser.add_argument("--mongo", choices=("fake", "real"), default="fake")
+    parser.add_argument("--mongo-latency-ms", type=float, default=0.0, help="fake Mongo: per-call latency")
+    parser.add_argument("--client-timeout-sec", type=float, default=5.0, help="BSE client timeout (injected timeouts hang past it)")
+    parser.add_argument("--retry-delay-sec", type=float, default=0.5)
+    parser.add_argument("--json", default=None, help="also write the report to this path")
+    parser.add_argument("--verbose", action="store_true", help="keep the pipeline's INFO logs")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    if args.mongo == "real":
+        print(f"⚠️ Writing to the configured Mongo database ({os.getenv('DB_NAME', 'BSECorpReports')})")
+
+    report = asyncio.run(load_test(
+        mode=args.mode, from_date=args.from_date, to_date=args.to_date, cycles=args.cycles, interval_sec=args.interval_sec,
+        stub=config_from_args(args), stub_url=args.stub_url, mongo=args.mongo, mongo_latency_ms=args.mongo_latency_ms,
+        client_timeout_sec=args.client_timeout_sec, retry_delay_sec=args.retry_delay_sec, verbose=args.verbose,
+    ))
+    cycle = report["cycle_seconds"]
+    print(f"📊 {report['mode']} | {report['records']} records in {report['wall_seconds']:.1f}s → {report['records_per_sec'] or 0:.0f} rec/s")
+    if cycle["p50"] is not None:
+        print(f"⏱️ cycles: {report['cycles']} (ok {report['ok_cycles']}) | p50 {cycle['p50']*1000:.0f} ms | p99 {cycle['p99']*1000:.0f} ms | max {cycle['max']*1000:.0f} ms")
+    print(f"🧠 peak RSS: {report['peak_rss_mb']:.0f} MB")
+    print(f"📡 fetch: {report['fetch_stats']} | {report['concurrency']}")
+    if report["stub"]:
+        print(f"🧪 stub: {report['stub']}")
+    if report["stored"]:
+        print(f"🗄️ stored: {report['stored']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Runs the offline benchmark suite and writes one JSON file per run, tagged with the git commit,
+so results can be compared across commits with `python -m benchmarks.compare old.json new.json`.
+    python -m benchmarks.run_all [--full] [--out benchmarks/results] [--only crossover,insert_in_batches]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+import pandas as pd
+from benchmarks import (
+    bench_categorizer,
+    bench_crossover,
+    bench_date_parser,
+    bench_format_category_docs,
+    bench_insert_in_batches,
+    bench_maintain_json_file,
+    bench_cpu_offload,
+    bench_replay,
+    load_test,
+)
+
+# name -> (run function, quick-profile kwargs, full-profile kwargs)
+SUITE = {
+    "categorizer": (bench_categorizer.run, {"sizes": (1_000, 10_000)}, {}),
+    "crossover": (bench_crossover.run, {"sizes": (1, 10, 100, 1_000), "repeat": 3}, {}),
+    "date_parser": (bench_date_parser.run, {"sizes": (10_000, 100_000)}, {}),
+    "format_category_docs": (bench_format_category_docs.run, {"sizes": (1_000, 10_000)}, {}),
+    "insert_in_batches": (bench_insert_in_batches.run, {"sizes": (10_000,)}, {}),
+    "maintain_json_file": (bench_maintain_json_file.run, {"sizes": (1_000, 10_000)}, {}),
+    "cpu_offload": (bench_cpu_offload.run, {"n": 20_000}, {}),
+    "replay": (bench_replay.run, {"sizes": (10_000,)}, {}),
+    "load_test": (load_test.run, {"days": 5}, {"days": 31, "records_per_day": 5000}),
+}
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def environment() -> dict:
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline fetch→categorize→divide benchmarks")
+    parser.add_argument("--full", action="store_true", help="use each benchmark's full default sizes")
+    parser.add_argument("--out", default=os.path.join("benchmarks", "results"))
+    parser.add_argument("--only", default="", help="comma-separated subset of: " + ", ".join(SUITE))
+    args = parser.parse_args()
+
+    selected = [name.strip() for name in args.only.split(",") if name.strip()] or list(SUITE)
+    report = {"started_at": datetime.now().isoformat(timespec="seconds"), "profile": "full" if args.full else "quick",
+              **environment(), "results": {}}
+    for name in selected:
+        fn, quick, full = SUITE[name]
+        t0 = time.perf_counter()
+        report["results"][name] = fn(**(full if args.full else quick))
+        print(f"⏱️ {name}: {time.perf_counter() - t0:.1f}s")
+
+    os.makedirs(args.out, exist_ok=True)
+    commit = (report["commit"] or "nogit")[:10] + ("-dirty" if report["dirty"] else "")
+    path = os.path.join(args.out, f"{datetime.now():%Y%m%d_%H%M%S}_{commit}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"📄 {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+
+# ~1 in 8 headlines hits one of the CATEGORY_MAP report categories, the rest stay "General"
+GENERAL_HEADLINES = [
+    "Board Meeting Intimation for Quarterly Results",
+    "Compliances-Reg. 39 (3) - Details of Loss of Certificate",
+    "Closure of Trading Window",
+    "Shareholding Pattern for the quarter ended {day}",
+    "Disclosure under Regulation 30 of SEBI (LODR) Regulations, 2015",
+    "Outcome of Board Meeting held on {day}",
+    "Newspaper Publication of Financial Results",
+    "Intimation of Record Date for Dividend",
+    "Allotment of Equity Shares under ESOP Scheme",
+    "Statement of Investor Complaints for the quarter ended {day}",
+    "Change in Directorate",
+    "Certificate under Regulation 74(5) of SEBI (DP) Regulations, 2018",
+    "Disclosure of Related Party Transactions",
+    "Intimation of Loss of Share Certificates",
+]
+CATEGORY_HEADLINES = [
+    "Intimation of Investor Presentation",
+    "Annual Report for the Financial Year 2023-24",
+    "Credit Rating Reaffirmed by CRISIL",
+    "Transcript of Earnings Call held on {day}",
+    "Intimation of Conference Call with Analysts",
+    "Annual Report and Investor Presentation",
+]
+HEADLINES = GENERAL_HEADLINES * 3 + CATEGORY_HEADLINES
+DESCRIPTORS = ["", "", "", "Investor Presentation", "Board Meeting", "Credit Rating", "Outcome of Board Meeting", "Newspaper Publication"]
+
+
+def company_codes(n: int = 500, seed: int = 7) -> list:
+    rnd = random.Random(seed)
+    return sorted({str(rnd.randint(500000, 544999)) for _ in range(n)})
+
+
+def company_dict(codes: list) -> dict:
+    """Shape produced by Base.fetch_load_symbolmap."""
+    return {
+        code: {
+            "company": f"INE{int(code):06d}01",
+            "symbolmap": {"NSE": f"SYM{code}", "BSE": int(code), "Company_Name": f"Company {code}", "SELECTED": f"SYM{code}"},
+        }
+        for code in codes
+    }
+
+
+def announcements(n: int, codes: list = None, start: datetime = datetime(2024, 4, 1), days: int = 30, seed: int = 42) -> list:
+    """Raw BSE Indira payload records: SCRIP_CD, AttachmentName, Tradedate (dd/mm/YYYY HH:MM:SS), HeadLine, NewsBody, Descriptor."""
+    rnd = random.Random(seed)
+    codes = codes or company_codes()
+    # ~10% of scrips are not in the company master, ~3% of attachments are not PDFs
+    scrips = codes + [str(rnd.randint(100000, 199999)) for _ in range(max(len(codes) // 10, 1))]
+    out = []
+    for _ in range(n):
+        ts = start + timedelta(seconds=rnd.randint(0, days * 86400 - 1))
+        head = rnd.choice(HEADLINES).format(day=ts.strftime("%d-%m-%Y"))
+        ext = ".pdf" if rnd.random() > 0.03 else ".xml"
+        out.append({
+            "SCRIP_CD": rnd.choice(scrips),
+            "AttachmentName": f"{uuid.UUID(int=rnd.getrandbits(128))}{ext}",
+            "ATTACHMENTURL": "https://www.bseindia.com/xml-data/corpfiling/AttachLive/file.pdf",
+            "Tradedate": ts.strftime("%d/%m/%Y %H:%M:%S"),
+            "HeadLine": f"  {head}  ",
+            "NewsBody": rnd.choice(["", None, f"{head}. Please find enclosed the details."]),
+            "Descriptor": rnd.choice(DESCRIPTORS),
+        })
+    return out
+
+
+def tradedates(n: int, start: datetime = datetime(2024, 4, 1), days: int = 30, seed: int = 5, fmt: str = "%d/%m/%Y %H:%M:%S") -> list:
+    """Raw Tradedate strings; a month of second-resolution stamps, so values repeat like a real backfill."""
+    rnd = random.Random(seed)
+    base = start.timestamp()
+    span = days * 86400
+    return [datetime.fromtimestamp(base + rnd.randrange(span)).strftime(fmt) for _ in range(n)]
+
+
+def categorized_docs(n: int, category: str = "Investor Presentation", companies: int = 200, days: int = 365,
+                     start: datetime = datetime(2024, 1, 1), seed: int = 11) -> list:
+    """Docs as they reach ReportsDivider.format_category_docs (one category, unique timestamps)."""
+    rnd = random.Random(seed)
+    codes = company_codes(companies, seed=seed)
+    cmap = company_dict(codes)
+    seconds = rnd.sample(range(days * 86400), n)
+    out = []
+    for sec in seconds:
+        code = rnd.choice(codes)
+        out.append({
+            "news_id": str(uuid.UUID(int=rnd.getrandbits(128))),
+            "company": cmap[code]["company"],
+            "symbolmap": cmap[code]["symbolmap"],
+            "Tradedate": (start + timedelta(seconds=sec)).strftime("%Y-%m-%d %H:%M:%S"),
+            "ATTACHMENTURL": "https://www.bseindia.com/xml-data/corpfiling/AttachLive/file.pdf",
+            "NewsBody": "Please find enclosed the details.",
+            "category": category,
+        })
+    return out
@@ -4,12 +4,27 @@ from pathlib import Path
 
 BSE_INDIRA_HIST_MIN_DATE = datetime(2023, 11, 1)  
 BSE_INDIRA_HIST_MAX_DATE = datetime(2025, 10, 31) 
+BSE_INDIRA_HIST_STREAMING = True  # categorize + insert each day as it arrives instead of one big batch
 BSE_INDIRA_TIMEOUT_SEC = 50
 BSE_INDIRA_RETRY_DELAY_SEC = 2
-BSE_INDIRA_CONCURRENCY_LIMIT = 20
+BSE_INDIRA_CONCURRENCY_LIMIT = 20  # initial limit; adapts between MIN and MAX (AIMD)
+BSE_INDIRA_CONCURRENCY_MIN = 2
+BSE_INDIRA_CONCURRENCY_MAX = 40
+BSE_INDIRA_LATENCY_TARGET_SEC = 5
 BSE_INDIRA_RETRY_COUNT = 3
 BSE_INDIRA_LIVE_DATA_DAYS = 5
+# Live window polling tiers: day age (0 = today) -> minutes between polls, 0 = every cycle
+BSE_INDIRA_LIVE_POLL_TIERS_MIN = {0: 0, 1: 10}
+BSE_INDIRA_LIVE_POLL_OLDER_MIN = 60
+BSE_INDIRA_KEEPALIVE_SEC = 90
+BSE_INDIRA_DNS_CACHE_TTL_SEC = 600
+CONNECTIVITY_PROBE_URL = "https://www.google.com/generate_204"
+CONNECTIVITY_PROBE_TIMEOUT_SEC = 5
 RECHECK_NO_OF_DAYS_ALLREPORTS = 5
+LIVE_WATERMARK_FEED = "bse_indira_live"
+REPORT_COUNTERS_SEEDED_MARKER = "report_id_counters_seeded"
+NEWS_ID_CACHE_WINDOW_DAYS = BSE_INDIRA_LIVE_DATA_DAYS + 1
+NEWS_ID_CACHE_RECONCILE_MIN = 30
 
 COMPANY_SYMBOL_MAP_QUERY = {
             "bsecode": {"$ne": None},
@@ -42,8 +57,45 @@ CATEGORY_MAP = {
 
 RUN_INTERVAL_TIME_MIN = 1 
 LEN_PANDAS_MIN_DOCS = 10
+MONGO_BOOTSTRAP_INDEXES = True
+MONGO_WRITE_MODE = "insert"  # "insert" (insert_many, dups rejected by unique indexes) | "upsert" (idempotent bulk_write)
+MONGO_WRITE_BATCH_SIZE = 1000
+MONGO_WRITE_MAX_IN_FLIGHT = 4
+MONGO_WRITE_CONCERN = {"w": 1}
+MONGO_WRITE_LATENCY_TARGET_SEC = 2
+MONGO_NATIVE_DATETIMES = False  # write Tradedate / dt_tm as BSON dates instead of "%Y-%m-%d %H:%M:%S" strings
+DATETIME_MIGRATION_ENABLED = True  # with native datetimes: convert existing string docs in the background
+DATETIME_MIGRATION_BATCH_SIZE = 1000
+DATETIME_MIGRATION_PAUSE_SEC = 0.2
+# "off" (inline on the event loop) | "thread" | "process". Offloading trades throughput for a responsive loop:
+# on 1 CPU (bench_cpu_offload, 100k records) "off" stalls the loop ~2.7 s per batch but thread x1 / process x1
+# are ~10-15% slower end to end (loop stall ~0.1 s / ~0.2 s). Keep "off" until measured on the multi-core host.
+CPU_OFFLOAD_MODE = "off"
+CPU_OFFLOAD_WORKERS = None  # None = os.cpu_count()
+CPU_OFFLOAD_CHUNK_SIZE = 5000  # records per categorization chunk
+CPU_OFFLOAD_MAX_IN_FLIGHT = None  # None = 2 x workers
+JSON_INDEX_COMPACT_THRESHOLD = 50_000  # log digests before merging into the sorted .idx file
+ARCHIVE_COMPRESSION = "auto"  # "auto" (zstd if installed, else gzip) | "zstd" | "gzip" | "none"
+ARCHIVE_COMPRESSION_LEVEL = None  # None = codec default (zstd 3, gzip 5)
+ARCHIVE_MAX_PENDING_BATCHES = 4  # per stream; maintain_json_file waits once this many batches are queued
+REPLAY_STREAM = "hist_announcements"  # raw archive stream a --replay date range reads
+REPLAY_BATCH_SIZE = 5000  # records per categorize + upsert round
+REPLAY_PREFETCH_BATCHES = 2  # batches read and parsed ahead of the one being processed
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108  # Prometheus text format at http://METRICS_HOST:METRICS_PORT/metrics; 0 disables
 BASE_DIR = Path(__file__).resolve().parent.parent
 LOG_DIR = BASE_DIR / "logs"
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 LOG_LEVEL = "INFO"
-LOG_RETENTION_DAYS = 7
\ No newline at end of file
+LOG_RETENTION_DAYS = 7
+LOG_FORMAT = "text"  # "text" | "json" (one JSON object per line)
+LOG_RATE_LIMIT_BURST = 5  # identical WARNINGs (dates / long ids ignored) let through per logger per window; ERROR+ never limited; 0 disables
+LOG_RATE_LIMIT_WINDOW_SEC = 60
+COMPANY_MASTER_SNAPSHOT_PATH = BASE_DIR / "files" / "company_master_snapshot.json"
+COMPANY_MASTER_REFRESH_MODE = "auto"  # "auto" (change stream, else poll) | "watch" | "poll" | "off"
+COMPANY_MASTER_REFRESH_MIN = 15
+COMPANY_MASTER_UPDATED_FIELD = None  # e.g. "updated_at"; None = full reload on every poll
+COMPANY_MASTER_WATCH_DEBOUNCE_SEC = 2  # change-stream events are collected this long before one re-read
+COMPANY_MASTER_WATCH_BATCH_SIZE = 500  # ...or until this many documents changed
+COMPANY_MASTER_SNAPSHOT_MIN_INTERVAL_SEC = 60  # incremental changes rewrite the snapshot at most this often
+ARCHIVE_DIR = BASE_DIR / "files"  # day partitions under ARCHIVE_DIR/<stream>/
@@ -14,6 +14,8 @@ COLLECTION_ALL_REPORTS = os.getenv("COLLECTION_ALL_REPORTS", "AllReports")
 COLLECTION_MASTER = os.getenv("COLLECTION_MASTER", "CompanyMaster")
 COLLECTION_LLM_USAGE = os.getenv("COLLECTION_LLM_USAGE", "LLMUsage")
 COLLECTION_METADATA_UPDATES = os.getenv("COLLECTION_METADATA_UPDATES", "MetaDataLastUpdates")
+COLLECTION_HIST_LEDGER = os.getenv("COLLECTION_HIST_LEDGER", "HistBackfillLedger")
+COLLECTION_REPORT_COUNTERS = os.getenv("COLLECTION_REPORT_COUNTERS", "ReportIdCounters")
 
 
 BSE_INDIRA_API_URL = os.getenv("BSE_INDIRA_API_URL")
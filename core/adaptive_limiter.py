@@ -0,0 +1,83 @@
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limiter.
+    Additive increase (+1 per `limit` fast successes), multiplicative decrease on
+    failures / overload signals, a softer decrease when latency drifts above target.
+    """
+
+    def __init__(self, initial: int, min_limit: int, max_limit: int, latency_target_sec: float,
+                 backoff_ratio: float = 0.5, slow_ratio: float = 0.9, name: str = "limiter"):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.latency_target_sec = latency_target_sec
+        self.backoff_ratio = backoff_ratio
+        self.slow_ratio = slow_ratio
+        self.name = name
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._cond = None
+        self._last_decrease = 0.0
+        self.successes = 0
+        self.failures = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _condition(self) -> asyncio.Condition:
+        # created lazily so the limiter can be built outside a running loop
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def acquire(self):
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+    async def release(self):
+        cond = self._condition()
+        async with cond:
+            self._in_flight -= 1
+            cond.notify_all()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield self
+        finally:
+            await self.release()
+
+    # ------------------ FEEDBACK ------------------
+    def _decrease(self, ratio: float):
+        # one decrease per latency-target window, so a burst of timeouts from the same wave counts once
+        now = time.monotonic()
+        if now - self._last_decrease < self.latency_target_sec:
+            return
+        self._last_decrease = now
+        self._limit = max(float(self.min_limit), self._limit * ratio)
+
+    def on_success(self, latency_sec: float):
+        self.successes += 1
+        if latency_sec > self.latency_target_sec:
+            self._decrease(self.slow_ratio)
+        else:
+            self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+
+    def on_failure(self):
+        self.failures += 1
+        self._decrease(self.backoff_ratio)
+
+    def status(self) -> str:
+        return f"{self.name} limit={self.limit} [{self.min_limit}-{self.max_limit}] in_flight={self._in_flight}"
@@ -1,5 +1,5 @@
+from pymongo import ASCENDING
 from config.settings import *
-from config.constants import COMPANY_SYMBOL_MAP_QUERY
 from core.resources import SharedResources
 from core.logger import get_logger
 
@@ -15,33 +15,36 @@ class Base:
 
         self.async_mongo = SharedResources.get_async_mongo_client()
         self.db_async = self.async_mongo[DB_NAME]  
+        self.collection_master = self.async_mongo[ODIN_DB][COLLECTION_MASTER]
         self.collection_all_ann = self.db_async[COLLECTION_ALL_ANN]
         self.collection_all_reports = self.db_async[COLLECTION_ALL_REPORTS]
         self.collection_metadata_updates = self.db_async[COLLECTION_METADATA_UPDATES]
+        self.collection_hist_ledger = self.db_async[COLLECTION_HIST_LEDGER]
+        self.collection_report_counters = self.db_async[COLLECTION_REPORT_COUNTERS]
         self.llm_usage_collection = self.db_async[COLLECTION_LLM_USAGE]
+        self.news_id_cache = SharedResources.get_news_id_cache()
+        self.offloader = SharedResources.get_cpu_offloader()
 
-    def fetch_load_symbolmap(self):
-        """Fetch valid companies from MongoDB."""
-        projection = {"bsecode": 1, "nsesymbol": 1, "companyname": 1, "isin":1}
-        docs = self.collection_master_sync.find(COMPANY_SYMBOL_MAP_QUERY, projection)
-        company_dict = {}
-        for d in docs:
+    async def bootstrap_indexes(self):
+        """Create the indexes the pipeline relies on (idempotent; existing indexes are left as they are)."""
+        specs = [
+            (self.collection_all_ann, [("news_id", ASCENDING)], {"name": "news_id_unique", "unique": True}),
+            (self.collection_all_ann, [("Tradedate", ASCENDING), ("category", ASCENDING)], {"name": "tradedate_category"}),
+            (self.collection_all_reports, [("news_id", ASCENDING)], {"name": "news_id_unique", "unique": True}),
+            (self.collection_all_reports, [("report_id", ASCENDING)], {"name": "report_id_unique", "unique": True}),
+            (self.collection_all_reports, [("report_type", ASCENDING), ("dt_tm", ASCENDING)], {"name": "report_type_dt_tm"}),
+        ]
+        for collection, keys, options in specs:
             try:
-                bse = str(int(d["bsecode"]))
-                nse = d.get("nsesymbol")
-                isin = d.get("isin")
-                name = d.get("companyname", "").strip()
-                selected = nse if nse else int(bse)
-                company_dict[bse] = {
-                    "company":isin,
-                    "symbolmap":{
-                    "NSE": nse,
-                    "BSE": int(bse),
-                    "Company_Name": name,
-                    "SELECTED": selected
-                }}
-            except Exception:
-                continue
+                await collection.create_index(keys, **options)
+            except Exception as e:
+                hint = " (existing duplicates must be removed first, see dup_remover.py)" if options.get("unique") else ""
+                self.logger.error(f"❌ Index {options['name']} on {collection.name} not created{hint}: {e}")
+        self.logger.info(f"🧱 Index bootstrap done for {COLLECTION_ALL_ANN}, {COLLECTION_ALL_REPORTS}")
 
-        self.logger.info(f"✅ Company master loaded: {len(company_dict)} companies.")
-        return company_dict
+    def fetch_load_symbolmap(self):
+        """Shared company master: snapshot if present, blocking Mongo load only on a cold start."""
+        master = SharedResources.get_company_master()
+        if not len(master) and not master.load_snapshot(self.logger):
+            master.load_sync(self.collection_master_sync, self.logger)
+        return master
@@ -1,76 +1,123 @@
 import asyncio
+import time
 from datetime import datetime, timedelta
-import aiohttp, aiofiles, os, json
-from tqdm.asyncio import tqdm_asyncio
 
 from config.constants import (
     BSE_INDIRA_HIST_MIN_DATE,
+    BSE_INDIRA_HIST_STREAMING,
     BSE_INDIRA_LIVE_DATA_DAYS,
-    ALLREPORTS_CATEGORY_MAP
+    ALLREPORTS_CATEGORY_MAP,
+    LIVE_WATERMARK_FEED,
+    MONGO_BOOTSTRAP_INDEXES,
+    MONGO_NATIVE_DATETIMES,
+    DATETIME_MIGRATION_ENABLED,
+    ARCHIVE_DIR,
+    ARCHIVE_MAX_PENDING_BATCHES
 )
 from core.logger import get_logger
+from core.hist_ledger import HistBackfillLedger
 from processes.bse_corp_ann_api import BSECorpAnnouncementClient
 from utils.categorize_with_filter import FilterCategorize
 from utils.reports_divider import ReportsDivider
+from utils.jsonl_archive import DayPartitionedArchive
+from utils.date_parser import range_filter, parse_datetime
+from core.datetime_migration import DatetimeMigration
+from core.metrics import CYCLES, CYCLE_SECONDS, CYCLE_LAG_SECONDS, LAST_CYCLE_TIMESTAMP
+
+
+ARCHIVE_STREAMS = {
+    ("filter", "live"): "categorized_announcements_live",
+    ("filter", "hist"): "categorized_announcements_hist",
+    ("normal", "live"): "live_announcements",
+    ("normal", "hist"): "hist_announcements",
+}
 
 
 class BSEAnnouncementPipeline:
-    def __init__(self):
+    def __init__(self, api_url: str = None):
         self.logger = get_logger("bse_pipeline", save_time_logs=True)
-        self.bse_client = BSECorpAnnouncementClient()
+        self.bse_client = BSECorpAnnouncementClient(api_url=api_url)
         self.categorizer = FilterCategorize()
         self.divider = ReportsDivider()
+        self.hist_ledger = HistBackfillLedger(self.divider.collection_hist_ledger, self.logger)
+        self.datetime_migration = DatetimeMigration(
+            self.divider.collection_metadata_updates,
+            [(self.divider.collection_all_ann, "Tradedate"), (self.divider.collection_all_reports, "dt_tm")],
+            self.logger,
+        )
         self.maintain_json = False
+        self.archive_dir = ARCHIVE_DIR
+        self._archives = {}
         self.reports_cat = ALLREPORTS_CATEGORY_MAP.keys()
 
-    # ------------------------ JSON Maintenance ------------------------
-    async def maintain_json_file(self, new_data, data_type="normal", fetch_type="live"):
-        mapping = {
-            ("filter", "live"): "categorized_announcements_live.jsonl",
-            ("filter", "hist"): "categorized_announcements_hist.jsonl",
-            ("normal", "live"): "live_announcements.jsonl",
-            ("normal", "hist"): "hist_announcements.jsonl",
-        }
-        filename = mapping.get((data_type, fetch_type), "unknown_data.jsonl")
-        base_dir = "files"
-        filepath, index_path = os.path.join(base_dir, filename), os.path.join(base_dir, filename + ".index")
-        os.makedirs(base_dir, exist_ok=True)
-
+    async def startup(self):
+        """Create indexes and warm process-wide caches before the first cycle."""
+        if MONGO_BOOTSTRAP_INDEXES:
+            await self.divider.bootstrap_indexes()
+        await self.divider.seed_report_counters()
+        self.categorizer.company_master.start(self.categorizer.collection_master, logger=self.logger)
+        if MONGO_NATIVE_DATETIMES and DATETIME_MIGRATION_ENABLED:
+            self.datetime_migration.start()
         try:
-            existing_ids = set()
-            if os.path.exists(index_path):
-                async with aiofiles.open(index_path, "r", encoding="utf-8") as idx:
-                    content = await idx.read()
-                    if content.strip():
-                        existing_ids = set(content.splitlines())
-
-            new_unique = [
-                d for d in new_data
-                if isinstance(d, dict) and (nid := d.get("news_id")) and nid not in existing_ids
-            ]
-            if not new_unique:
+            await self.categorizer.news_id_cache.seed(self.categorizer.collection_all_ann, logger=self.logger)
+        except Exception as e:
+            self.logger.error(f"⚠️ news_id cache seed failed, falling back to range scans: {e}")
+
+    async def close(self):
+        await self.bse_client.close()
+        await self.categorizer.company_master.stop()
+        await self.datetime_migration.stop()
+        self.categorizer.offloader.shutdown()
+        # drains queued archive batches
+        await asyncio.gather(*(asyncio.to_thread(archive.close) for archive in self._archives.values()))
+
+    # ------------------------ JSON Maintenance ------------------------
+    def _log_archived(self, stream):
+        def _done(future):
+            try:
+                written = future.result()
+            except Exception as e:
+                self.logger.error(f"⚠️ Failed to maintain {stream} archive: {e}")
                 return
+            if written:
+                self.logger.info(f"✅ Archived {written} new records → {stream}")
+        return _done
 
-            if len(new_unique) >= 1000:
-                async def _to_json_line(doc):
-                    return json.dumps(doc, ensure_ascii=False) + "\n"
-                tasks = [_to_json_line(doc) for doc in new_unique]
-                lines = [
-                    await t for t in tqdm_asyncio.as_completed(
-                        tasks, total=len(tasks), desc=f"Writing {filename}", unit="doc"
-                    )
-                ]
-            else:
-                lines = [json.dumps(doc, ensure_ascii=False) + "\n" for doc in new_unique]
+    async def maintain_json_file(self, new_data, data_type="normal", fetch_type="live"):
+        """Hand the batch to the stream's day-partitioned archive; only waits when the stream falls behind."""
+        stream = ARCHIVE_STREAMS.get((data_type, fetch_type), "unknown_data")
+        try:
+            archive = self._archives.get(stream)
+            if archive is None:
+                archive = self._archives[stream] = DayPartitionedArchive(self.archive_dir, stream)
+            future = archive.submit(new_data)
+            future.add_done_callback(self._log_archived(stream))
+            if archive.pending > ARCHIVE_MAX_PENDING_BATCHES:
+                await asyncio.wrap_future(future)
+        except Exception as e:
+            self.logger.error(f"⚠️ Failed to maintain {stream} archive: {e}")
 
-            async with aiofiles.open(filepath, "a", encoding="utf-8") as f:
-                await f.writelines(lines)
-            async with aiofiles.open(index_path, "a", encoding="utf-8") as idx:
-                await idx.writelines(f"{doc['news_id']}\n" for doc in new_unique if "news_id" in doc)
+    # ------------------------ Live Watermark ------------------------
+    async def load_live_watermark(self, feed=LIVE_WATERMARK_FEED):
+        """Return the persisted lastnews_dt_tm for a feed, or None on first run / failure."""
+        try:
+            doc = await self.divider.collection_metadata_updates.find_one({"_id": feed})
+        except Exception as e:
+            self.logger.error(f"⚠️ Failed to load watermark for {feed}: {e}")
+            return None
+        if not doc or not isinstance(doc.get("lastnews_dt_tm"), datetime):
+            return None
+        return doc["lastnews_dt_tm"]
 
-            self.logger.info(f"✅ Appended {len(new_unique)} new records → {filename}")
+    async def save_live_watermark(self, lastnews_dt_tm, feed=LIVE_WATERMARK_FEED):
+        try:
+            await self.divider.collection_metadata_updates.update_one(
+                {"_id": feed},
+                {"$set": {"feed": feed, "lastnews_dt_tm": lastnews_dt_tm, "updated_at": datetime.now()}},
+                upsert=True,
+            )
         except Exception as e:
-            self.logger.error(f"⚠️ Failed to maintain {filename}: {e}")
+            self.logger.error(f"⚠️ Failed to persist watermark for {feed}: {e}")
 
     # ------------------------ Recheck Update Reports ------------------------
     async def temp_update_all_report_using_allannouncement(self, days_check=5, all_hist_days=False):
@@ -81,7 +128,7 @@ class BSEAnnouncementPipeline:
             tradedate_str = (datetime.now() - timedelta(days=days_check)).strftime("%Y-%m-%d 00:00:00")
             self.logger.info(f"🔁 Recheck: Processing announcements from the last {days_check} days (since {tradedate_str})...")
 
-        docs = await self.divider.collection_all_ann.find({"Tradedate": {"$gte": tradedate_str}, "category": {"$in":self.reports_cat}}).to_list(length=None)
+        docs = await self.divider.collection_all_ann.find({**range_filter("Tradedate", gte=tradedate_str), "category": {"$in": list(self.reports_cat)}}).to_list(length=None)
 
         if not docs:
             self.logger.info(f"⚠️ No announcements found to recheck since {tradedate_str}.")
@@ -91,45 +138,146 @@ class BSEAnnouncementPipeline:
         await self.divider.all_reports_runner(docs=docs, tradedate=tradedate_str)
         self.logger.info("✅ Recheck update completed — all relevant reports refreshed.")
 
+    # ------------------------ Categorize + Insert ------------------------
+    async def process_announcements(self, announcements, tradedate_str, fetch_type="live", until_str=None):
+        if self.maintain_json:
+            await self.maintain_json_file(announcements, data_type="normal", fetch_type=fetch_type)
+
+        self.logger.info(f"✅ Fetched {len(announcements)} announcements")
+        self.logger.info("📊 Step 2: Categorizing announcements...")
+        categorized_docs = await self.categorizer.run_formator(announcements, tradedate=tradedate_str, until=until_str, fetch_type=fetch_type)
+
+        if not categorized_docs:
+            self.logger.info("⚠️ No docs after filtering or categorization")
+            return True
+
+        if self.maintain_json:
+            await self.maintain_json_file(categorized_docs, data_type="filter", fetch_type=fetch_type)
+
+        self.logger.info(f"✅ Categorized {len(categorized_docs)} announcements")
+        self.logger.info("📍 Step 3: Dividing by category and inserting to collections...")
+        ok = await self.divider.divide_and_insert_docs(categorized_docs, tradedate=tradedate_str)
+        self.record_lag(categorized_docs, fetch_type)
+        return ok
+
+    @staticmethod
+    def record_lag(docs, fetch_type="live"):
+        """Seconds between now and the newest Tradedate in the batch (stored text sorts chronologically)."""
+        latest = max((d.get("Tradedate") for d in docs if isinstance(d.get("Tradedate"), str)), default=None)
+        latest_dt = parse_datetime(latest)
+        if latest_dt:
+            CYCLE_LAG_SECONDS.labels(fetch_type).set((datetime.now() - latest_dt).total_seconds())
+
+    # ------------------------ Streaming Historical ------------------------
+    async def fetch_and_process_hist_stream(self, from_date=None, to_date=None, resume=False, force_days=None):
+        """
+        Categorize and insert each tradedt as soon as it is fetched; memory is bounded by one day.
+        resume: skip days the ledger already marks completed.
+        force_days: re-run these days even if completed (alone, only these days are run).
+        """
+        self.logger.info("📡 Streaming Historical announcements day by day...")
+        forced = {d.strftime("%Y%m%d") for d in (force_days or [])}
+        skip_days = set()
+        if resume:
+            from_dt, to_dt = self.bse_client.hist_date_bounds(from_date, to_date)
+            skip_days = await self.hist_ledger.completed_days(from_dt, to_dt) - forced
+        explicit_days = force_days if force_days and not resume else None
+
+        total = 0
+        async for result in self.bse_client.iter_hist_announcements(from_date, to_date, skip_days=skip_days, days=explicit_days):
+            if result.is_failure:
+                await self.hist_ledger.mark(result.tradedt, HistBackfillLedger.FAILED, detail=f"{result.status.value}: {result.detail}")
+                continue
+            if not result.data:
+                await self.hist_ledger.mark(result.tradedt, HistBackfillLedger.COMPLETED)
+                continue
+
+            day = datetime.strptime(result.tradedt, "%Y%m%d")
+            payload_hash = self.hist_ledger.payload_hash(result.data)
+            record_count = len(result.data)
+            try:
+                ok = await self.process_announcements(
+                    result.data,
+                    tradedate_str=day.strftime("%Y-%m-%d 00:00:00"),
+                    fetch_type="hist",
+                    until_str=(day + timedelta(days=1)).strftime("%Y-%m-%d 00:00:00"),
+                )
+            except Exception as e:
+                self.logger.error(f"❌ Pipeline failed for {result.tradedt}: {e}", exc_info=False)
+                ok = False
+            status = HistBackfillLedger.COMPLETED if ok else HistBackfillLedger.FAILED
+            await self.hist_ledger.mark(result.tradedt, status, record_count=record_count, payload_hash=payload_hash)
+            total += record_count if ok else 0
+        self.logger.info(f"✅ Historical stream complete: {total} announcements processed.")
+        return total > 0
+
+    async def fetch_and_process_hist_batch(self, from_date, to_date):
+        """
+        BSE_INDIRA_HIST_STREAMING off: fetch the whole range, then categorize and insert it as one batch.
+        Every day still lands in the ledger, so a later --resume skips what this run stored.
+        """
+        self.logger.info("📡 Step 1: Fetching Historical announcements...")
+        results = [r async for r in self.bse_client.iter_hist_announcements(from_date, to_date)]
+        fetched = [r for r in results if not r.is_failure]
+        for result in results:
+            if result.is_failure:
+                await self.hist_ledger.mark(result.tradedt, HistBackfillLedger.FAILED, detail=f"{result.status.value}: {result.detail}")
+
+        announcements = [doc for r in fetched for doc in r.data]
+        self.logger.info(f"✅ Historical fetch complete: {len(announcements)} total records.")
+        ok = None
+        if announcements:
+            try:
+                ok = await self.process_announcements(announcements, from_date.strftime("%Y-%m-%d 00:00:00"), fetch_type="hist")
+            except Exception as e:
+                self.logger.error(f"❌ Pipeline failed during processing: {e}", exc_info=False)
+                ok = False
+        else:
+            self.logger.warning("⚠️ No announcements fetched.")
+
+        # one batch: its outcome is every fetched day's outcome
+        status = HistBackfillLedger.FAILED if ok is False else HistBackfillLedger.COMPLETED
+        for result in fetched:
+            payload_hash = self.hist_ledger.payload_hash(result.data) if result.data else None
+            await self.hist_ledger.mark(result.tradedt, status, record_count=len(result.data), payload_hash=payload_hash)
+        return ok
+
     # ------------------------ Main Fetching Logic ------------------------
-    async def fetch_and_process(self, fetch_type="live", from_date=None, to_date=None, lastnews_dt_tm=None):
+    async def fetch_and_process(self, fetch_type="live", from_date=None, to_date=None, lastnews_dt_tm=None, resume=False, force_days=None):
+        started = time.perf_counter()
+        result = "failed"
+        try:
+            ok = await self._fetch_and_process(fetch_type, from_date, to_date, lastnews_dt_tm, resume, force_days)
+            result = "ok" if ok else ("empty" if ok is None else "failed")
+            return bool(ok)
+        finally:
+            CYCLE_SECONDS.labels(fetch_type).observe(time.perf_counter() - started)
+            CYCLES.labels(fetch_type, result).inc()
+            LAST_CYCLE_TIMESTAMP.labels(fetch_type).set(time.time())
+
+    async def _fetch_and_process(self, fetch_type, from_date, to_date, lastnews_dt_tm, resume, force_days):
+        """True when the cycle stored its batch, None when there was nothing to fetch, False on failure."""
         try:
             if fetch_type == "hist" and from_date and to_date:
-                self.logger.info("📡 Step 1: Fetching Historical announcements...")
-                announcements = await self.bse_client.fetch_hist_announcements(from_date, to_date)
-                if not from_date:
-                    from_date = BSE_INDIRA_HIST_MIN_DATE
-                tradedate_str = from_date.strftime("%Y-%m-%d 00:00:00")
+                # --resume / --force-days pick days from the ledger, which only the per-day stream can honour
+                if BSE_INDIRA_HIST_STREAMING or resume or force_days:
+                    return await self.fetch_and_process_hist_stream(from_date, to_date, resume=resume, force_days=force_days)
+                return await self.fetch_and_process_hist_batch(from_date, to_date)
             else:
                 self.logger.info("📡 Step 1: Fetching Live announcements...")
                 announcements = await self.bse_client.fetch_live_announcements(lastnews_dt_tm)
-                if not lastnews_dt_tm:
-                    lastnews_dt_tm = (datetime.now() - timedelta(days=(BSE_INDIRA_LIVE_DATA_DAYS-1)))
-                tradedate_str = lastnews_dt_tm.strftime("%Y-%m-%d 00:00:00")
+                # dedup window must reach back to the oldest day the scheduler re-polled this cycle
+                live_from_dt = self.bse_client.last_live_from_dt or lastnews_dt_tm
+                if not live_from_dt:
+                    live_from_dt = (datetime.now() - timedelta(days=(BSE_INDIRA_LIVE_DATA_DAYS-1)))
+                tradedate_str = live_from_dt.strftime("%Y-%m-%d 00:00:00")
             
             if not announcements:
                 self.logger.warning("⚠️ No announcements fetched.")
-                return False
-
-            if self.maintain_json:
-                await self.maintain_json_file(announcements, data_type="normal", fetch_type=fetch_type)
+                return None
 
-            self.logger.info(f"✅ Fetched {len(announcements)} announcements")
-            self.logger.info("📊 Step 2: Categorizing announcements...")
-            categorized_docs = await self.categorizer.run_formator(announcements, tradedate=tradedate_str)
-
-            if not categorized_docs:
-                self.logger.info("⚠️ No docs after filtering or categorization")
-                return True
-
-            if self.maintain_json:
-                await self.maintain_json_file(categorized_docs, data_type="filter", fetch_type=fetch_type)
-
-            self.logger.info(f"✅ Categorized {len(categorized_docs)} announcements")
-            self.logger.info("📍 Step 3: Dividing by category and inserting to collections...")
-            await self.divider.divide_and_insert_docs(categorized_docs, tradedate=tradedate_str)
+            return await self.process_announcements(announcements, tradedate_str, fetch_type=fetch_type)
 
         except Exception as e:
             self.logger.error(f"❌ Pipeline failed during processing: {e}", exc_info=False)
-
-   
\ No newline at end of file
+            return False
@@ -0,0 +1,281 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from pymongo.errors import OperationFailure
+from config.constants import (
+    COMPANY_SYMBOL_MAP_QUERY,
+    COMPANY_MASTER_SNAPSHOT_PATH,
+    COMPANY_MASTER_REFRESH_MODE,
+    COMPANY_MASTER_REFRESH_MIN,
+    COMPANY_MASTER_UPDATED_FIELD,
+    COMPANY_MASTER_WATCH_DEBOUNCE_SEC,
+    COMPANY_MASTER_WATCH_BATCH_SIZE,
+    COMPANY_MASTER_SNAPSHOT_MIN_INTERVAL_SEC,
+)
+
+MASTER_PROJECTION = {"bsecode": 1, "nsesymbol": 1, "companyname": 1, "isin": 1}
+
+
+class CompanyMasterCache:
+    """
+    Process-wide CompanyMaster lookup (bsecode / ISIN -> company, symbolmap).
+    Starts from an on-disk snapshot, then refreshes in the background from a change
+    stream, an updated-at poll, or a periodic full reload — lookups never hit Mongo.
+    """
+
+    def __init__(self, snapshot_path=COMPANY_MASTER_SNAPSHOT_PATH, refresh_mode: str = COMPANY_MASTER_REFRESH_MODE,
+                 refresh_min: float = COMPANY_MASTER_REFRESH_MIN, updated_field: str = COMPANY_MASTER_UPDATED_FIELD,
+                 debounce_sec: float = COMPANY_MASTER_WATCH_DEBOUNCE_SEC, watch_batch_size: int = COMPANY_MASTER_WATCH_BATCH_SIZE,
+                 snapshot_min_interval_sec: float = COMPANY_MASTER_SNAPSHOT_MIN_INTERVAL_SEC):
+        self.snapshot_path = str(snapshot_path)
+        self.refresh_mode = refresh_mode  # "auto" (change stream, else poll) | "watch" | "poll" | "off"
+        self.refresh_interval_sec = refresh_min * 60
+        self.updated_field = updated_field
+        self.debounce_sec = debounce_sec
+        self.watch_batch_size = watch_batch_size
+        self.snapshot_min_interval_sec = snapshot_min_interval_sec
+        self._by_bse = {}   # "500325" -> {"company": isin, "symbolmap": {...}}
+        self._by_isin = {}  # isin -> same entry
+        self._bse_by_oid = {}  # Mongo _id (str) -> bsecode, so updates/deletes can drop the old entry
+        self.version = 0
+        self.loaded_at = None
+        self.source = None
+        self._since = None
+        self._task = None
+        self._snapshot_dirty = False
+        self._snapshot_saved_at = 0.0  # monotonic
+
+    def __len__(self):
+        return len(self._by_bse)
+
+    def __contains__(self, bsecode):
+        return str(bsecode) in self._by_bse
+
+    # ------------------ LOOKUP ------------------
+    @property
+    def by_bse(self) -> dict:
+        return self._by_bse
+
+    def get(self, bsecode, default=None):
+        return self._by_bse.get(str(bsecode), default)
+
+    def get_by_isin(self, isin, default=None):
+        return self._by_isin.get(isin, default)
+
+    # ------------------ BUILD ------------------
+    @staticmethod
+    def build_entry(doc: dict):
+        """Master document -> (bsecode, entry); None for documents without a usable bsecode."""
+        try:
+            bse = str(int(doc["bsecode"]))
+        except Exception:
+            return None
+        nse = doc.get("nsesymbol")
+        return bse, {
+            "company": doc.get("isin"),
+            "symbolmap": {
+                "NSE": nse,
+                "BSE": int(bse),
+                "Company_Name": (doc.get("companyname") or "").strip(),
+                "SELECTED": nse if nse else int(bse),
+            },
+        }
+
+    def _replace(self, docs, source: str):
+        by_bse, by_isin, by_oid = {}, {}, {}
+        for doc in docs:
+            built = self.build_entry(doc)
+            if not built:
+                continue
+            bse, entry = built
+            by_bse[bse] = entry
+            if entry["company"]:
+                by_isin[entry["company"]] = entry
+            if doc.get("_id") is not None:
+                by_oid[str(doc["_id"])] = bse
+        # swap whole maps so readers never see a half-built master
+        self._by_bse, self._by_isin, self._bse_by_oid = by_bse, by_isin, by_oid
+        self._changed(source)
+
+    def _drop(self, oid: str):
+        bse = self._bse_by_oid.pop(oid, None)
+        entry = self._by_bse.pop(bse, None) if bse else None
+        if entry and entry["company"]:
+            self._by_isin.pop(entry["company"], None)
+
+    def _changed(self, source: str):
+        self.version += 1
+        self.loaded_at = datetime.now()
+        self.source = source
+
+    # ------------------ SNAPSHOT ------------------
+    def load_snapshot(self, logger=None) -> bool:
+        if not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            self._replace(payload["docs"], source="snapshot")
+            self._since = payload.get("since")
+        except Exception as e:
+            if logger:
+                logger.error(f"⚠️ Company master snapshot unreadable, ignoring it: {e}")
+            return False
+        if logger:
+            logger.info(f"📦 Company master loaded from snapshot: {len(self)} companies ({payload.get('saved_at')})")
+        return True
+
+    def save_snapshot(self, logger=None):
+        """Atomic write (tmp + replace) of the raw master fields the entries are rebuilt from."""
+        docs = [
+            {"_id": oid, "bsecode": bse, "isin": self._by_bse[bse]["company"],
+             "nsesymbol": self._by_bse[bse]["symbolmap"]["NSE"],
+             "companyname": self._by_bse[bse]["symbolmap"]["Company_Name"]}
+            for oid, bse in self._bse_by_oid.items() if bse in self._by_bse
+        ]
+        payload = {"saved_at": datetime.now().isoformat(timespec="seconds"), "since": self._since, "docs": docs}
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+            tmp = f"{self.snapshot_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(payload, f, default=str)
+            os.replace(tmp, self.snapshot_path)
+            self._snapshot_dirty = False
+            self._snapshot_saved_at = time.monotonic()
+        except Exception as e:
+            if logger:
+                logger.error(f"⚠️ Company master snapshot not saved: {e}")
+
+    async def flush_snapshot(self, logger=None, force: bool = False):
+        """Write pending incremental changes, at most once per snapshot_min_interval_sec unless forced."""
+        if not self._snapshot_dirty:
+            return
+        if force or time.monotonic() - self._snapshot_saved_at >= self.snapshot_min_interval_sec:
+            await asyncio.to_thread(self.save_snapshot, logger)
+
+    # ------------------ MONGO LOADS ------------------
+    def load_sync(self, collection_sync, logger=None):
+        """Blocking full load; only used on a cold start without a snapshot."""
+        started = datetime.now()
+        self._replace(collection_sync.find(COMPANY_SYMBOL_MAP_QUERY, MASTER_PROJECTION), source="mongo")
+        self._since = started.isoformat()
+        self.save_snapshot(logger)
+        if logger:
+            logger.info(f"✅ Company master loaded: {len(self)} companies.")
+
+    async def reload(self, collection, logger=None):
+        started = datetime.now()
+        docs = [d async for d in collection.find(COMPANY_SYMBOL_MAP_QUERY, MASTER_PROJECTION)]
+        before = len(self)
+        self._replace(docs, source="mongo")
+        self._since = started.isoformat()
+        await asyncio.to_thread(self.save_snapshot, logger)
+        if logger:
+            logger.info(f"🔄 Company master reloaded: {len(self)} companies ({len(self) - before:+d})")
+
+    async def apply_changes(self, collection, oids: list, logger=None):
+        """Re-read changed master docs; ones that no longer match COMPANY_SYMBOL_MAP_QUERY drop out."""
+        if not oids:
+            return
+        eligible = [
+            d async for d in collection.find({"$and": [{"_id": {"$in": oids}}, COMPANY_SYMBOL_MAP_QUERY]}, MASTER_PROJECTION)
+        ]
+        for oid in oids:
+            self._drop(str(oid))
+        for doc in eligible:
+            built = self.build_entry(doc)
+            if not built:
+                continue
+            bse, entry = built
+            self._by_bse[bse] = entry
+            if entry["company"]:
+                self._by_isin[entry["company"]] = entry
+            self._bse_by_oid[str(doc["_id"])] = bse
+        self._changed("incremental")
+        self._snapshot_dirty = True
+        await self.flush_snapshot(logger)
+        if logger:
+            logger.info(f"🔄 Company master: {len(oids)} changed docs applied, {len(self)} companies")
+
+    # ------------------ BACKGROUND REFRESH ------------------
+    async def _watch(self, collection, logger=None):
+        """Changed _ids are buffered for debounce_sec (or watch_batch_size ids) and re-read in one find."""
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+        # try_next waits at most this long on the server, so a quiet stream still flushes the buffer
+        max_await_ms = max(100, int(self.debounce_sec * 1000))
+        async with collection.watch(pipeline, max_await_time_ms=max_await_ms) as stream:
+            if logger:
+                logger.info("👀 Company master following the CompanyMaster change stream")
+            pending, first_at = {}, None
+            while stream.alive:
+                change = await stream.try_next()
+                if change is not None:
+                    oid = change["documentKey"]["_id"]
+                    pending[str(oid)] = oid
+                    first_at = first_at or time.monotonic()
+                    if len(pending) < self.watch_batch_size and time.monotonic() - first_at < self.debounce_sec:
+                        continue
+                if pending:
+                    await self.apply_changes(collection, list(pending.values()), logger)
+                    pending, first_at = {}, None
+                else:
+                    await self.flush_snapshot(logger)
+
+    async def refresh(self, collection, logger=None):
+        """Updated-at delta when the master has such a field, full reload otherwise."""
+        try:
+            if self.updated_field and self._since:
+                started = datetime.now()
+                since = datetime.fromisoformat(self._since)
+                oids = [d["_id"] async for d in collection.find({self.updated_field: {"$gt": since}}, {"_id": 1})]
+                await self.apply_changes(collection, oids, logger)
+                self._since = started.isoformat()
+            else:
+                await self.reload(collection, logger)
+        except Exception as e:
+            if logger:
+                logger.error(f"⚠️ Company master refresh failed, keeping current map: {e}")
+
+    async def _poll(self, collection, logger=None):
+        while True:
+            await asyncio.sleep(self.refresh_interval_sec)
+            await self.refresh(collection, logger)
+
+    async def _run(self, collection, logger=None):
+        if self.source == "snapshot":
+            # catch up on whatever changed while the process was down
+            await self.refresh(collection, logger)
+        if self.refresh_mode in ("auto", "watch"):
+            try:
+                await self._watch(collection, logger)
+                return
+            except OperationFailure as e:
+                # standalone servers have no change streams
+                if self.refresh_mode == "watch":
+                    if logger:
+                        logger.error(f"❌ Company master change stream unavailable: {e}")
+                    return
+                if logger:
+                    logger.info(f"ℹ️ Change stream unavailable ({e.code}), polling CompanyMaster every {self.refresh_interval_sec / 60:g} min")
+            except Exception as e:
+                if logger:
+                    logger.error(f"⚠️ Company master change stream stopped, falling back to polling: {e}")
+        await self._poll(collection, logger)
+
+    def start(self, collection, logger=None):
+        """Start the background refresh task once per process."""
+        if self.refresh_mode == "off" or (self._task and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._run(collection, logger))
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush_snapshot(force=True)
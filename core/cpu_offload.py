@@ -0,0 +1,77 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from config.constants import (
+    CPU_OFFLOAD_MODE,
+    CPU_OFFLOAD_WORKERS,
+    CPU_OFFLOAD_CHUNK_SIZE,
+    CPU_OFFLOAD_MAX_IN_FLIGHT,
+)
+
+
+class CpuOffloader:
+    """
+    Runs CPU-bound batch work (categorization, report formatting) off the event loop.
+    mode "thread" / "process" use a pool of `workers`; "off" runs inline on the loop.
+    At most `max_in_flight` chunks are queued on the pool at a time, so a large backfill
+    cannot pile the whole day into executor memory. Process mode only accepts module-level
+    functions and picklable arguments.
+    """
+
+    MODES = ("off", "thread", "process")
+
+    def __init__(self, mode: str = CPU_OFFLOAD_MODE, workers: int = CPU_OFFLOAD_WORKERS,
+                 chunk_size: int = CPU_OFFLOAD_CHUNK_SIZE, max_in_flight: int = CPU_OFFLOAD_MAX_IN_FLIGHT, logger=None):
+        if mode not in self.MODES:
+            raise ValueError(f"CPU offload mode must be one of {self.MODES}, got {mode!r}")
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.max_in_flight = max_in_flight or self.workers * 2
+        self.logger = logger
+        self._executor = None
+        self._slots = None
+        self._slots_loop = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.mode == "thread":
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cpu-offload")
+            else:
+                # spawn: never fork a process that holds Mongo client threads and an event loop
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            if self.logger:
+                self.logger.info(f"🧮 CPU offload pool started | mode: {self.mode} | workers: {self.workers} | in-flight: {self.max_in_flight}")
+        return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        """fn(*args, **kwargs) on the pool (inline when off), holding one in-flight slot."""
+        if not self.enabled:
+            return fn(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots, self._slots_loop = asyncio.Semaphore(self.max_in_flight), loop
+        async with self._slots:
+            return await loop.run_in_executor(self._get_executor(), partial(fn, *args, **kwargs))
+
+    def chunks(self, items: list) -> list:
+        """Whole list when off (identical to the inline path), chunk_size slices otherwise."""
+        if not self.enabled or len(items) <= self.chunk_size:
+            return [items]
+        return [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+
+    async def map(self, fn, arg_tuples: list) -> list:
+        """fn(*args) for every tuple, results in input order."""
+        return list(await asyncio.gather(*(self.run(fn, *args) for args in arg_tuples)))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._slots = self._slots_loop = None
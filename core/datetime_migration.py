@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime
+from pymongo import UpdateOne
+from config.constants import DATETIME_MIGRATION_BATCH_SIZE, DATETIME_MIGRATION_PAUSE_SEC
+from utils.date_parser import parse_datetime
+
+MIGRATION_MARKER = "native_datetime_migration"
+
+
+class DatetimeMigration:
+    """
+    Background conversion of string Tradedate / dt_tm values to BSON dates, batch by batch.
+    Each update is conditioned on the old string, so documents rewritten meanwhile are left alone;
+    reads use utils.date_parser.range_filter and see both forms until the marker is set.
+    """
+
+    def __init__(self, metadata_collection, targets: list, logger, batch_size: int = DATETIME_MIGRATION_BATCH_SIZE,
+                 pause_sec: float = DATETIME_MIGRATION_PAUSE_SEC):
+        self.metadata = metadata_collection
+        self.targets = targets  # [(collection, field), ...]
+        self.logger = logger
+        self.batch_size = batch_size
+        self.pause_sec = pause_sec
+        self._task = None
+
+    async def is_done(self) -> bool:
+        marker = await self.metadata.find_one({"_id": MIGRATION_MARKER})
+        return bool(marker and marker.get("completed_at"))
+
+    async def migrate_field(self, collection, field: str) -> int:
+        converted, unparseable = 0, set()
+        while True:
+            query = {field: {"$type": "string"}}
+            if unparseable:
+                query["_id"] = {"$nin": list(unparseable)}
+            docs = await collection.find(query, {"_id": 1, field: 1}).limit(self.batch_size).to_list(length=None)
+            if not docs:
+                break
+            ops = []
+            for d in docs:
+                value = parse_datetime(d[field])
+                if value is None:
+                    unparseable.add(d["_id"])
+                    continue
+                ops.append(UpdateOne({"_id": d["_id"], field: d[field]}, {"$set": {field: value}}))
+            if ops:
+                result = await collection.bulk_write(ops, ordered=False)
+                converted += result.modified_count
+            self.logger.info(f"🕰️ {collection.name}.{field}: {converted} converted so far")
+            await asyncio.sleep(self.pause_sec)
+        if unparseable:
+            self.logger.error(f"⚠️ {collection.name}.{field}: {len(unparseable)} values could not be parsed and stay strings")
+        return converted
+
+    async def run(self):
+        try:
+            if await self.is_done():
+                return
+            counts = {}
+            for collection, field in self.targets:
+                counts[f"{collection.name}.{field}"] = await self.migrate_field(collection, field)
+            await self.metadata.update_one(
+                {"_id": MIGRATION_MARKER},
+                {"$set": {"converted": counts, "completed_at": datetime.now()}},
+                upsert=True,
+            )
+            self.logger.info(f"✅ Native datetime migration complete: {counts}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.error(f"❌ Native datetime migration stopped, will resume on next start: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
@@ -0,0 +1,48 @@
+import json
+import hashlib
+from datetime import datetime
+
+
+class HistBackfillLedger:
+    """Per-tradedt completion ledger so an interrupted --hist run can resume."""
+
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+    def __init__(self, collection, logger):
+        self.collection = collection
+        self.logger = logger
+
+    @staticmethod
+    def payload_hash(data: list) -> str:
+        raw = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    async def completed_days(self, from_dt: datetime, to_dt: datetime) -> set:
+        """tradedt strings (YYYYMMDD) already completed within the range."""
+        try:
+            days = await self.collection.distinct(
+                "_id",
+                {"_id": {"$gte": from_dt.strftime("%Y%m%d"), "$lte": to_dt.strftime("%Y%m%d")}, "status": self.COMPLETED},
+            )
+        except Exception as e:
+            self.logger.error(f"⚠️ Failed to read backfill ledger: {e}")
+            return set()
+        return set(days)
+
+    async def mark(self, tradedt: str, status: str, record_count: int = 0, payload_hash: str = None, detail: str = ""):
+        try:
+            await self.collection.update_one(
+                {"_id": tradedt},
+                {"$set": {
+                    "tradedt": tradedt,
+                    "status": status,
+                    "record_count": record_count,
+                    "payload_hash": payload_hash,
+                    "detail": detail,
+                    "updated_at": datetime.now(),
+                }},
+                upsert=True,
+            )
+        except Exception as e:
+            self.logger.error(f"⚠️ Failed to update backfill ledger for {tradedt}: {e}")
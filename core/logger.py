@@ -1,24 +1,165 @@
+import atexit
+import copy
+import json
 import logging
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from concurrent_log_handler import ConcurrentTimedRotatingFileHandler
-from config.constants import LOG_DIR, LOG_RETENTION_DAYS
+from config.constants import (
+    LOG_DIR,
+    LOG_LEVEL,
+    LOG_RETENTION_DAYS,
+    LOG_FORMAT,
+    LOG_RATE_LIMIT_BURST,
+    LOG_RATE_LIMIT_WINDOW_SEC,
+)
 
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+# dates, timestamps and long ids vary per record; short numbers (HTTP status, retry n/m) stay in the key
+_VOLATILE = re.compile(r"\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2})?(?:\.\d+)?)?|\d{2}/\d{2}/\d{4}|\d{5,}")
 
-def get_logger(name: str = "bse_pipeline", save_time_logs: bool = True) -> logging.Logger:
+
+# ------------------ FORMATTERS ------------------
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg (+ exc when a traceback was logged)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        # _QueueHandler.prepare has already rendered the traceback into exc_text
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _formatter(fmt: str = LOG_FORMAT) -> logging.Formatter:
+    return JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+
+
+# ------------------ RATE LIMIT ------------------
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most `burst` WARNING records per (logger, message shape) per window; ERROR and
+    above always pass. Dates and long ids are ignored, so "Retry 1/3 failed for 20240504 (HTTP 503)"
+    and "... 20240505 (HTTP 503)" count together while another status or attempt gets its own bucket.
+    The first record after a window with drops reports how many similar ones were suppressed.
     """
-    Create a logger. If save_time_logs=True -> rotate daily.
-    If False -> single static log file with no rotation need """
-    logger = logging.getLogger(name)
 
-    if logger.handlers:
-        return logger
+    def __init__(self, burst: int = LOG_RATE_LIMIT_BURST, window_sec: float = LOG_RATE_LIMIT_WINDOW_SEC):
+        super().__init__()
+        self.burst = burst
+        self.window_sec = window_sec
+        self._windows = {}  # key -> [window_start, passed, suppressed]
+        self._lock = threading.Lock()  # offload threads log too
 
-    logger.setLevel(logging.INFO)
-    logger.propagate = False
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0 or record.levelno != logging.WARNING:
+            return True
+        key = (record.name, _VOLATILE.sub("#", str(record.msg)))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.window_sec:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if len(self._windows) > 10_000:
+                    self._evict(now)
+                if suppressed:
+                    record.msg = f"{record.getMessage()} (+{suppressed} similar suppressed in the last window)"
+                    record.args = None
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+    def _evict(self, now: float):
+        for key in [k for k, w in self._windows.items() if now - w[0] >= self.window_sec and not w[2]]:
+            del self._windows[key]
+
+
+# ------------------ BACKGROUND LISTENER ------------------
+class _QueueHandler(QueueHandler):
+    """Like QueueHandler, but the traceback stays in exc_text instead of being folded into msg."""
+
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+        record.exc_info = None  # tracebacks and frames do not need to cross the queue
+        return record
+
+
+class _RoutingHandler(logging.Handler):
+    """Runs on the listener thread: each logger's file handler, plus one shared console handler."""
+
+    def __init__(self):
+        super().__init__()
+        self.files = {}
+        self.console = logging.StreamHandler()
+        self.console.setFormatter(_formatter())
+        self.console.setLevel(logging.INFO)
 
-    file_name = f"{name}.log"
-    log_path = LOG_DIR / file_name
+    def emit(self, record: logging.LogRecord):
+        handler = self.files.get(record.name)
+        if handler is not None:
+            handler.handle(record)
+        if record.levelno >= self.console.level:
+            self.console.handle(record)
 
-    # choose handler based on flag
+    def close(self):
+        for handler in list(self.files.values()):
+            handler.close()
+        self.console.close()
+        super().close()
+
+
+class _LogQueue:
+    """Process-wide queue + listener thread; file locks and disk I/O never run on the event loop."""
+
+    queue = None
+    listener = None
+    router = None
+    rate_limit = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def start(cls):
+        with cls._lock:
+            if cls.listener is None:
+                cls.queue = queue.SimpleQueue()
+                cls.router = _RoutingHandler()
+                cls.rate_limit = RateLimitFilter()
+                cls.listener = QueueListener(cls.queue, cls.router, respect_handler_level=False)
+                cls.listener.start()
+                atexit.register(cls.stop)
+        return cls
+
+    @classmethod
+    def stop(cls):
+        """Drain the queue and close the handlers (atexit; safe to call more than once)."""
+        with cls._lock:
+            if cls.listener is not None:
+                cls.listener.stop()
+                cls.router.close()
+                cls.listener = None
+
+
+def _file_handler(name: str, save_time_logs: bool) -> logging.Handler:
+    log_path = LOG_DIR / f"{name}.log"
     if save_time_logs:
         handler = ConcurrentTimedRotatingFileHandler(
             filename=str(log_path),
@@ -29,17 +170,29 @@ def get_logger(name: str = "bse_pipeline", save_time_logs: bool = True) -> loggi
         )
     else:
         handler = logging.FileHandler(str(log_path), encoding="utf-8")
+    handler.setFormatter(_formatter())
+    return handler
 
-    formatter = logging.Formatter(
-        "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
 
-    # console handler for dev
-    console = logging.StreamHandler()
-    console.setFormatter(formatter)
-    console.setLevel(logging.INFO)
-    logger.addHandler(console)
+def get_logger(name: str = "bse_pipeline", save_time_logs: bool = True) -> logging.Logger:
+    """
+    Create a logger. If save_time_logs=True -> rotate daily.
+    If False -> single static log file with no rotation need.
+    Records only go onto a queue here; a background listener thread writes them out.
+    """
+    logger = logging.getLogger(name)
+
+    if logger.handlers:
+        return logger
+
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+    log_queue = _LogQueue.start()
+    log_queue.router.files.setdefault(name, _file_handler(name, save_time_logs))
+
+    handler = _QueueHandler(log_queue.queue)
+    handler.addFilter(log_queue.rate_limit)
+    logger.addHandler(handler)
 
     return logger
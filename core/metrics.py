@@ -0,0 +1,228 @@
+import math
+from bisect import bisect_left
+from aiohttp import web
+
+# request / batch / cycle latencies in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    """
+    One metric family with optional labels. Children are created once per label tuple and
+    should be looked up once by hot paths (metric.labels(...)) and reused; updates are plain
+    attribute arithmetic on the event-loop thread, so no locks are taken.
+    """
+
+    kind = None
+    _child = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        return self._child()
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _label_str(self, key: tuple, extra: str = "") -> str:
+        pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            lines.append(f"{self.name}{self._label_str(key)} {_fmt(child.value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+    _child = _CounterChild
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+    _child = _GaugeChild
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            cumulative = 0
+            for bound, n in zip(self.bounds + (math.inf,), child.counts):
+                cumulative += n
+                le = 'le="' + _fmt(bound) + '"'
+                lines.append(f"{self.name}_bucket{self._label_str(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_str(key)} {_fmt(child.sum)}")
+            lines.append(f"{self.name}_count{self._label_str(key)} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide set of metric families, rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, cls, name, documentation, labelnames=(), **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+        elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"metric {name} already registered as {metric.kind} {metric.labelnames}")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# ------------------ PIPELINE METRICS ------------------
+API_REQUESTS = REGISTRY.counter("bse_api_requests_total", "BSE API attempts by outcome", ("fetch_type", "status"))
+API_REQUEST_SECONDS = REGISTRY.histogram("bse_api_request_seconds", "BSE API attempt latency", ("fetch_type",))
+API_RETRIES = REGISTRY.counter("bse_api_retries_total", "BSE API attempts retried after a transient failure", ("fetch_type",))
+API_CONCURRENCY_LIMIT = REGISTRY.gauge("bse_api_concurrency_limit", "Adaptive BSE API concurrency limit")
+
+RECORDS = REGISTRY.counter(
+    "bse_records_total",
+    "Announcements by stage: fetched (API), deduped (already stored), filtered_out (non-PDF / unknown scrip / bad Tradedate), categorized",
+    ("fetch_type", "stage"),
+)
+CATEGORIZE_SECONDS = REGISTRY.histogram("bse_categorize_seconds", "Categorization time per batch", ("engine",))
+
+MONGO_BATCH_SECONDS = REGISTRY.histogram("bse_mongo_batch_seconds", "Mongo write latency per batch", ("collection", "mode"))
+MONGO_DOCS = REGISTRY.counter("bse_mongo_docs_total", "Documents written by result", ("collection", "result"))
+MONGO_FAILED_BATCHES = REGISTRY.counter("bse_mongo_failed_batches_total", "Mongo batches that failed outright", ("collection",))
+
+CYCLES = REGISTRY.counter("bse_pipeline_cycles_total", "fetch_and_process runs by result", ("fetch_type", "result"))
+CYCLE_SECONDS = REGISTRY.histogram("bse_pipeline_cycle_seconds", "fetch_and_process duration", ("fetch_type",))
+CYCLE_LAG_SECONDS = REGISTRY.gauge("bse_pipeline_cycle_lag_seconds", "Cycle end minus the latest Tradedate it categorized", ("fetch_type",))
+LAST_CYCLE_TIMESTAMP = REGISTRY.gauge("bse_pipeline_last_cycle_timestamp_seconds", "Unix time the last cycle finished", ("fetch_type",))
+
+
+# ------------------ HTTP ENDPOINT ------------------
+class MetricsServer:
+    """Serves REGISTRY at GET /metrics from the pipeline's own event loop."""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = "127.0.0.1", port: int = 9108, logger=None):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.logger = logger
+        self._runner = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.registry.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        self._runner = web.AppRunner(app, handle_signals=False, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as e:
+            await self._runner.cleanup()
+            self._runner = None
+            if self.logger:
+                self.logger.error(f"❌ Metrics endpoint not started on {self.host}:{self.port}: {e}")
+            return
+        if self.logger:
+            self.logger.info(f"📈 Metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
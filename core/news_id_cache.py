@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from config.constants import NEWS_ID_CACHE_WINDOW_DAYS, NEWS_ID_CACHE_RECONCILE_MIN
+from utils.date_parser import range_filter
+
+
+class NewsIdCache:
+    """
+    Resident news_id set keyed by Tradedate day, evicted once a day leaves the window.
+    Seeded once from AllAnnouncements, fed by successful inserts, re-seeded periodically
+    so inserts made by other processes are picked up.
+    """
+
+    def __init__(self, window_days: int = NEWS_ID_CACHE_WINDOW_DAYS, reconcile_min: int = NEWS_ID_CACHE_RECONCILE_MIN):
+        self.window_days = window_days
+        self.reconcile_interval = timedelta(minutes=reconcile_min)
+        self._days = {}    # "YYYY-MM-DD" -> set(news_id)
+        self._index = {}   # news_id -> "YYYY-MM-DD"
+        self.seeded_at = None
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, news_id):
+        return news_id in self._index
+
+    def window_start(self, now: datetime = None) -> str:
+        now = now or datetime.now()
+        return (now - timedelta(days=self.window_days - 1)).strftime("%Y-%m-%d")
+
+    @property
+    def is_seeded(self) -> bool:
+        return self.seeded_at is not None
+
+    def needs_reconcile(self, now: datetime = None) -> bool:
+        return not self.is_seeded or (now or datetime.now()) - self.seeded_at >= self.reconcile_interval
+
+    # ------------------ MUTATION ------------------
+    def _add(self, news_id: str, day: str):
+        if news_id in self._index:
+            return
+        self._days.setdefault(day, set()).add(news_id)
+        self._index[news_id] = day
+
+    def add_docs(self, docs):
+        """Record inserted announcements; days outside the window are ignored."""
+        start = self.window_start()
+        for doc in docs:
+            news_id = doc.get("news_id")
+            day = str(doc.get("Tradedate", ""))[:10]
+            if news_id and day >= start:
+                self._add(news_id, day)
+
+    def evict(self, now: datetime = None):
+        start = self.window_start(now)
+        for day in [d for d in self._days if d < start]:
+            for news_id in self._days.pop(day):
+                self._index.pop(news_id, None)
+
+    async def seed(self, collection, logger=None):
+        """(Re)load the window from Mongo; replaces the resident contents."""
+        start = self.window_start()
+        days, index = {}, {}
+        cursor = collection.find(range_filter("Tradedate", gte=f"{start} 00:00:00"), {"_id": 0, "news_id": 1, "Tradedate": 1})
+        async for doc in cursor:
+            news_id = doc.get("news_id")
+            if news_id:
+                day = str(doc.get("Tradedate", ""))[:10]
+                days.setdefault(day, set()).add(news_id)
+                index[news_id] = day
+        self._days, self._index = days, index
+        self.seeded_at = datetime.now()
+        if logger:
+            logger.info(f"🗂️ news_id cache seeded: {len(index)} ids across {len(days)} days (since {start})")
+
+    # ------------------ LOOKUP ------------------
+    async def existing_ids(self, collection, candidate_ids) -> set:
+        """Cache hits plus a Mongo $in lookup for the misses only — cost scales with new data."""
+        candidates = set(candidate_ids)
+        hits = {nid for nid in candidates if nid in self._index}
+        misses = list(candidates - hits)
+        if misses:
+            cursor = collection.find({"news_id": {"$in": misses}}, {"_id": 0, "news_id": 1})
+            hits.update([doc["news_id"] async for doc in cursor if doc.get("news_id")])
+        return hits
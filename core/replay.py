@@ -0,0 +1,175 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from config.constants import ARCHIVE_DIR, REPLAY_STREAM, REPLAY_BATCH_SIZE, REPLAY_PREFETCH_BATCHES
+from utils.jsonl_archive import DayPartitionedArchive, iter_records, partition_of
+
+
+class ArchiveReplay:
+    """
+    Feeds archived raw announcements through FilterCategorize and ReportsDivider without the BSE API.
+    Records are re-categorized even when already stored and written in upsert mode, so changed
+    CATEGORY_MAP rules overwrite the stored category. With shadow_suffix every write goes to
+    <collection><suffix> instead. Reading and parsing run on a thread, at most `prefetch` batches ahead.
+    """
+
+    def __init__(self, pipeline, batch_size: int = REPLAY_BATCH_SIZE, shadow_suffix: str = None,
+                 prefetch: int = REPLAY_PREFETCH_BATCHES, archive_dir=ARCHIVE_DIR, stream: str = REPLAY_STREAM):
+        self.pipeline = pipeline
+        self.logger = pipeline.logger
+        self.batch_size = batch_size
+        self.prefetch = max(1, prefetch)
+        self.archive = DayPartitionedArchive(archive_dir, stream)
+        self.legacy_path = os.path.join(str(archive_dir), f"{stream}.jsonl")
+        self.bad_lines = []
+        self._shadow_counters_pending = False  # set once writes go to shadow collections
+        if shadow_suffix:
+            self.use_shadow_collections(shadow_suffix)
+
+    def use_shadow_collections(self, suffix: str):
+        """Point announcement, report and report_id counter writes at <name><suffix>."""
+        divider, categorizer = self.pipeline.divider, self.pipeline.categorizer
+        self._shadow_counters_pending = True
+        for attr in ("collection_all_ann", "collection_all_reports", "collection_report_counters"):
+            shadow = divider.db_async[f"{getattr(divider, attr).name}{suffix}"]
+            setattr(divider, attr, shadow)
+            setattr(categorizer, attr, shadow)
+        divider.upsert_keys = {divider.collection_all_ann.name: "news_id", divider.collection_all_reports.name: "report_id"}
+        self.logger.info(f"🪞 Replay writes to shadow collections: {divider.collection_all_ann.name}, {divider.collection_all_reports.name}")
+
+    async def seed_shadow_counters(self):
+        """
+        Shadow counters start from the shadow AllReports' own highest _N (none for a fresh shadow), so a
+        fresh shadow numbers from _1 like production did and its report_ids can be diffed against production's.
+        Production counters are never read: they would offset every shadow id. Runs once per replay.
+        """
+        self._shadow_counters_pending = False
+        divider = self.pipeline.divider
+        try:
+            max_seq = await divider.max_report_sequences(divider.collection_all_reports)
+            seeded = await divider.raise_report_counters(divider.collection_report_counters, max_seq)
+            divider.report_counters_ready = True
+            self.logger.info(f"🔢 Seeded {seeded} shadow report_id counters from {divider.collection_all_reports.name}")
+        except Exception as e:
+            # the fallback numbers from the shadow AllReports report_ids instead
+            divider.report_counters_ready = False
+            self.logger.error(f"❌ Shadow report_id counter seeding failed, falling back to scanning report_ids: {e}")
+
+    # ------------------ SOURCES (reader thread) ------------------
+    def _records(self, source):
+        """source: archive file path, or (from_day, to_day) datetimes over the stream's day partitions."""
+        if isinstance(source, tuple):
+            from_day, to_day = (d.strftime("%Y-%m-%d") for d in source)
+            days = self.archive.partitions(from_day, to_day)
+            if days:
+                self.logger.info(f"📂 Replaying {len(days)} partitions of {self.archive.stream}: {days[0]} → {days[-1]}")
+                for day in days:
+                    yield from self.archive.iter_partition(day, self.bad_lines)
+                return
+            if not os.path.exists(self.legacy_path):
+                self.logger.warning(f"⚠️ No {self.archive.stream} partitions between {from_day} and {to_day}")
+                return
+            # flat pre-partition archive: one scan, keeping only the requested days
+            self.logger.info(f"📂 No partitions for {from_day} → {to_day}, scanning {self.legacy_path}")
+            for doc in iter_records(self.legacy_path, self.bad_lines):
+                if isinstance(doc, dict) and from_day <= partition_of(doc) <= to_day:
+                    yield doc
+            return
+        self.logger.info(f"📂 Replaying {source}")
+        yield from iter_records(source, self.bad_lines)
+
+    def batches(self, source):
+        batch = []
+        for doc in self._records(source):
+            if isinstance(doc, dict):
+                batch.append(doc)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    # ------------------ RUN ------------------
+    async def _produce(self, source, queue: asyncio.Queue):
+        batches = self.batches(source)
+        try:
+            while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+                await queue.put(batch)
+        finally:
+            await queue.put(None)
+
+    async def process_batch(self, batch: list) -> tuple:
+        """(categorized, ok, reports removed for re-keying) for one batch."""
+        divider = self.pipeline.divider
+        categorized = await self.pipeline.categorizer.run_formator(batch, tradedate=None, fetch_type="replay", dedup=False)
+        if not categorized:
+            return 0, True, 0
+        # reports whose category changed must go before the insert, or their news_id blocks the new report_id
+        removed = await divider.reconcile_reports(categorized)
+        tradedate = min(d["Tradedate"] for d in categorized)
+        ok = await divider.divide_and_insert_docs(categorized, tradedate=tradedate)
+        return len(categorized), ok, removed
+
+    async def run(self, source) -> dict:
+        divider = self.pipeline.divider
+        if self._shadow_counters_pending:
+            await self.seed_shadow_counters()
+        write_mode, divider.write_mode = divider.write_mode, "upsert"
+        queue = asyncio.Queue(maxsize=self.prefetch)
+        producer = asyncio.create_task(self._produce(source, queue))
+        started = time.perf_counter()
+        stats = {"batches": 0, "records": 0, "categorized": 0, "reports_rekeyed_or_removed": 0, "failed_batches": 0}
+        try:
+            while (batch := await queue.get()) is not None:
+                stats["batches"] += 1
+                stats["records"] += len(batch)
+                try:
+                    categorized, ok, removed = await self.process_batch(batch)
+                except Exception as e:
+                    self.logger.error(f"❌ Replay batch {stats['batches']} failed: {e}")
+                    categorized, ok, removed = 0, False, 0
+                stats["categorized"] += categorized
+                stats["reports_rekeyed_or_removed"] += removed
+                stats["failed_batches"] += not ok
+                elapsed = time.perf_counter() - started
+                self.logger.info(
+                    f"🔁 Replay batch {stats['batches']}: {len(batch)} read, {categorized} categorized | "
+                    f"{stats['records']} total, {stats['records'] / elapsed:.0f} rec/s"
+                )
+            await producer  # surfaces reader errors (missing file, bad codec)
+        finally:
+            divider.write_mode = write_mode
+            if not producer.done():
+                producer.cancel()
+
+        stats["bad_lines"] = len(self.bad_lines)
+        stats["seconds"] = time.perf_counter() - started
+        self.logger.info(
+            f"✅ Replay complete: {stats['records']} records, {stats['categorized']} categorized in {stats['batches']} batches, "
+            f"{stats['reports_rekeyed_or_removed']} reports with a changed category "
+            f"({stats['failed_batches']} failed, {stats['bad_lines']} unreadable lines) in {stats['seconds']:.1f}s"
+        )
+        return stats
+
+
+def parse_replay_source(value: str):
+    """
+    "YYYY-MM-DD" / "YYYYMMDD" (one day), "FROM:TO" (inclusive range) -> (from, to) datetimes;
+    anything else must be an existing archive file.
+    """
+    def _day(part):
+        for fmt in ("%Y-%m-%d", "%Y%m%d"):
+            try:
+                return datetime.strptime(part.strip(), fmt)
+            except ValueError:
+                continue
+        return None
+
+    parts = value.split(":")
+    days = [_day(p) for p in parts] if len(parts) <= 2 else [None]
+    if all(days):
+        return (min(days[0], days[-1]), max(days[0], days[-1]))
+    if os.path.isfile(value):
+        return value
+    raise ValueError(f"--replay expects an archive file or YYYY-MM-DD[:YYYY-MM-DD], got {value!r}")
@@ -3,6 +3,9 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo import MongoClient
 from config.settings import MONGO_URI
 from core.logger import get_logger
+from core.news_id_cache import NewsIdCache
+from core.company_master import CompanyMasterCache
+from core.cpu_offload import CpuOffloader
 
 
 class SharedResources:
@@ -10,6 +13,9 @@ class SharedResources:
 
     _mongo_client = None
     _async_mongo_client = None
+    _news_id_cache = None
+    _company_master = None
+    _cpu_offloader = None
     _logger = get_logger()
 
     # --- Sync Mongo Client ---
@@ -27,3 +33,24 @@ class SharedResources:
             cls._logger.info(f"⚙️ Initializing Async MongoDB client")
             cls._async_mongo_client = AsyncIOMotorClient(MONGO_URI)
         return cls._async_mongo_client
+
+    # --- Process-wide news_id dedup cache ---
+    @classmethod
+    def get_news_id_cache(cls):
+        if cls._news_id_cache is None:
+            cls._news_id_cache = NewsIdCache()
+        return cls._news_id_cache
+
+    # --- Process-wide company master ---
+    @classmethod
+    def get_company_master(cls):
+        if cls._company_master is None:
+            cls._company_master = CompanyMasterCache()
+        return cls._company_master
+
+    # --- Process-wide executor for CPU-bound batch work ---
+    @classmethod
+    def get_cpu_offloader(cls):
+        if cls._cpu_offloader is None:
+            cls._cpu_offloader = CpuOffloader(logger=cls._logger)
+        return cls._cpu_offloader
@@ -1,42 +1,53 @@
 import asyncio
-import aiohttp
 import argparse
 from datetime import datetime
 from core.bse_pipeline import BSEAnnouncementPipeline
+from core.metrics import MetricsServer
+from core.replay import ArchiveReplay, parse_replay_source
 from config.constants import (
     RUN_INTERVAL_TIME_MIN,
     BSE_INDIRA_HIST_MIN_DATE,
-    BSE_INDIRA_HIST_MAX_DATE
-
+    BSE_INDIRA_HIST_MAX_DATE,
+    METRICS_HOST,
+    METRICS_PORT,
+    REPLAY_BATCH_SIZE
 )
 
 # ------------------------ Internet Check ------------------------
-async def is_internet(logger) -> bool:
-    test_url = "https://www.google.com/generate_204"
+async def is_internet(pipeline: BSEAnnouncementPipeline) -> bool:
+    """Block until the probe succeeds; reuses the BSE client's pooled session."""
     while True:
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(test_url, timeout=5) as resp:
-                    if resp.status == 204:
-                        return True
-                    else:
-                        logger.warning("⚠ Captive portal detected or unexpected response.")
-        except Exception:
-            logger.warning("❌ No internet connection detected.")
-        logger.info("💤 Retrying internet check in 15 min...\n")
+        if await pipeline.bse_client.check_connectivity():
+            return True
+        pipeline.logger.info("💤 Retrying internet check in 15 min...\n")
         await asyncio.sleep(15 * 60)
 
 
 # ------------------------ Pipeline Runner ------------------------
-async def run_pipeline_loop(pipeline: BSEAnnouncementPipeline, hist=False):
+async def advance_watermark(pipeline: BSEAnnouncementPipeline, lastnews_dt_tm, run_start_time, is_fetch):
+    """Watermark for the next live cycle; only persisted when no day in the window failed."""
+    stats = pipeline.bse_client.last_run_stats
+    failed_days = stats.transient_failed_days + stats.permanent_failed_days if stats else 0
+    if is_fetch and not failed_days:
+        await pipeline.save_live_watermark(run_start_time)
+        return run_start_time
+    if is_fetch:
+        # a persisted watermark past a failed day would never fetch it again
+        pipeline.logger.warning(f"⚠️ {failed_days} live day(s) failed, keeping watermark at {lastnews_dt_tm} to re-cover the window")
+    return lastnews_dt_tm
+
+
+async def run_pipeline_loop(pipeline: BSEAnnouncementPipeline, hist=False, resume=False, force_days=None):
     logger = pipeline.logger
 
     if hist:
-        await is_internet(logger)
+        await is_internet(pipeline)
         await pipeline.fetch_and_process(
             fetch_type="hist",
             from_date=BSE_INDIRA_HIST_MIN_DATE,
             to_date=BSE_INDIRA_HIST_MAX_DATE,
+            resume=resume,
+            force_days=force_days,
         )
         logger.info("📚 Historical data fetch completed.")
         return  
@@ -44,11 +55,13 @@ async def run_pipeline_loop(pipeline: BSEAnnouncementPipeline, hist=False):
     interval_minutes = RUN_INTERVAL_TIME_MIN or 1
     logger.info(f"🚀 Starting BSE Live Announcements Pipeline | Interval: {interval_minutes} min")
 
-    lastnews_dt_tm = None
+    lastnews_dt_tm = await pipeline.load_live_watermark()
+    if lastnews_dt_tm:
+        logger.info(f"📌 Resuming from persisted watermark: {lastnews_dt_tm}")
     iteration = 0
 
     while True:
-        await is_internet(logger)
+        await is_internet(pipeline)
         iteration += 1
         logger.info("=" * 70)
         logger.info(f"⏱️ Iteration {iteration}")
@@ -61,26 +74,74 @@ async def run_pipeline_loop(pipeline: BSEAnnouncementPipeline, hist=False):
         start_time = datetime.now()
         run_start_time = start_time.replace(second=0, microsecond=0)
 
+        pipeline.bse_client.last_run_stats = None
         is_fetch = await pipeline.fetch_and_process(lastnews_dt_tm=lastnews_dt_tm)
-        duration = (datetime.now() - start_time).seconds
-        logger.info(f"🕒 Cycle completed in {duration} seconds")
-        if is_fetch:
-            lastnews_dt_tm = run_start_time
+        duration = (datetime.now() - start_time).total_seconds()
+        logger.info(f"🕒 Cycle completed in {duration:.2f} seconds")
+        lastnews_dt_tm = await advance_watermark(pipeline, lastnews_dt_tm, run_start_time, is_fetch)
         logger.info(f"💤 Sleeping for {interval_minutes} minutes...\n")
         await asyncio.sleep(interval_minutes * 60)
 
 
+async def run_and_close(pipeline: BSEAnnouncementPipeline, metrics_port=METRICS_PORT, replay=None, **kwargs):
+    metrics = MetricsServer(host=METRICS_HOST, port=metrics_port, logger=pipeline.logger) if metrics_port else None
+    try:
+        if metrics:
+            await metrics.start()
+        await pipeline.startup()
+        if replay:
+            # no API and no internet check: archive → categorize → upsert
+            await ArchiveReplay(pipeline, **replay["options"]).run(replay["source"])
+        else:
+            await run_pipeline_loop(pipeline, **kwargs)
+    finally:
+        await pipeline.close()
+        if metrics:
+            await metrics.stop()
+
+
+def parse_days(value: str) -> list:
+    """Comma separated YYYYMMDD or YYYY-MM-DD dates."""
+    days = []
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        fmt = "%Y-%m-%d" if "-" in part else "%Y%m%d"
+        try:
+            days.append(datetime.strptime(part, fmt))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid day '{part}', expected YYYYMMDD or YYYY-MM-DD")
+    return days
+
+
 # ------------------------ Entry Point ------------------------
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run BSE Announcement Pipeline")
     parser.add_argument("--hist", action="store_true", help="Run historical data pipeline (one-time)")
+    parser.add_argument("--resume", action="store_true", help="With --hist: skip days the backfill ledger marks completed")
+    parser.add_argument("--force-days", type=parse_days, default=None, help="With --hist: comma separated days to re-run even if completed")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="Prometheus /metrics port on METRICS_HOST (0 disables)")
+    parser.add_argument("--replay", default=None, help="Re-categorize archived raw announcements: archive file or YYYY-MM-DD[:YYYY-MM-DD]")
+    parser.add_argument("--replay-shadow", default=None, metavar="SUFFIX", help="With --replay: write to <collection>SUFFIX instead")
+    parser.add_argument("--replay-batch-size", type=int, default=REPLAY_BATCH_SIZE, help="With --replay: records per batch")
     args = parser.parse_args()
+    if (args.resume or args.force_days) and not args.hist:
+        parser.error("--resume/--force-days require --hist")
+    if args.replay and args.hist:
+        parser.error("--replay and --hist are exclusive")
+    replay = None
+    if args.replay:
+        try:
+            replay = {
+                "source": parse_replay_source(args.replay),
+                "options": {"shadow_suffix": args.replay_shadow, "batch_size": args.replay_batch_size},
+            }
+        except ValueError as e:
+            parser.error(str(e))
 
     pipeline = BSEAnnouncementPipeline()
     logger = pipeline.logger
 
     try:
-        asyncio.run(run_pipeline_loop(pipeline, hist=args.hist))
+        asyncio.run(run_and_close(pipeline, metrics_port=args.metrics_port, replay=replay, hist=args.hist, resume=args.resume, force_days=args.force_days))
     except KeyboardInterrupt:
         logger.info("✋ Pipeline stopped by user (KeyboardInterrupt).")
     except Exception as e:
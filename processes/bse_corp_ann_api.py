@@ -1,6 +1,10 @@
+import time
 import asyncio
 import aiohttp
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from enum import Enum
 from tqdm.asyncio import tqdm
 from config.constants import (
     BSE_INDIRA_HIST_MIN_DATE,
@@ -8,55 +12,157 @@ from config.constants import (
     BSE_INDIRA_TIMEOUT_SEC,
     BSE_INDIRA_RETRY_DELAY_SEC,
     BSE_INDIRA_CONCURRENCY_LIMIT,
+    BSE_INDIRA_CONCURRENCY_MIN,
+    BSE_INDIRA_CONCURRENCY_MAX,
+    BSE_INDIRA_LATENCY_TARGET_SEC,
     BSE_INDIRA_RETRY_COUNT,
-    BSE_INDIRA_LIVE_DATA_DAYS
+    BSE_INDIRA_LIVE_DATA_DAYS,
+    BSE_INDIRA_KEEPALIVE_SEC,
+    BSE_INDIRA_DNS_CACHE_TTL_SEC,
+    CONNECTIVITY_PROBE_URL,
+    CONNECTIVITY_PROBE_TIMEOUT_SEC
 )
 from config.settings import BSE_INDIRA_API_URL, BSE_INDIRA_API_PARAMS_Live, BSE_INDIRA_API_PARAMS_Hist
 from core.logger import get_logger
+from core.adaptive_limiter import AdaptiveConcurrencyLimiter
+from core.metrics import API_REQUESTS, API_REQUEST_SECONDS, API_RETRIES, API_CONCURRENCY_LIMIT, RECORDS
+from processes.live_poll_scheduler import LivePollScheduler
+from utils.date_parser import parse_datetime
 
 
 # ====================== UTILITIES ======================
 def _normalize_datetime(dt_val):
-    """Try to parse multiple datetime formats into datetime object."""
-    if not dt_val:
-        return None
-    if isinstance(dt_val, datetime):
-        return dt_val
-    for fmt in (
-        "%Y-%m-%d %H:%M:%S",
-        "%Y-%m-%d",
-        "%d/%m/%Y %H:%M:%S",
-        "%d/%m/%Y",
-        "%Y%m%d",
-        "%d-%m-%Y",
-        "%d-%m-%Y %H:%M:%S",
-        "%Y-%m-%dT%H:%M:%S",
-    ):
-        try:
-            return datetime.strptime(str(dt_val), fmt)
-        except ValueError:
-            continue
-    return None
+    """Try to parse multiple datetime formats into datetime object (see utils.date_parser.KNOWN_FORMATS)."""
+    return parse_datetime(dt_val)
+
+
+# ====================== RESULT MODEL ======================
+# 408 / 429 are worth another attempt; every 5xx is treated as transient as well.
+TRANSIENT_HTTP_STATUSES = {408, 429}
+
+
+class FetchStatus(str, Enum):
+    OK = "ok"
+    EMPTY = "empty"            # "No Record found" / empty list — a valid answer, never retried
+    TRANSIENT = "transient"    # timeouts, 5xx, connection errors — retried with backoff
+    PERMANENT = "permanent"    # 4xx, malformed payloads — retrying will not help
+
+
+@dataclass
+class FetchResult:
+    """Outcome of fetching a single tradedt."""
+    tradedt: str
+    status: FetchStatus
+    data: list = field(default_factory=list)
+    attempts: int = 1
+    detail: str = ""
+    http_status: int = None  # set only for non-200 responses
+
+    @property
+    def is_failure(self) -> bool:
+        return self.status in (FetchStatus.TRANSIENT, FetchStatus.PERMANENT)
+
+
+@dataclass
+class FetchRunStats:
+    """Per-run counters reported after every historical / live fetch."""
+    days: int = 0
+    ok_days: int = 0
+    empty_days: int = 0
+    transient_failed_days: int = 0
+    permanent_failed_days: int = 0
+    retries: int = 0
+    records: int = 0
+
+    def record(self, result: FetchResult):
+        self.days += 1
+        self.retries += max(result.attempts - 1, 0)
+        self.records += len(result.data)
+        if result.status is FetchStatus.OK:
+            self.ok_days += 1
+        elif result.status is FetchStatus.EMPTY:
+            self.empty_days += 1
+        elif result.status is FetchStatus.TRANSIENT:
+            self.transient_failed_days += 1
+        else:
+            self.permanent_failed_days += 1
+
+    def summary(self) -> str:
+        return (
+            f"days={self.days} ok={self.ok_days} empty={self.empty_days} "
+            f"failed(transient={self.transient_failed_days}, permanent={self.permanent_failed_days}) "
+            f"retries={self.retries} records={self.records}"
+        )
 
 
 # ====================== MAIN CLIENT ======================
 class BSECorpAnnouncementClient:
-    def __init__(self):
+    def __init__(self, api_url: str = None):
         self.logger = get_logger("bse_corp_ann_api", save_time_logs=True)
+        self.api_url = api_url or BSE_INDIRA_API_URL  # overridable, e.g. benchmarks.bse_stub_server
         self.headers = {"Content-Type": "application/json"}
         self.timeout_sec = BSE_INDIRA_TIMEOUT_SEC
         self.retry_delay_sec = BSE_INDIRA_RETRY_DELAY_SEC
-        self.semaphore_limit = BSE_INDIRA_CONCURRENCY_LIMIT
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial=BSE_INDIRA_CONCURRENCY_LIMIT,
+            min_limit=BSE_INDIRA_CONCURRENCY_MIN,
+            max_limit=BSE_INDIRA_CONCURRENCY_MAX,
+            latency_target_sec=BSE_INDIRA_LATENCY_TARGET_SEC,
+            name="bse_api",
+        )
         self.retry_count = BSE_INDIRA_RETRY_COUNT
         self.no_of_live_days = BSE_INDIRA_LIVE_DATA_DAYS - 1
+        self.last_run_stats = None
+        self._session = None
+        self.live_scheduler = LivePollScheduler()
+        self.last_live_from_dt = None
 
-        if not BSE_INDIRA_API_URL:
+        if not self.api_url:
             self.logger.error("❌ Missing BSE_INDIRA_API_URL in settings.py")
 
         self.bseapi_hist_mindate = _normalize_datetime(BSE_INDIRA_HIST_MIN_DATE) or datetime(2023, 11, 1)
         self.bseapi_hist_maxdate = _normalize_datetime(BSE_INDIRA_HIST_MAX_DATE) or datetime(2025, 10, 31)
         self.logger.info(f"✅ Initialized BseCorpAnnouncements | Hist Range: {self.bseapi_hist_mindate} → {self.bseapi_hist_maxdate}")
 
+    # ------------------ POOLED SESSION ------------------
+    async def get_session(self) -> aiohttp.ClientSession:
+        """One keep-alive session for the client's lifetime (created lazily inside the running loop)."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limiter.max_limit * 2,
+                limit_per_host=self.limiter.max_limit,
+                ttl_dns_cache=BSE_INDIRA_DNS_CACHE_TTL_SEC,
+                keepalive_timeout=BSE_INDIRA_KEEPALIVE_SEC,
+            )
+            self._session = aiohttp.ClientSession(headers=self.headers, connector=connector)
+            self.logger.info(f"🔌 Opened pooled HTTP session | per-host limit: {self.limiter.max_limit}")
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            self.logger.info("🔌 Closed pooled HTTP session")
+        self._session = None
+
+    async def __aenter__(self):
+        await self.get_session()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def check_connectivity(self, url: str = CONNECTIVITY_PROBE_URL) -> bool:
+        """Lightweight probe over the pooled session; True only on the expected 204."""
+        session = await self.get_session()
+        try:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=CONNECTIVITY_PROBE_TIMEOUT_SEC)) as resp:
+                if resp.status == 204:
+                    return True
+                self.logger.warning("⚠ Captive portal detected or unexpected response.")
+        except Exception:
+            self.logger.warning("❌ No internet connection detected.")
+        return False
+
     # ------------------ PAYLOAD BUILDER ------------------
     def _ensure_payload_fields(self, payload: dict, date_time: datetime) -> dict:
         if not isinstance(date_time, datetime):
@@ -68,58 +174,86 @@ class BSECorpAnnouncementClient:
         p["sec"] = f"{date_time.second:02d}"
         return p
 
-    # ------------------ ASYNC FETCH (retry + backoff) ------------------
-    async def _fetch_for_date(self, session: aiohttp.ClientSession, payload: dict, sem: asyncio.Semaphore) -> tuple[str, list]:
+    # ------------------ SINGLE API CALL ------------------
+    async def _call_api(self, session: aiohttp.ClientSession, payload: dict) -> FetchResult:
         tradedt = payload.get("tradedt", "")
+        try:
+            async with session.post(
+                self.api_url,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=self.timeout_sec),
+            ) as resp:
+                if resp.status != 200:
+                    status = FetchStatus.TRANSIENT if resp.status in TRANSIENT_HTTP_STATUSES or resp.status >= 500 else FetchStatus.PERMANENT
+                    self.logger.warning(f"HTTP {resp.status} for {tradedt}")
+                    return FetchResult(tradedt, status, detail=f"HTTP {resp.status}", http_status=resp.status)
 
-        async with sem:
-            async def _call_api():
                 try:
-                    async with session.post(
-                        BSE_INDIRA_API_URL,
-                        json=payload,
-                        timeout=aiohttp.ClientTimeout(total=self.timeout_sec),
-                    ) as resp:
-                        if resp.status != 200:
-                            self.logger.warning(f"HTTP {resp.status} for {tradedt}")
-                            return []
-
-                        data = await resp.json(content_type=None)
-
-                        if isinstance(data, dict):
-                            if data.get("Error_Msg") == "No Record found":
-                                return []
-                            self.logger.warning(f"Unexpected dict response for {tradedt}")
-                            return []
-
-                        if not isinstance(data, list):
-                            self.logger.warning(f"Unexpected type: {type(data).__name__} for {tradedt}")
-                            return []
-
-                        return data
-
-                except asyncio.TimeoutError:
-                    self.logger.warning(f"Timeout for {tradedt}")
-                except aiohttp.ClientError as e:
-                    self.logger.warning(f"Request failed for {tradedt}: {e}")
-                except Exception as e:
-                    self.logger.error(f"Unexpected error for {tradedt}: {e}")
-                return []
-
-            # 🔁 Retry logic with exponential backoff
-            for attempt in range(1, self.retry_count + 1):
-                result = await _call_api()
-                if result:
-                    return tradedt, result
-                if attempt < self.retry_count:
-                    delay = self.retry_delay_sec * (2 ** (attempt - 1))
-                    self.logger.warning(f"Retry {attempt}/{self.retry_count} failed for {tradedt}, retrying in {delay:.1f}s...")
-                    await asyncio.sleep(delay)
-
-            return tradedt, []
+                    data = await resp.json(content_type=None)
+                except ValueError as e:
+                    self.logger.warning(f"Invalid JSON for {tradedt}: {e}")
+                    return FetchResult(tradedt, FetchStatus.PERMANENT, detail="invalid json")
+
+                if isinstance(data, dict):
+                    if data.get("Error_Msg") == "No Record found":
+                        return FetchResult(tradedt, FetchStatus.EMPTY)
+                    self.logger.warning(f"Unexpected dict response for {tradedt}")
+                    return FetchResult(tradedt, FetchStatus.PERMANENT, detail="unexpected dict response")
+
+                if not isinstance(data, list):
+                    self.logger.warning(f"Unexpected type: {type(data).__name__} for {tradedt}")
+                    return FetchResult(tradedt, FetchStatus.PERMANENT, detail=f"unexpected type {type(data).__name__}")
+
+                return FetchResult(tradedt, FetchStatus.OK if data else FetchStatus.EMPTY, data=data)
+
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Timeout for {tradedt}")
+            return FetchResult(tradedt, FetchStatus.TRANSIENT, detail="timeout")
+        except aiohttp.ClientError as e:
+            self.logger.warning(f"Request failed for {tradedt}: {e}")
+            return FetchResult(tradedt, FetchStatus.TRANSIENT, detail=type(e).__name__)
+        except Exception as e:
+            self.logger.error(f"Unexpected error for {tradedt}: {e}")
+            return FetchResult(tradedt, FetchStatus.PERMANENT, detail=type(e).__name__)
+
+    # ------------------ ASYNC FETCH (retry + backoff) ------------------
+    async def _fetch_for_date(self, session: aiohttp.ClientSession, payload: dict, fetch_type: str = "live") -> FetchResult:
+        tradedt = payload.get("tradedt", "")
+        latency_metric = API_REQUEST_SECONDS.labels(fetch_type)
+
+        # 🔁 Only transient failures are retried; backoff sleeps happen outside the limiter slot
+        for attempt in range(1, self.retry_count + 1):
+            async with self.limiter.slot():
+                started = time.monotonic()
+                result = await self._call_api(session, payload)
+                latency = time.monotonic() - started
+                # timeouts, connection errors and any non-200 answer shrink the window; everything else is a latency sample
+                if result.status is FetchStatus.TRANSIENT or result.http_status is not None:
+                    self.limiter.on_failure()
+                else:
+                    self.limiter.on_success(latency)
+            latency_metric.observe(latency)
+            API_REQUESTS.labels(fetch_type, result.status.value).inc()
+            API_CONCURRENCY_LIMIT.set(self.limiter.limit)
+            result.attempts = attempt
+            if result.status is not FetchStatus.TRANSIENT:
+                RECORDS.labels(fetch_type, "fetched").inc(len(result.data))
+                return result
+            if attempt < self.retry_count:
+                API_RETRIES.labels(fetch_type).inc()
+                delay = self.retry_delay_sec * (2 ** (attempt - 1))
+                self.logger.warning(f"Retry {attempt}/{self.retry_count} failed for {tradedt} ({result.detail}), retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+
+        self.logger.error(f"❌ Giving up on {tradedt} after {self.retry_count} attempts ({result.detail})")
+        return result
+
+    def _log_run_stats(self, stats: FetchRunStats, label: str):
+        self.last_run_stats = stats
+        self.logger.info(f"📊 {label} run stats: {stats.summary()} | {self.limiter.status()}")
 
     # ------------------ HISTORICAL FETCH ------------------
-    async def fetch_hist_announcements(self, from_date=None, to_date=None):
+    def hist_date_bounds(self, from_date=None, to_date=None) -> tuple:
         from_dt = from_date or self.bseapi_hist_mindate
         to_dt = to_date or self.bseapi_hist_maxdate
 
@@ -135,31 +269,58 @@ class BSECorpAnnouncementClient:
             self.logger.info(f"Swapped invalid range: {from_dt.date()} > {to_dt.date()}")
             from_dt, to_dt = to_dt, from_dt
 
-        from_dt = max(from_dt, self.bseapi_hist_mindate)
-        to_dt = min(to_dt, self.bseapi_hist_maxdate)
-
-        self.logger.info(f"Fetching historical range: {from_dt.date()} → {to_dt.date()}")
-
-        sem = asyncio.Semaphore(self.semaphore_limit)
-        all_data = []
-
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            tasks = []
-            curr_dt = from_dt
-            while curr_dt <= to_dt:
-                payload = self._ensure_payload_fields(BSE_INDIRA_API_PARAMS_Hist.copy(), curr_dt)
-                tasks.append(asyncio.create_task(self._fetch_for_date(session, payload, sem)))
-                curr_dt += timedelta(days=1)
-
-            results = []
-            for coro in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="📡 Fetching Hist Data"):
-                results.append(await coro)
-            # results = await asyncio.gather(*tasks)
+        return max(from_dt, self.bseapi_hist_mindate), min(to_dt, self.bseapi_hist_maxdate)
+
+    async def iter_hist_announcements(self, from_date=None, to_date=None, skip_days=None, days=None):
+        """
+        Async iterator of FetchResult, one per tradedt, in chronological order.
+        At most 2x the concurrency limit days are fetched ahead of the consumer,
+        so memory stays bounded however long the range is.
+        skip_days: tradedt strings (YYYYMMDD) to leave out; days: explicit datetimes instead of the range.
+        """
+        skip_days = skip_days or set()
+        if days:
+            day_list = sorted({datetime(d.year, d.month, d.day) for d in days})
+            self.logger.info(f"Fetching {len(day_list)} explicit historical days")
+        else:
+            from_dt, to_dt = self.hist_date_bounds(from_date, to_date)
+            day_list = [from_dt + timedelta(days=i) for i in range((to_dt - from_dt).days + 1)]
+            self.logger.info(f"Fetching historical range: {from_dt.date()} → {to_dt.date()} ({len(day_list)} days, streaming)")
+        day_list = [d for d in day_list if d.strftime("%Y%m%d") not in skip_days]
+        if skip_days:
+            self.logger.info(f"⏭️ Skipping {len(skip_days)} already completed days → {len(day_list)} to fetch")
+        total_days = len(day_list)
+
+        session = await self.get_session()
+        pending = deque()
+        stats = FetchRunStats()
+        progress = tqdm(total=total_days, desc="📡 Fetching Hist Data")
+
+        def _schedule(day):
+            payload = self._ensure_payload_fields(BSE_INDIRA_API_PARAMS_Hist.copy(), day)
+            pending.append(asyncio.create_task(self._fetch_for_date(session, payload, fetch_type="hist")))
 
+        try:
+            next_idx = 0
+            while next_idx < total_days or pending:
+                while next_idx < total_days and len(pending) < self.limiter.limit * 2:
+                    _schedule(day_list[next_idx])
+                    next_idx += 1
+                result = await pending.popleft()
+                stats.record(result)
+                progress.update(1)
+                self.logger.info(f"📆 {result.tradedt} → {len(result.data)} records ({result.status.value})")
+                yield result
+        finally:
+            for task in pending:
+                task.cancel()
+            progress.close()
+            self._log_run_stats(stats, "Historical")
+
+    async def fetch_hist_announcements(self, from_date=None, to_date=None, skip_days=None, days=None):
         all_data = []
-        for date_str, data in results:
-            self.logger.info(f"📆 {date_str} → {len(data)} records")
-            all_data.extend(data)
+        async for result in self.iter_hist_announcements(from_date, to_date, skip_days=skip_days, days=days):
+            all_data.extend(result.data)
 
         self.logger.info(f"✅ Historical fetch complete: {len(all_data)} total records.")
         return all_data
@@ -171,50 +332,44 @@ class BSECorpAnnouncementClient:
         today = datetime(now.year, now.month, now.day)
         window_start = today - timedelta(days=self.no_of_live_days)
 
-        # --- Determine final start date ---
+        # --- Determine watermark ---
+        last_dt = None
         if not lastnews_dt_tm:
-            last_dt = window_start
             self.logger.info(f"No lastnews_dt_tm provided. Using {self.no_of_live_days}-day window from {window_start.date()}")
         else:
             last_dt = _normalize_datetime(lastnews_dt_tm)
             if not last_dt:
                 self.logger.warning(f"Invalid lastnews_dt_tm '{lastnews_dt_tm}', defaulting to {window_start.date()}")
-                last_dt = window_start
             elif last_dt < window_start:
                 self.logger.info(f"lastnews_dt_tm before window → adjusted to {window_start.date()}")
-                last_dt = window_start
-            elif last_dt > today:
-                self.logger.info(f"Fetching live data for {last_dt} (single-day mode)")
-                async with aiohttp.ClientSession(headers=self.headers) as session:
-                    sem = asyncio.Semaphore(self.semaphore_limit)
-                    payload = self._ensure_payload_fields(BSE_INDIRA_API_PARAMS_Live.copy(), last_dt)
-                    _, data = await self._fetch_for_date(session, payload, sem)
-                    self.logger.info(f"📆 {last_dt} → {len(data)} records (live)")
-                    return data or []
-
-        # --- Multi-day mode ---
-        self.logger.info(f"Fetching live range: {last_dt.date()} → {today.date()}")
-        sem = asyncio.Semaphore(self.semaphore_limit)
+                last_dt = None
+            elif not self.live_scheduler.last_polled:
+                self.live_scheduler.seed(last_dt, window_start)
+
+        # --- Tiered plan: today every cycle, older days only when their tier is due ---
+        plan = self.live_scheduler.plan(now, window_start, last_dt)
+        self.last_live_from_dt = plan[0] if plan else today
+        self.logger.info(
+            f"Fetching live days: {', '.join(d.strftime('%Y-%m-%d %H:%M:%S') for d in plan)} "
+            f"({len(plan)}/{self.no_of_live_days + 1} days due)"
+        )
+
+        session = await self.get_session()
+        payloads = [self._ensure_payload_fields(BSE_INDIRA_API_PARAMS_Live.copy(), d) for d in plan]
+        tasks = [asyncio.create_task(self._fetch_for_date(session, p)) for p in payloads]
+        results = []
+        for coro in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="📡 Fetching Live Data"):
+            results.append(await coro)
+
+        stats = FetchRunStats()
         all_data = []
-
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            date_range = [
-                self._ensure_payload_fields(BSE_INDIRA_API_PARAMS_Live.copy(), d)
-                for d in (last_dt + timedelta(days=i) for i in range((today - last_dt).days + 1))
-            ]
-
-            tasks = [asyncio.create_task(self._fetch_for_date(session, p, sem)) for p in date_range]
-            results = []
-            for coro in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="📡 Fetching Live Data"):
-                results.append(await coro)
-            # results = await asyncio.gather(*tasks)
-
-        all_data = []
-        for date_str, data in results:
-            self.logger.info(f"📆 {date_str} → {len(data)} records")
-            all_data.extend(data)
+        for result in results:
+            stats.record(result)
+            if not result.is_failure:
+                self.live_scheduler.mark_polled(datetime.strptime(result.tradedt, "%Y%m%d"), now)
+            self.logger.info(f"📆 {result.tradedt} → {len(result.data)} records ({result.status.value})")
+            all_data.extend(result.data)
 
         self.logger.info(f"✅ Live fetch complete: {len(all_data)} total records.")
+        self._log_run_stats(stats, "Live")
         return all_data
-
-
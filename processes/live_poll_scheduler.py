@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+from config.constants import BSE_INDIRA_LIVE_POLL_TIERS_MIN, BSE_INDIRA_LIVE_POLL_OLDER_MIN
+
+
+class LivePollScheduler:
+    """
+    Per-tradedt freshness record for the live window.
+    Today is polled every cycle from the watermark time (hr/min/sec payload fields);
+    older days are re-polled from midnight only once their tier interval has elapsed.
+    """
+
+    def __init__(self, tiers_min: dict = None, older_min: int = None):
+        self.tiers_min = BSE_INDIRA_LIVE_POLL_TIERS_MIN if tiers_min is None else tiers_min
+        self.older_min = BSE_INDIRA_LIVE_POLL_OLDER_MIN if older_min is None else older_min
+        self.last_polled = {}  # day (midnight datetime) -> datetime of last successful poll
+
+    @staticmethod
+    def _day(dt: datetime) -> datetime:
+        return datetime(dt.year, dt.month, dt.day)
+
+    def interval_for(self, day: datetime, today: datetime) -> timedelta:
+        age_days = (today - day).days
+        return timedelta(minutes=self.tiers_min.get(age_days, self.older_min))
+
+    def seed(self, watermark: datetime, window_start: datetime):
+        """After a restart, treat every window day before the watermark's day as polled at the watermark."""
+        day = self._day(window_start)
+        while day < self._day(watermark):
+            self.last_polled.setdefault(day, watermark)
+            day += timedelta(days=1)
+
+    def plan(self, now: datetime, window_start: datetime, lastnews_dt_tm: datetime = None) -> list:
+        """Return the payload datetimes to poll this cycle, oldest first."""
+        today = self._day(now)
+        window_start = self._day(window_start)
+        for day in [d for d in self.last_polled if d < window_start]:
+            del self.last_polled[day]
+
+        due = []
+        day = window_start
+        while day <= today:
+            cursor = lastnews_dt_tm if lastnews_dt_tm and self._day(lastnews_dt_tm) == day else day
+            last = self.last_polled.get(day)
+            if day == today or last is None or now - last >= self.interval_for(day, today):
+                due.append(cursor)
+            day += timedelta(days=1)
+        return due
+
+    def mark_polled(self, day: datetime, at: datetime):
+        self.last_polled[self._day(day)] = at
@@ -0,0 +1,2 @@
+# benchmarks/__init__ gives config/settings.py the env defaults it needs to import without a .env
+import benchmarks  # noqa: F401
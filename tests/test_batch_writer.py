@@ -0,0 +1,47 @@
+"""
+MongoBatchWriter error accounting against the in-memory collection stand-in.
+    python -m pytest -q tests
+"""
+import asyncio
+import logging
+from pymongo.errors import BulkWriteError
+from benchmarks.fake_mongo import FakeCollection
+from utils.batch_writer import MongoBatchWriter
+
+
+class RejectingCollection(FakeCollection):
+    """insert_many rejects every doc with a non-duplicate write error (121: document failed validation)."""
+
+    async def insert_many(self, docs, ordered=False):
+        errors = [{"index": i, "code": 121, "errmsg": "Document failed validation"} for i in range(len(docs))]
+        raise BulkWriteError({"writeErrors": errors, "nInserted": 0, "nUpserted": 0, "nMatched": 0})
+
+
+def write(collection, docs, batch_size=10):
+    writer = MongoBatchWriter(logging.getLogger("test_batch_writer"), batch_size=batch_size)
+    return asyncio.run(writer.write(collection, docs))
+
+
+def docs(n, start=0):
+    return [{"news_id": f"n{i}"} for i in range(start, start + n)]
+
+
+def test_insert_all_new():
+    stats = write(FakeCollection("AllAnnouncements"), docs(25))
+    assert (stats.ok, stats.inserted, stats.duplicates, stats.failed_docs) == (True, 25, 0, 0)
+
+
+def test_duplicates_are_not_failures():
+    collection = FakeCollection("AllAnnouncements")
+    write(collection, docs(10))
+    stats = write(collection, docs(20))
+    assert (stats.ok, stats.inserted, stats.duplicates, stats.failed_docs) == (True, 10, 10, 0)
+
+
+def test_non_duplicate_write_errors_fail_the_write():
+    stored = []
+    writer = MongoBatchWriter(logging.getLogger("test_batch_writer"), batch_size=10)
+    stats = asyncio.run(writer.write(RejectingCollection("AllAnnouncements"), docs(25), on_stored=stored.extend))
+    assert not stats.ok
+    assert (stats.inserted, stats.duplicates, stats.failed_docs) == (0, 0, 25)
+    assert stored == []  # rejected docs never reach the news_id cache
@@ -0,0 +1,58 @@
+"""
+Vectorized ReportsDivider.format_category_docs vs the old row-wise/groupby-loop version.
+    python -m pytest -q tests
+"""
+import asyncio
+import pandas as pd
+from benchmarks import synthetic
+from benchmarks.bench_format_category_docs import _comparable, legacy_format_category_docs, make_divider
+
+SYMBOLMAP = {"NSE": "ABC", "BSE": 500001, "Company_Name": "ABC Ltd", "SELECTED": "ABC"}
+
+
+def fixed_frame() -> pd.DataFrame:
+    """Two companies across quarter / financial-year boundaries, rows deliberately out of time order."""
+    rows = [
+        ("n1", "INE001", "2024-05-10 10:00:00"),
+        ("n2", "INE001", "2024-04-02 09:30:00"),
+        ("n3", "INE002", "2024-03-31 23:59:59"),
+        ("n4", "INE001", "2024-07-01 00:00:00"),
+        ("n5", "INE002", "2024-01-15 12:00:00"),
+        ("n6", "INE001", "2024-12-31 18:45:00"),
+        ("n7", "INE002", "2024-04-01 00:00:01"),
+    ]
+    return pd.DataFrame([
+        {"news_id": nid, "company": company, "symbolmap": SYMBOLMAP, "Tradedate": ts,
+         "ATTACHMENTURL": f"https://www.bseindia.com/{nid}.pdf", "NewsBody": f"body {nid}", "category": "Investor Presentation"}
+        for nid, company, ts in rows
+    ])
+
+
+def format_both(df: pd.DataFrame, existing: dict):
+    legacy = legacy_format_category_docs(df.copy(), "Investor Presentation", "IP", existing)
+    new = asyncio.run(make_divider().format_category_docs(df.copy(), "Investor Presentation", "IP", existing))
+    return legacy, new
+
+
+def test_fixed_frame_matches_legacy():
+    legacy, new = format_both(fixed_frame(), {"INE001_IP_FY2024Q4": 2})
+    assert _comparable(new) == _comparable(legacy)
+    # groups in order of their earliest Tradedate, rows inside a group by Tradedate
+    assert [d["report_id"] for d in new] == [
+        "INE002_IP_FY2024Q3_1",  # n5
+        "INE002_IP_FY2024Q3_2",  # n3
+        "INE002_IP_FY2024Q4_1",  # n7
+        "INE001_IP_FY2024Q4_3",  # n2, continues after the 2 existing numbers
+        "INE001_IP_FY2024Q4_4",  # n1
+        "INE001_IP_FY2024Q1_1",  # n4
+        "INE001_IP_FY2024Q2_1",  # n6
+    ]
+    assert {d["news_id"]: (d["Year"], d["datecode"]) for d in new}["n5"] == (2023, "20240115")
+
+
+def test_synthetic_frame_matches_legacy():
+    df = pd.DataFrame(synthetic.categorized_docs(2_000))
+    existing = {f"{c}_IP_FY2024Q1": 3 for c in df["company"].unique()[:20]}
+    legacy, new = format_both(df, existing)
+    assert len(new) == len(df)
+    assert _comparable(new) == _comparable(legacy)
@@ -0,0 +1,72 @@
+"""
+HistBackfillLedger bookkeeping for --hist, streaming and single-batch, against a stubbed BSE fetch.
+    python -m pytest -q tests
+"""
+import asyncio
+from datetime import datetime, timedelta
+import core.bse_pipeline as bse_pipeline
+from core.hist_ledger import HistBackfillLedger
+from processes.bse_corp_ann_api import FetchResult, FetchStatus
+from benchmarks import synthetic
+from benchmarks.load_test import build_pipeline, install_company_master
+
+FROM, TO = datetime(2024, 4, 1), datetime(2024, 4, 5)
+FLAKY_DAY = "20240403"
+
+
+class StubHistFetch:
+    """Stands in for BSECorpAnnouncementClient.iter_hist_announcements; FLAKY_DAY fails on its first fetch only."""
+
+    def __init__(self, codes):
+        self.codes = codes
+        self.requested = []
+
+    async def __call__(self, from_date=None, to_date=None, skip_days=None, days=None):
+        day_list = days or [from_date + timedelta(days=i) for i in range((to_date - from_date).days + 1)]
+        for day in day_list:
+            tradedt = day.strftime("%Y%m%d")
+            if tradedt in (skip_days or set()):
+                continue
+            self.requested.append(tradedt)
+            if tradedt == FLAKY_DAY and self.requested.count(tradedt) == 1:
+                yield FetchResult(tradedt, FetchStatus.TRANSIENT, detail="timeout", attempts=3)
+                continue
+            yield FetchResult(tradedt, FetchStatus.OK, data=synthetic.announcements(40, self.codes, start=day, days=1, seed=day.day))
+
+
+def ledger(pipeline) -> dict:
+    return {d["_id"]: d["status"] for d in pipeline.hist_ledger.collection.docs.values()}
+
+
+async def hist_then_resume(archive_dir):
+    codes = synthetic.company_codes()
+    install_company_master(codes)
+    pipeline, _ = build_pipeline("http://127.0.0.1:9/")
+    pipeline.archive_dir = archive_dir
+    fetch = pipeline.bse_client.iter_hist_announcements = StubHistFetch(codes)
+    try:
+        await pipeline.startup()
+        await pipeline.fetch_and_process(fetch_type="hist", from_date=FROM, to_date=TO)
+        first = ledger(pipeline)
+        first_requested = list(fetch.requested)
+        await pipeline.fetch_and_process(fetch_type="hist", from_date=FROM, to_date=TO, resume=True)
+        return first, first_requested, ledger(pipeline), fetch.requested[len(first_requested):]
+    finally:
+        await pipeline.close()
+
+
+def check(first, first_requested, after, resumed):
+    days = [(FROM + timedelta(days=i)).strftime("%Y%m%d") for i in range(5)]
+    assert first_requested == days
+    assert first == {d: HistBackfillLedger.FAILED if d == FLAKY_DAY else HistBackfillLedger.COMPLETED for d in days}
+    assert resumed == [FLAKY_DAY]  # --resume only re-fetches the failed day
+    assert set(after.values()) == {HistBackfillLedger.COMPLETED}
+
+
+def test_streaming_hist_records_and_resumes(tmp_path):
+    check(*asyncio.run(hist_then_resume(tmp_path)))
+
+
+def test_single_batch_hist_records_and_resumes(tmp_path, monkeypatch):
+    monkeypatch.setattr(bse_pipeline, "BSE_INDIRA_HIST_STREAMING", False)
+    check(*asyncio.run(hist_then_resume(tmp_path)))
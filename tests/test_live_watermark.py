@@ -0,0 +1,42 @@
+"""
+Live watermark handling in main.run_pipeline_loop (advance_watermark).
+    python -m pytest -q tests
+"""
+import asyncio
+from datetime import datetime
+from main import advance_watermark
+from processes.bse_corp_ann_api import FetchResult, FetchRunStats, FetchStatus
+from benchmarks.load_test import build_pipeline
+
+PREVIOUS, RUN_START = datetime(2024, 4, 1, 9, 0), datetime(2024, 4, 1, 9, 5)
+
+
+def run_stats(*statuses) -> FetchRunStats:
+    stats = FetchRunStats()
+    for i, status in enumerate(statuses):
+        stats.record(FetchResult(f"2024040{i + 1}", status))
+    return stats
+
+
+async def cycle(stats, is_fetch):
+    pipeline, _ = build_pipeline("http://127.0.0.1:9/")
+    await pipeline.save_live_watermark(PREVIOUS)
+    pipeline.bse_client.last_run_stats = stats
+    try:
+        returned = await advance_watermark(pipeline, PREVIOUS, RUN_START, is_fetch)
+        return returned, await pipeline.load_live_watermark()
+    finally:
+        await pipeline.close()
+
+
+def test_clean_cycle_advances_and_persists():
+    assert asyncio.run(cycle(run_stats(FetchStatus.OK, FetchStatus.EMPTY), True)) == (RUN_START, RUN_START)
+
+
+def test_failed_day_keeps_previous_watermark():
+    for failure in (FetchStatus.TRANSIENT, FetchStatus.PERMANENT):
+        assert asyncio.run(cycle(run_stats(FetchStatus.OK, failure), True)) == (PREVIOUS, PREVIOUS)
+
+
+def test_nothing_stored_keeps_previous_watermark():
+    assert asyncio.run(cycle(run_stats(FetchStatus.OK), False)) == (PREVIOUS, PREVIOUS)
@@ -0,0 +1,105 @@
+"""
+ArchiveReplay (main.py --replay) against the in-memory collection stand-in.
+    python -m pytest -q tests
+"""
+import asyncio
+from datetime import datetime
+from config.constants import ALLREPORTS_CATEGORY_MAP, CATEGORY_MAP
+from core.replay import ArchiveReplay
+from utils.jsonl_archive import DayPartitionedArchive
+from benchmarks import synthetic
+from benchmarks.bench_replay import ShadowDb
+from benchmarks.load_test import build_pipeline, install_company_master
+
+START, DAYS = datetime(2024, 4, 1), 10
+SOURCE = (START, datetime(2024, 4, DAYS))
+
+
+def archive_announcements(archive_dir, n=1_500):
+    codes = synthetic.company_codes()
+    install_company_master(codes)
+    archive = DayPartitionedArchive(archive_dir, "hist_announcements")
+    archive.write(synthetic.announcements(n, codes, start=START, days=DAYS))
+    archive.close()
+
+
+def stored(collection) -> list:
+    return list(collection.docs.values())
+
+
+def assert_reports_in_sync(divider):
+    """Every announcement with a report category has exactly one report of that type, and no other reports exist."""
+    ann = {d["news_id"]: d["category"] for d in stored(divider.collection_all_ann)}
+    reports = stored(divider.collection_all_reports)
+    assert all(ann[r["news_id"]] == r["report_type"] for r in reports)
+    expected = {nid for nid, category in ann.items() if category in ALLREPORTS_CATEGORY_MAP}
+    assert sorted(r["news_id"] for r in reports) == sorted(expected)
+
+
+async def replay(archive_dir, *runs, shadow_suffix=None):
+    """Replays SOURCE once per entry in runs (a CATEGORY_MAP, or None to keep the current one)."""
+    pipeline, _ = build_pipeline("http://127.0.0.1:9/")
+    categorizer = pipeline.categorizer
+    try:
+        await pipeline.startup()
+        results = []
+        for category_map in runs:
+            if category_map is not None:
+                categorizer.category_map = category_map
+                categorizer.compile_category_rules()
+            stats = await ArchiveReplay(pipeline, archive_dir=archive_dir, shadow_suffix=shadow_suffix).run(SOURCE)
+            results.append((stats, {r["news_id"]: r["report_id"] for r in stored(pipeline.divider.collection_all_reports)}))
+        return pipeline, results
+    finally:
+        categorizer.category_map = CATEGORY_MAP
+        categorizer.compile_category_rules()
+        await pipeline.close()
+
+
+def test_second_replay_upserts_in_place(tmp_path):
+    archive_announcements(tmp_path)
+    pipeline, [(first, reports), (second, reports_again)] = asyncio.run(replay(tmp_path, None, None))
+    assert first["failed_batches"] == second["failed_batches"] == 0
+    assert len(pipeline.divider.collection_all_ann.docs) == first["categorized"] == second["categorized"]
+    assert reports and reports_again == reports
+    assert second["reports_rekeyed_or_removed"] == 0
+    assert_reports_in_sync(pipeline.divider)
+
+
+def test_replay_after_rule_change_moves_and_removes_reports(tmp_path):
+    archive_announcements(tmp_path)
+    # "presentation" headlines move to Annual Report, credit ratings stop being a category at all
+    changed = {k: dict(v) for k, v in CATEGORY_MAP.items() if k not in ("Investor Presentation", "Credit Rating")}
+    changed["Annual Report"]["HeadLine"] = r"annual report|presentation"
+    pipeline, [(_, before), (stats, after)] = asyncio.run(replay(tmp_path, None, changed))
+
+    assert stats["failed_batches"] == 0
+    assert stats["reports_rekeyed_or_removed"] > 0
+    assert_reports_in_sync(pipeline.divider)
+    types = {r["news_id"]: r["report_type"] for r in stored(pipeline.divider.collection_all_reports)}
+    moved = [nid for nid, rid in before.items() if "_IP_" in rid and types.get(nid) == "Annual Report"]
+    assert moved and all("_AR_" in after[nid] for nid in moved)
+    # Credit Rating is no longer a category at all, so those reports are gone
+    assert any("_CR_" in rid and nid not in after for nid, rid in before.items())
+
+
+def test_fresh_shadow_numbers_like_production(tmp_path):
+    async def production_then_shadow():
+        pipeline, _ = build_pipeline("http://127.0.0.1:9/")
+        divider = pipeline.divider
+        try:
+            await pipeline.startup()
+            await ArchiveReplay(pipeline, archive_dir=tmp_path).run(SOURCE)
+            production = {r["news_id"]: r["report_id"] for r in stored(divider.collection_all_reports)}
+            divider.db_async = ShadowDb()
+            stats = await ArchiveReplay(pipeline, archive_dir=tmp_path, shadow_suffix="_shadow").run(SOURCE)
+            shadow = {r["news_id"]: r["report_id"] for r in stored(divider.collection_all_reports)}
+            return divider, stats, production, shadow
+        finally:
+            await pipeline.close()
+
+    archive_announcements(tmp_path)
+    divider, stats, production, shadow = asyncio.run(production_then_shadow())
+    assert divider.collection_all_reports.name.endswith("_shadow")
+    assert stats["failed_batches"] == 0
+    assert production and shadow == production
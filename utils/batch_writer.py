@@ -0,0 +1,126 @@
+import time
+import asyncio
+from dataclasses import dataclass
+from pymongo import WriteConcern
+from pymongo.errors import BulkWriteError
+from config.constants import (
+    MONGO_WRITE_BATCH_SIZE,
+    MONGO_WRITE_MAX_IN_FLIGHT,
+    MONGO_WRITE_CONCERN,
+    MONGO_WRITE_LATENCY_TARGET_SEC
+)
+from core.adaptive_limiter import AdaptiveConcurrencyLimiter
+from core.metrics import MONGO_BATCH_SECONDS, MONGO_DOCS, MONGO_FAILED_BATCHES
+
+
+@dataclass
+class WriteStats:
+    total: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    failed_docs: int = 0  # rejected for anything but a duplicate key (validation, size, ...)
+    failed_batches: int = 0
+    batches: int = 0
+    max_batch_latency_sec: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.failed_batches == 0 and self.failed_docs == 0
+
+
+class MongoBatchWriter:
+    """
+    Concurrent batch writer for Mongo collections.
+    Keeps a bounded number of batches in flight; the bound shrinks when batch latency
+    exceeds MONGO_WRITE_LATENCY_TARGET_SEC or a batch fails, and grows back when Mongo keeps up.
+    """
+
+    def __init__(self, logger, batch_size: int = MONGO_WRITE_BATCH_SIZE, max_in_flight: int = MONGO_WRITE_MAX_IN_FLIGHT,
+                 write_concern: dict = None, latency_target_sec: float = MONGO_WRITE_LATENCY_TARGET_SEC):
+        self.logger = logger
+        self.batch_size = batch_size
+        self.write_concern = WriteConcern(**(MONGO_WRITE_CONCERN if write_concern is None else write_concern))
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial=max_in_flight,
+            min_limit=1,
+            max_limit=max_in_flight,
+            latency_target_sec=latency_target_sec,
+            name="mongo_writer",
+        )
+
+    async def _write_batch(self, collection, chunk, mode, build_ops, on_stored, stats, batch_no, total_batches, label):
+        started = time.monotonic()
+        inserted = duplicates = failed = 0
+        try:
+            try:
+                if mode == "upsert":
+                    res = await collection.bulk_write(build_ops(chunk), ordered=False)
+                    inserted, duplicates = res.upserted_count, res.matched_count
+                else:
+                    res = await collection.insert_many(chunk, ordered=False)
+                    inserted = len(res.inserted_ids)
+                if on_stored:
+                    on_stored(chunk)
+            except BulkWriteError as e:
+                write_errors = e.details.get("writeErrors", [])
+                failed_errors = [err for err in write_errors if err.get("code") != 11000]
+                duplicates = len(write_errors) - len(failed_errors) + e.details.get("nMatched", 0)
+                inserted = e.details.get("nInserted", 0) + e.details.get("nUpserted", 0)
+                failed = len(failed_errors)
+                if failed:
+                    first = failed_errors[0]
+                    self.logger.error(
+                        f"❌ Batch {batch_no}/{total_batches} → {label}: {failed} docs rejected, "
+                        f"first code {first.get('code')}: {first.get('errmsg')}"
+                    )
+                if on_stored:
+                    # duplicates are already stored too; only genuinely failed docs are left out
+                    failed_idx = {err.get("index") for err in failed_errors}
+                    on_stored([d for j, d in enumerate(chunk) if j not in failed_idx])
+        except Exception as e:
+            self.limiter.on_failure()
+            stats.failed_batches += 1
+            MONGO_FAILED_BATCHES.labels(collection.name).inc()
+            self.logger.warning(f"⚠️ Batch {batch_no}/{total_batches} → {label}: {type(e).__name__}: {e}")
+            return
+        finally:
+            await self.limiter.release()
+
+        latency = time.monotonic() - started
+        self.limiter.on_success(latency)
+        stats.batches += 1
+        stats.inserted += inserted
+        stats.duplicates += duplicates
+        stats.failed_docs += failed
+        stats.max_batch_latency_sec = max(stats.max_batch_latency_sec, latency)
+        MONGO_BATCH_SECONDS.labels(collection.name, mode).observe(latency)
+        MONGO_DOCS.labels(collection.name, "inserted").inc(inserted)
+        MONGO_DOCS.labels(collection.name, "duplicate").inc(duplicates)
+        if failed:
+            MONGO_DOCS.labels(collection.name, "failed").inc(failed)
+        self.logger.info(
+            f"✅ Batch {batch_no}/{total_batches} → Inserted {inserted}/{len(chunk)} (Skipped {duplicates} dups) "
+            f"in {latency * 1000:.0f} ms | in-flight limit {self.limiter.limit} → {label}"
+        )
+
+    async def write(self, collection, docs, label=None, mode="insert", build_ops=None, on_stored=None) -> WriteStats:
+        label = label or collection.name
+        stats = WriteStats(total=len(docs))
+        if not docs:
+            return stats
+        collection = collection.with_options(write_concern=self.write_concern)
+        total_batches = (len(docs) + self.batch_size - 1) // self.batch_size
+
+        tasks = []
+        for batch_no, i in enumerate(range(0, len(docs), self.batch_size), start=1):
+            await self.limiter.acquire()  # backpressure: wait for a free in-flight slot
+            tasks.append(asyncio.create_task(self._write_batch(
+                collection, docs[i:i + self.batch_size], mode, build_ops, on_stored, stats, batch_no, total_batches, label
+            )))
+        await asyncio.gather(*tasks)
+
+        self.logger.info(
+            f"📦 Done → Inserted {stats.inserted}/{stats.total} (Skipped {stats.duplicates} duplicates, "
+            f"{stats.failed_docs} failed docs, {stats.failed_batches} failed batches, max batch {stats.max_batch_latency_sec * 1000:.0f} ms) → {label}"
+        )
+        return stats
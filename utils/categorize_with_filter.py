@@ -1,42 +1,126 @@
-import re
+import json
+import time
 import pandas as pd
-from datetime import datetime
 from core.base import Base
 from config.constants import CATEGORY_MAP, LEN_PANDAS_MIN_DOCS
+from utils.category_engine import CategoryEngine
+from utils.date_parser import normalize_tradedate, normalize_tradedate_series, range_filter
+from core.metrics import CATEGORIZE_SECONDS, RECORDS
+
+_ENGINES = {}
+
+
+def engine_for(category_map: dict) -> CategoryEngine:
+    """One compiled engine per distinct CATEGORY_MAP per process (pool workers build theirs once)."""
+    key = json.dumps(category_map, sort_keys=True)
+    if key not in _ENGINES:
+        _ENGINES[key] = CategoryEngine(category_map)
+    return _ENGINES[key]
+
+
+def categorize_chunk_pandas(docs: list, existing_ids: set, companies: dict, category_map: dict) -> list:
+    """
+    Pure pandas categorization of one chunk (module level so a process pool can run it).
+    companies: bsecode -> {"company", "symbolmap"} for the scrips in this chunk.
+    """
+    df = pd.json_normalize(docs)
+    if df.empty:
+        return []
+
+    df["AttachmentName"] = df["AttachmentName"].astype(str).str.strip()
+    df.query('AttachmentName.str.endswith(".pdf")', inplace=True)
+
+    df["news_id"] = df["AttachmentName"].str[:-4]
+    df["SCRIP_CD"] = df["SCRIP_CD"].astype(str).str.strip()
+    valid_scrips = companies.keys()
+    df.query("SCRIP_CD in @valid_scrips", inplace=True)
+    df.drop_duplicates(subset="news_id", inplace=True)
+
+    if existing_ids:
+        df = df[~df["news_id"].isin(existing_ids)]
+    if df.empty:
+        return []
+
+    company_df = (
+        pd.DataFrame.from_dict(companies, orient="index")
+        .reindex(columns=["company", "symbolmap"])
+        .rename_axis("SCRIP_CD")
+        .reset_index()
+    )
+    df = df.merge(company_df, on="SCRIP_CD", how="left")
+
+    # same field handling as the for-loop path: strip strings, never lowercase stored text
+    for col in df.select_dtypes(include=["object", "string"]).columns:
+        df[col] = df[col].map(lambda v: v.strip() if isinstance(v, str) else v)
+    if "NewsBody" in df:
+        df["NewsBody"] = df["NewsBody"].fillna("")
+
+    df["Tradedate"] = normalize_tradedate_series(df["Tradedate"])
+    df.dropna(subset=["Tradedate"], inplace=True)
+
+    df["category"] = engine_for(category_map).categorize_many(
+        df["Descriptor"].tolist() if "Descriptor" in df else [None] * len(df),
+        df["HeadLine"].tolist() if "HeadLine" in df else [None] * len(df),
+        df["NewsBody"].tolist() if "NewsBody" in df else [None] * len(df),
+    )
+    return df.to_dict("records")
 
 
 class FilterCategorize(Base):
     def __init__(self):
         super().__init__(name="categorize_with_filter", save_time_logs=True)
 
-        self.company_dict = self.fetch_load_symbolmap()
-        if not self.company_dict:
+        self.company_master = self.fetch_load_symbolmap()
+        if not len(self.company_master):
             self.logger.error("❌ Company symbol map not loaded.")
         self.category_map = CATEGORY_MAP
         self.compile_category_rules()
         self.min_len_doc_for_df = LEN_PANDAS_MIN_DOCS
+        self.last_deduped = 0  # records the last helper skipped as already stored / repeated
         self.logger.info(
-            f"✅ Initialized Formator | symbolmap: {len(self.company_dict) if self.company_dict else 0}"
+            f"✅ Initialized Formator | symbolmap: {len(self.company_master)}"
         )
 
-    async def fetch_existing_news_ids(self, trade_date: str) -> list:
+    @property
+    def company_dict(self) -> dict:
+        """bsecode -> {"company", "symbolmap"}; always the latest refresh of the shared master."""
+        return self.company_master.by_bse
+
+    async def fetch_existing_news_ids(self, trade_date: str, until: str = None) -> list:
         cursor = self.collection_all_ann.find(
-            {"Tradedate": {"$gte": trade_date}},
+            range_filter("Tradedate", gte=trade_date, lt=until),
             {"_id": 0, "news_id": 1}
         ).sort("Tradedate", -1)
         news_ids = {doc["news_id"] async for doc in cursor if doc.get("news_id")}
         return list(news_ids)
 
+    @staticmethod
+    def candidate_news_ids(docs) -> set:
+        ids = set()
+        for rec in docs:
+            attach = str(rec.get("AttachmentName", "")).strip()
+            if attach.endswith(".pdf"):
+                ids.add(attach[:-4])
+        return ids
+
+    async def lookup_existing_news_ids(self, docs, tradedate: str, until: str = None) -> list:
+        """Resident cache + $in lookup of the misses; falls back to the range scan while the cache is cold."""
+        cache = self.news_id_cache
+        if cache.needs_reconcile():
+            try:
+                await cache.seed(self.collection_all_ann, logger=self.logger)
+            except Exception as e:
+                self.logger.error(f"⚠️ news_id cache reconcile failed: {e}")
+        if not cache.is_seeded:
+            return await self.fetch_existing_news_ids(tradedate, until=until)
+        cache.evict()
+        return list(await cache.existing_ids(self.collection_all_ann, self.candidate_news_ids(docs)))
+
     # ---------------- REGEX PRECOMPILATION -------------------
     def compile_category_rules(self):
-        """Precompile regex patterns once for speed."""
-        self.compiled_rules = {}
-        for cat, rule in self.category_map.items():
-            self.compiled_rules[cat] = {
-                "HeadLine": re.compile(rule["HeadLine"], re.I) if rule.get("HeadLine") else None,
-                "NewsBody": re.compile(rule["NewsBody"], re.I) if rule.get("NewsBody") else None,
-            }
-        self.logger.info(f"🧠 Precompiled {len(self.compiled_rules)} category regex rules.")
+        """Compile CATEGORY_MAP once into the shared single-pass engine used by both helpers."""
+        self.engine = engine_for(self.category_map)
+        self.logger.info(f"🧠 Compiled {len(self.engine.categories)} category rules into one regex.")
 
     # ---------------- FOR LOOP HELPER ------------------------
     async def helper_forloop(self, docs, existing_news_ids=None):
@@ -45,6 +129,7 @@ class FilterCategorize(Base):
 
         filtered = []
         existing_ids = set(existing_news_ids)
+        deduped = 0
 
         for rec in docs:
             try:
@@ -54,10 +139,11 @@ class FilterCategorize(Base):
 
                 news_id = attach[:-4]
                 if news_id in existing_ids:
+                    deduped += 1
                     continue
 
                 bse_cd = str(rec.get("SCRIP_CD", "")).strip()
-                info = self.company_dict.get(bse_cd)
+                info = self.company_master.get(bse_cd)
                 if not info:
                     continue
 
@@ -69,29 +155,12 @@ class FilterCategorize(Base):
                     if isinstance(v, str):
                         rec[k] = v.strip()
 
-                try:
-                    rec["Tradedate"] = datetime.strptime(
-                        rec["Tradedate"], "%d/%m/%Y %H:%M:%S"
-                    ).strftime("%Y-%m-%d %H:%M:%S")
-                except Exception:
+                tradedate = normalize_tradedate(rec["Tradedate"]) if isinstance(rec.get("Tradedate"), str) else None
+                if tradedate is None:
                     continue
+                rec["Tradedate"] = tradedate
 
-                desc = str(rec.get("Descriptor", "")).strip()
-                head = str(rec.get("HeadLine", "")).lower()
-                body = str(rec.get("NewsBody", "")).lower()
-
-                if desc in self.category_map:
-                    rec["category"] = desc
-                else:
-                    rec["category"] = next(
-                        (
-                            cat
-                            for cat, rule in self.compiled_rules.items()
-                            if (rule["HeadLine"] and rule["HeadLine"].search(head))
-                            or (rule["NewsBody"] and rule["NewsBody"].search(body))
-                        ),
-                        "General",
-                    )
+                rec["category"] = self.engine.categorize(rec.get("Descriptor"), rec.get("HeadLine"), rec.get("NewsBody"))
 
                 filtered.append(rec)
                 existing_ids.add(news_id)
@@ -99,89 +168,59 @@ class FilterCategorize(Base):
             except Exception as e:
                 self.logger.error(f"⚠️ Error processing record {rec.get('news_id', '?')}: {e}")
 
+        self.last_deduped = deduped
         self.logger.info(f"✅ Processed {len(filtered)} new records (FOR-LOOP)")
         return filtered, list(existing_ids)
 
     # ---------------- PANDAS HELPER --------------------------
     async def helper_pandas(self, docs, existing_news_ids=None):
-        if existing_news_ids is None:
-            existing_news_ids = []
+        """Chunks run through categorize_chunk_pandas on the CPU offloader, so the event loop stays free."""
+        self.last_deduped = 0
         if not docs:
             return []
+        existing_ids = set(existing_news_ids or [])
+        args = []
+        for chunk in self.offloader.chunks(docs):
+            scrips = {str(rec.get("SCRIP_CD", "")).strip() for rec in chunk}
+            companies = {code: info for code in scrips if (info := self.company_master.get(code))}
+            chunk_existing = existing_ids & self.candidate_news_ids(chunk) if existing_ids else set()
+            args.append((chunk, chunk_existing, companies, self.category_map))
+            self.last_deduped += len(chunk_existing)
+
+        results = await self.offloader.map(categorize_chunk_pandas, args)
+        if len(results) == 1:
+            records = results[0]
+        else:
+            # chunks only dedupe within themselves; first occurrence wins like drop_duplicates
+            seen, records = set(), []
+            for rec in (r for chunk_records in results for r in chunk_records):
+                if rec["news_id"] not in seen:
+                    seen.add(rec["news_id"])
+                    records.append(rec)
+                else:
+                    self.last_deduped += 1
 
-        df = pd.json_normalize(docs)
-        if df.empty:
-            return []
-
-        valid_scrips = set(self.company_dict.keys())
-        df["AttachmentName"] = df["AttachmentName"].astype(str).str.strip()
-        df.query('AttachmentName.str.endswith(".pdf")', inplace=True)
-
-        df["news_id"] = df["AttachmentName"].str[:-4]
-        df["SCRIP_CD"] = df["SCRIP_CD"].astype(str).str.strip()
-        df.query("SCRIP_CD in @valid_scrips", inplace=True)
-        df.drop_duplicates(subset="news_id", inplace=True)
-
-        if existing_news_ids:
-            existing_ids = set(existing_news_ids)
-            df = df[~df["news_id"].isin(existing_ids)]
-        if df.empty:
-            return []
-
-        company_df = (
-            pd.DataFrame.from_dict(self.company_dict, orient="index")
-            .reindex(columns=["company", "symbolmap"])
-            .rename_axis("SCRIP_CD")
-            .reset_index()
-        )
-        df = df.merge(company_df, on="SCRIP_CD", how="left")
-
-        df["HeadLine"] = df["HeadLine"].astype(str).str.lower().str.strip()
-        df["NewsBody"] = df["NewsBody"].fillna("").astype(str).str.lower().str.strip()
-        df["Descriptor"] = df["Descriptor"].astype(str).str.strip()
-
-        df["Tradedate"] = pd.to_datetime(df["Tradedate"], errors="coerce", dayfirst=True)
-        df.dropna(subset=["Tradedate"], inplace=True)
-        df["Tradedate"] = df["Tradedate"].dt.strftime("%Y-%m-%d %H:%M:%S")
-
-        df["category"] = None
-        df.loc[df["Descriptor"].isin(self.category_map.keys()), "category"] = df["Descriptor"]
-
-        # ✅ FIXED MASK LOGIC (no NoneType OR issue)
-        for cat, rule in self.compiled_rules.items():
-            mask = df["category"].isna()
-            conds = []
-
-            if rule["HeadLine"]:
-                conds.append(df["HeadLine"].str.contains(rule["HeadLine"].pattern, case=False, na=False))
-            if rule["NewsBody"]:
-                conds.append(df["NewsBody"].str.contains(rule["NewsBody"].pattern, case=False, na=False))
-
-            if not conds:
-                continue
-
-            combined_mask = conds[0]
-            for c in conds[1:]:
-                combined_mask |= c
-
-            df.loc[mask & combined_mask, "category"] = cat
-
-        # ✅ Future-proof: no inplace warning
-        df["category"] = df["category"].fillna("General")
-
-        self.logger.info(f"✅ Processed {len(df)} new records (PANDAS)")
-        return df.to_dict("records")
+        self.logger.info(f"✅ Processed {len(records)} new records (PANDAS, {len(results)} chunk(s), offload: {self.offloader.mode})")
+        return records
 
     # ---------------- MASTER SWITCH --------------------------
-    async def run_formator(self, docs, tradedate):
+    async def run_formator(self, docs, tradedate, until=None, fetch_type="live", dedup=True):
+        """dedup=False re-categorizes records that are already stored (replay)."""
         n = len(docs)
-        existing_news_ids = await self.fetch_existing_news_ids(tradedate)
+        existing_news_ids = await self.lookup_existing_news_ids(docs, tradedate, until=until) if dedup else []
 
+        started = time.perf_counter()
         if n < self.min_len_doc_for_df:
             self.logger.info(f"🌀 Processing {n} records using FOR-LOOP helper")
+            engine = "loop"
             all_docs, _ = await self.helper_forloop(docs, existing_news_ids)
         else:
             self.logger.info(f"🚀 Processing {n} records using PANDAS helper")
+            engine = "pandas"
             all_docs = await self.helper_pandas(docs, existing_news_ids)
 
+        CATEGORIZE_SECONDS.labels(engine).observe(time.perf_counter() - started)
+        RECORDS.labels(fetch_type, "deduped").inc(self.last_deduped)
+        RECORDS.labels(fetch_type, "filtered_out").inc(max(n - self.last_deduped - len(all_docs), 0))
+        RECORDS.labels(fetch_type, "categorized").inc(len(all_docs))
         return all_docs
@@ -0,0 +1,100 @@
+import re
+
+
+class CategoryEngine:
+    """
+    CATEGORY_MAP compiled into one case-insensitive alternation with a named group per
+    category (one per field). A single search finds the leftmost hit; only categories that
+    rank above that hit are re-checked individually, so CATEGORY_MAP order still decides
+    (first matching category wins) while records without any hit cost one C-level scan.
+    A Descriptor that is itself a category short-circuits. When no rule reads NewsBody, results
+    are memoized per HeadLine (BSE headlines are heavily templated); bodies almost never repeat,
+    so with NewsBody rules there is no memo and every record is matched directly.
+    """
+
+    MEMO_MAX = 20_000  # headlines only, so a few MB at most
+
+    def __init__(self, category_map: dict, default: str = "General"):
+        self.category_map = category_map
+        self.default = default
+        self._memo = {}
+        self.descriptors = frozenset(category_map)
+        self.categories = list(category_map)
+        self.rules = []  # per priority: (HeadLine regex | None, NewsBody regex | None)
+        head_alts, body_alts = [], []
+        for i, rule in enumerate(category_map.values()):
+            head, body = rule.get("HeadLine"), rule.get("NewsBody")
+            self.rules.append((re.compile(head, re.I) if head else None, re.compile(body, re.I) if body else None))
+            if head:
+                head_alts.append(f"(?P<c{i}>{head})")
+            if body:
+                body_alts.append(f"(?P<c{i}>{body})")
+        self.head_pattern = re.compile("|".join(head_alts), re.I) if head_alts else None
+        self.body_pattern = re.compile("|".join(body_alts), re.I) if body_alts else None
+        self.group_priority = {f"c{i}": i for i in range(len(self.categories))}
+        self.memoize = self.body_pattern is None
+
+    def _priority(self, headline: str, newsbody: str):
+        """Index of the first matching category, or None."""
+        best = None
+        if self.head_pattern is not None and headline:
+            m = self.head_pattern.search(headline)
+            if m:
+                best = self.group_priority[m.lastgroup]
+        if self.body_pattern is not None and newsbody:
+            m = self.body_pattern.search(newsbody)
+            if m:
+                p = self.group_priority[m.lastgroup]
+                best = p if best is None else min(best, p)
+        if not best:
+            return best  # None (no hit at all) or 0 (nothing can outrank it)
+        # a higher-priority rule may match further right than the leftmost hit
+        for i in range(best):
+            head_re, body_re = self.rules[i]
+            if (head_re and headline and head_re.search(headline)) or (body_re and newsbody and body_re.search(newsbody)):
+                return i
+        return best
+
+    def _category(self, headline: str, newsbody: str) -> str:
+        if not self.memoize:
+            p = self._priority(headline, newsbody)
+            return self.default if p is None else self.categories[p]
+        cat = self._memo.get(headline)
+        if cat is None:
+            p = self._priority(headline, newsbody)
+            cat = self.default if p is None else self.categories[p]
+            if len(self._memo) >= self.MEMO_MAX:
+                self._memo.clear()
+            self._memo[headline] = cat
+        return cat
+
+    # ------------------ PER RECORD ------------------
+    def categorize_text(self, headline, newsbody) -> str:
+        return self._category(
+            headline if isinstance(headline, str) else "",
+            newsbody if isinstance(newsbody, str) else "",
+        )
+
+    def categorize(self, descriptor, headline, newsbody) -> str:
+        desc = descriptor.strip() if isinstance(descriptor, str) else ""
+        if desc in self.descriptors:
+            return desc
+        return self.categorize_text(headline, newsbody)
+
+    # ------------------ BATCH ------------------
+    def categorize_many(self, descriptors, headlines, newsbodies) -> list:
+        """Same result as categorize() per row, without the per-call overhead; None/NaN count as empty."""
+        descs, category = self.descriptors, self._category
+        memo = self._memo if self.memoize else {}
+        out = []
+        append = out.append
+        for desc, head, body in zip(descriptors, headlines, newsbodies):
+            d = desc.strip() if isinstance(desc, str) else ""
+            if d in descs:
+                append(d)
+                continue
+            head = head if isinstance(head, str) else ""
+            body = body if isinstance(body, str) else ""
+            cat = memo.get(head)
+            append(cat if cat is not None else category(head, body))
+        return out
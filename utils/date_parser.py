@@ -0,0 +1,200 @@
+from datetime import datetime
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from config.constants import MONGO_NATIVE_DATETIMES
+
+# BSE sends Tradedate as "dd/mm/YYYY HH:MM:SS"; everything stored uses TRADEDATE_FORMAT
+BSE_TRADEDATE_FORMAT = "%d/%m/%Y %H:%M:%S"
+TRADEDATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+KNOWN_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y",
+    "%Y%m%d",
+    "%d-%m-%Y",
+    "%d-%m-%Y %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+)
+PARSE_CACHE_SIZE = 1 << 16
+SNIFF_SAMPLE = 20
+
+_FIELD_WIDTH = {"Y": 4, "m": 2, "d": 2, "H": 2, "M": 2, "S": 2}
+
+
+def _fixed_layout(fmt: str):
+    """Zero-padded shape of a strptime format: (length, {pos: separator}, {field: slice})."""
+    pos, seps, fields, i = 0, {}, {}, 0
+    while i < len(fmt):
+        if fmt[i] == "%":
+            width = _FIELD_WIDTH[fmt[i + 1]]
+            fields[fmt[i + 1]] = slice(pos, pos + width)
+            pos += width
+            i += 2
+        else:
+            seps[pos] = fmt[i]
+            pos += 1
+            i += 1
+    return pos, seps, fields
+
+
+_LAYOUTS = [_fixed_layout(fmt) for fmt in KNOWN_FORMATS]
+_BSE_LENGTH, _BSE_SEPS, _BSE_FIELDS = _fixed_layout(BSE_TRADEDATE_FORMAT)
+
+
+def _slice(value: str, length: int, seps: dict, fields: dict):
+    """Fixed-offset parse; None when the shape differs, ValueError when the shape fits but the date is invalid."""
+    if len(value) != length or not value.isascii() or any(value[p] != c for p, c in seps.items()):
+        return None
+    parts = {k: value[s] for k, s in fields.items()}
+    if not all(p.isdigit() for p in parts.values()):
+        return None
+    # datetime() validates ranges (31/02, hour 25, ...) exactly like strptime
+    return datetime(
+        int(parts["Y"]), int(parts["m"]), int(parts["d"]),
+        int(parts.get("H", 0)), int(parts.get("M", 0)), int(parts.get("S", 0)),
+    )
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_string(value: str):
+    # zero-padded values are recognised by shape; the strptime loop only runs for the odd ones
+    for layout in _LAYOUTS:
+        try:
+            parsed = _slice(value, *layout)
+        except ValueError:
+            break
+        if parsed is not None:
+            return parsed
+    for fmt in KNOWN_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_datetime(value):
+    """Any of KNOWN_FORMATS (or a datetime) -> datetime, None when unparseable. Repeated strings are memoized."""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    return _parse_string(str(value))
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def normalize_tradedate(value: str):
+    """BSE "dd/mm/YYYY HH:MM:SS" -> "YYYY-mm-dd HH:MM:SS", None when it is not in that layout."""
+    try:
+        if _slice(value, _BSE_LENGTH, _BSE_SEPS, _BSE_FIELDS) is not None:
+            return f"{value[6:10]}-{value[3:5]}-{value[0:2]} {value[11:19]}"
+        # non zero-padded variants strptime also accepts, e.g. "1/9/2025 9:05:00"
+        return datetime.strptime(value, BSE_TRADEDATE_FORMAT).strftime(TRADEDATE_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+def sniff_format(values, formats=KNOWN_FORMATS, sample: int = SNIFF_SAMPLE):
+    """Format that parses the most sampled non-empty values (ties go to the earlier format), None when none fit."""
+    picked = [v for v in values[:sample] if isinstance(v, str) and v]
+    best, best_hits = None, 0
+    for fmt in formats:
+        hits = 0
+        for v in picked:
+            try:
+                datetime.strptime(v, fmt)
+                hits += 1
+            except ValueError:
+                continue
+        if hits > best_hits:
+            best, best_hits = fmt, hits
+    return best
+
+
+# ------------------ VECTORIZED BSE LAYOUT ------------------
+_BSE_DIGITS = [0, 1, 3, 4, 6, 7, 8, 9, 11, 12, 14, 15, 17, 18]
+# output char i is input char _BSE_TO_TRADEDATE[i]; positions 4 and 7 are then set to "-"
+_BSE_TO_TRADEDATE = [6, 7, 8, 9, 2, 3, 4, 5, 0, 1, 10, 11, 12, 13, 14, 15, 16, 17, 18]
+_DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def _normalize_bse_block(values: list):
+    """
+    Fixed-offset slicing over a whole batch: strings are viewed as an (n, 20) code-point matrix,
+    validated column-wise and permuted into TRADEDATE_FORMAT. Returns (normalized, ok-mask).
+    """
+    chars = np.array(values, dtype="U20").view(np.uint32).reshape(len(values), 20)
+    digits = chars[:, _BSE_DIGITS].astype(np.int64) - ord("0")
+    ok = (chars[:, 18] != 0) & (chars[:, 19] == 0) & ((digits >= 0) & (digits <= 9)).all(axis=1)
+    for pos, sep in _BSE_SEPS.items():
+        ok &= chars[:, pos] == ord(sep)
+
+    day, month = digits[:, 0] * 10 + digits[:, 1], digits[:, 2] * 10 + digits[:, 3]
+    year = digits[:, 4] * 1000 + digits[:, 5] * 100 + digits[:, 6] * 10 + digits[:, 7]
+    hour, minute, second = digits[:, 8] * 10 + digits[:, 9], digits[:, 10] * 10 + digits[:, 11], digits[:, 12] * 10 + digits[:, 13]
+    leap = ((year % 4 == 0) & (year % 100 != 0)) | (year % 400 == 0)
+    month_days = _DAYS_IN_MONTH[np.clip(month, 0, 12)] + ((month == 2) & leap)
+    ok &= (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= month_days)
+    ok &= (hour <= 23) & (minute <= 59) & (second <= 59)
+
+    out = np.ascontiguousarray(chars[:, _BSE_TO_TRADEDATE])
+    out[:, 4] = out[:, 7] = ord("-")
+    return out.view("U19").ravel(), ok
+
+
+def normalize_tradedate_series(series: pd.Series) -> pd.Series:
+    """
+    Vectorized normalize_tradedate: same value per row (None where it returns None), object dtype.
+    A batch sniffed as the BSE layout goes through _normalize_bse_block; rows it cannot place
+    (non zero-padded, malformed) and batches in another layout use the memoized scalar parser.
+    """
+    values = series.tolist()
+    if not values:
+        return pd.Series([], index=series.index, dtype=object)
+    if sniff_format(values[:SNIFF_SAMPLE], formats=(BSE_TRADEDATE_FORMAT,)) is None:
+        return pd.Series([normalize_tradedate(v) if isinstance(v, str) else None for v in values], index=series.index, dtype=object)
+
+    is_str = [isinstance(v, str) for v in values]
+    normalized, ok = _normalize_bse_block([v if s else "" for v, s in zip(values, is_str)])
+    out = np.where(ok, normalized, None)
+    for i in np.flatnonzero(~ok):
+        if is_str[i]:
+            out[i] = normalize_tradedate(values[i])
+    return pd.Series(out, index=series.index, dtype=object)
+
+
+# ------------------ STORED REPRESENTATION ------------------
+def to_stored(value):
+    """Stored-format text or datetime -> what this process writes (datetime with MONGO_NATIVE_DATETIMES, text otherwise)."""
+    if isinstance(value, datetime):
+        return value if MONGO_NATIVE_DATETIMES else value.strftime(TRADEDATE_FORMAT)
+    if MONGO_NATIVE_DATETIMES and isinstance(value, str):
+        return parse_datetime(value)
+    return value
+
+
+def to_stored_many(values: list) -> list:
+    if not MONGO_NATIVE_DATETIMES and not any(isinstance(v, datetime) for v in values):
+        return values
+    return [to_stored(v) for v in values]
+
+
+def range_filter(field: str, gte=None, lt=None) -> dict:
+    """
+    Range on a Tradedate-like field that matches both representations while documents are migrated.
+    BSON only compares strings with strings and dates with dates, so each $or branch uses the index.
+    """
+    text, native = {}, {}
+    for op, bound in (("$gte", gte), ("$lt", lt)):
+        if bound is None:
+            continue
+        bound_dt = parse_datetime(bound)
+        if bound_dt is None:
+            raise ValueError(f"unparseable {field} bound: {bound!r}")
+        text[op] = bound_dt.strftime(TRADEDATE_FORMAT)
+        native[op] = bound_dt
+    if not text:
+        return {}
+    return {"$or": [{field: text}, {field: native}]}
@@ -0,0 +1,148 @@
+import os
+import mmap
+import heapq
+import hashlib
+from bisect import bisect_left
+from config.constants import JSON_INDEX_COMPACT_THRESHOLD
+
+
+class _SortedDigests:
+    """Read-only sequence view over a mmap of fixed-size sorted digests (for bisect)."""
+
+    def __init__(self, mm, record_size):
+        self.mm = mm
+        self.record_size = record_size
+        self.n = len(mm) // record_size if mm is not None else 0
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        start = i * self.record_size
+        return self.mm[start:start + self.record_size]
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield self[i]
+
+
+class NewsIdDigestIndex:
+    """
+    Persistent news_id dedup index for the JSONL archives.
+    <base>.idx      sorted 128-bit blake2b digests, memory-mapped and binary searched (O(1) load)
+    <base>.idx.log  append-only digests written since the last compaction, held in a set
+    A legacy plaintext <base>.index is migrated on first open and kept as <base>.index.migrated.
+    """
+
+    RECORD_SIZE = 16
+
+    def __init__(self, base_path: str, compact_threshold: int = JSON_INDEX_COMPACT_THRESHOLD):
+        self.sorted_path = base_path + ".idx"
+        self.log_path = base_path + ".idx.log"
+        self.legacy_path = base_path + ".index"
+        self.compact_threshold = compact_threshold
+        self._file = None
+        self._mm = None
+        self._sorted = _SortedDigests(None, self.RECORD_SIZE)
+        self._log = set()
+        self.open()
+
+    @classmethod
+    def digest(cls, news_id: str) -> bytes:
+        return hashlib.blake2b(news_id.encode("utf-8"), digest_size=cls.RECORD_SIZE).digest()
+
+    def __len__(self):
+        return len(self._sorted) + len(self._log)
+
+    # ------------------ OPEN / CLOSE ------------------
+    def open(self):
+        if os.path.exists(self.legacy_path) and not os.path.exists(self.sorted_path) and not os.path.exists(self.log_path):
+            self._migrate_legacy()
+        self._map_sorted()
+        self._log = set()
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "rb") as f:
+                raw = f.read()
+            usable = len(raw) - len(raw) % self.RECORD_SIZE  # ignore a torn trailing record
+            self._log = {raw[i:i + self.RECORD_SIZE] for i in range(0, usable, self.RECORD_SIZE)}
+
+    def _map_sorted(self):
+        self._unmap_sorted()
+        if os.path.exists(self.sorted_path) and os.path.getsize(self.sorted_path) >= self.RECORD_SIZE:
+            self._file = open(self.sorted_path, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._sorted = _SortedDigests(self._mm, self.RECORD_SIZE)
+
+    def _unmap_sorted(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        self._unmap_sorted()
+
+    def _migrate_legacy(self):
+        with open(self.legacy_path, "r", encoding="utf-8") as f:
+            digests = sorted({self.digest(line.strip()) for line in f if line.strip()})
+        self._write_sorted(digests)
+        os.replace(self.legacy_path, self.legacy_path + ".migrated")
+
+    def _write_sorted(self, digests):
+        tmp_path = self.sorted_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for d in digests:
+                f.write(d)
+        os.replace(tmp_path, self.sorted_path)
+
+    # ------------------ LOOKUP ------------------
+    def _contains_digest(self, d: bytes) -> bool:
+        if d in self._log:
+            return True
+        i = bisect_left(self._sorted, d)
+        return i < len(self._sorted) and self._sorted[i] == d
+
+    def __contains__(self, news_id: str) -> bool:
+        return self._contains_digest(self.digest(news_id))
+
+    def filter_new(self, news_ids) -> list:
+        """news_ids not yet indexed, in input order, without repeats."""
+        seen, new = set(), []
+        for nid in news_ids:
+            d = self.digest(nid)
+            if d in seen or self._contains_digest(d):
+                continue
+            seen.add(d)
+            new.append(nid)
+        return new
+
+    # ------------------ APPEND / COMPACT ------------------
+    def add(self, news_ids):
+        digests = [d for d in (self.digest(nid) for nid in news_ids) if not self._contains_digest(d)]
+        if not digests:
+            return
+        with open(self.log_path, "ab") as f:
+            f.write(b"".join(digests))
+        self._log.update(digests)
+        if len(self._log) >= self.compact_threshold:
+            self.compact()
+
+    def compact(self):
+        """Merge the log into the sorted file and truncate the log."""
+        if not self._log:
+            return
+        merged = heapq.merge(iter(self._sorted), sorted(self._log))
+        tmp_path = self.sorted_path + ".tmp"
+        last = None
+        with open(tmp_path, "wb") as f:
+            for d in merged:
+                if d != last:
+                    f.write(d)
+                    last = d
+        self._unmap_sorted()
+        os.replace(tmp_path, self.sorted_path)
+        open(self.log_path, "wb").close()
+        self._log = set()
+        self._map_sorted()
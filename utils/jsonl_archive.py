@@ -0,0 +1,274 @@
+import gzip
+import io
+import json
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from config.constants import ARCHIVE_COMPRESSION, ARCHIVE_COMPRESSION_LEVEL
+from utils.date_parser import normalize_tradedate, parse_datetime
+from utils.digest_index import NewsIdDigestIndex
+
+try:
+    import orjson
+except ImportError:  # optional: ~5x faster than json.dumps for these docs
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is used when zstandard is not installed
+    zstandard = None
+
+UNKNOWN_PARTITION = "unknown"
+EXTENSIONS = {"zstd": ".jsonl.zst", "gzip": ".jsonl.gz", "none": ".jsonl"}
+DEFAULT_LEVELS = {"zstd": 3, "gzip": 5, "none": None}
+
+
+def resolve_compression(compression: str = ARCHIVE_COMPRESSION) -> str:
+    if compression == "auto":
+        return "zstd" if zstandard is not None else "gzip"
+    if compression == "zstd" and zstandard is None:
+        raise ValueError("ARCHIVE_COMPRESSION='zstd' needs the zstandard package")
+    if compression not in EXTENSIONS:
+        raise ValueError(f"unknown archive compression {compression!r}, expected auto / zstd / gzip / none")
+    return compression
+
+
+def dumps_lines(docs: list) -> bytes:
+    """One JSON line per doc as a single buffer; non-JSON values (ObjectId, Timestamp) fall back to str."""
+    if orjson is not None:
+        option = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+        return b"".join(orjson.dumps(doc, default=str, option=option) for doc in docs)
+    return "".join(json.dumps(doc, ensure_ascii=False, default=str) + "\n" for doc in docs).encode("utf-8")
+
+
+def archive_key(doc: dict):
+    """news_id, or the AttachmentName stem for raw API records that have not been categorized yet."""
+    news_id = doc.get("news_id")
+    if news_id:
+        return str(news_id)
+    attach = str(doc.get("AttachmentName") or "").strip()
+    return os.path.splitext(attach)[0] or None
+
+
+def partition_of(doc: dict) -> str:
+    """YYYY-MM-DD of the doc's Tradedate (stored text, BSE "dd/mm/YYYY ..." or datetime)."""
+    value = doc.get("Tradedate")
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, str):
+        if len(value) >= 10 and value[4] == "-":
+            return value[:10]
+        normalized = normalize_tradedate(value)
+        if normalized:
+            return normalized[:10]
+        parsed = parse_datetime(value)
+        if parsed:
+            return parsed.strftime("%Y-%m-%d")
+    return UNKNOWN_PARTITION
+
+
+class DayPartitionedArchive:
+    """
+    Compressed JSONL archive of one stream, one file per Tradedate day:
+    <root>/<stream>/<YYYY-MM-DD>.jsonl.zst|.gz   concatenated frames / members, one per appended batch
+    <root>/<stream>/<YYYY-MM-DD>.manifest.json   records, bytes, members, Tradedate range, compression
+    <root>/<stream>.jsonl.idx(.log)               NewsIdDigestIndex, same path the flat archive used
+    Serialization, compression and file I/O run on one background thread per stream, in submit order.
+
+    The manifest's "bytes" is the commit point: a batch counts once its manifest is replaced, readers stop
+    at that size, and the next append truncates a tail left by a crash mid-batch. Ids reach the index
+    after the manifest, so a crash between the two archives those docs again (at-least-once).
+    """
+
+    def __init__(self, root, stream: str, compression: str = ARCHIVE_COMPRESSION, level: int = ARCHIVE_COMPRESSION_LEVEL):
+        self.root = str(root)
+        self.stream = stream
+        self.dir = os.path.join(self.root, stream)
+        self.compression = resolve_compression(compression)
+        self.level = DEFAULT_LEVELS[self.compression] if level is None else level
+        self.index = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"archive-{stream}")
+        self._pending = []
+
+    # ------------------ PATHS ------------------
+    def data_path(self, day: str, compression: str = None) -> str:
+        return os.path.join(self.dir, day + EXTENSIONS[compression or self.compression])
+
+    def manifest_path(self, day: str) -> str:
+        return os.path.join(self.dir, f"{day}.manifest.json")
+
+    # ------------------ WRITE (background thread) ------------------
+    def _open(self):
+        if self.index is None:
+            os.makedirs(self.dir, exist_ok=True)
+            # first open may migrate a legacy plaintext .index file
+            self.index = NewsIdDigestIndex(os.path.join(self.root, f"{self.stream}.jsonl"))
+
+    def _compress(self, raw: bytes, compression: str) -> bytes:
+        level = self.level if compression == self.compression else DEFAULT_LEVELS[compression]
+        if compression == "zstd":
+            return zstandard.ZstdCompressor(level=level).compress(raw)
+        if compression == "gzip":
+            return gzip.compress(raw, compresslevel=level)
+        return raw
+
+    def read_manifest(self, day: str) -> dict:
+        try:
+            with open(self.manifest_path(day), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_manifest(self, day: str, manifest: dict):
+        path = self.manifest_path(day)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp, path)
+
+    def _append_day(self, day: str, docs: list):
+        manifest = self.read_manifest(day) or {
+            "stream": self.stream, "partition": day, "format": "jsonl", "compression": self.compression,
+            "file": os.path.basename(self.data_path(day)), "records": 0, "members": 0, "bytes": 0, "raw_bytes": 0,
+            "first_tradedate": None, "last_tradedate": None,
+        }
+        # a partition keeps the codec it was started with, even if the setting changes later
+        compression = manifest["compression"]
+        raw = dumps_lines(docs)
+        blob = self._compress(raw, compression)
+        path = self.data_path(day, compression)
+        if os.path.exists(path) and os.path.getsize(path) > manifest["bytes"]:
+            os.truncate(path, manifest["bytes"])  # uncommitted bytes of a batch that crashed before its manifest
+        with open(path, "ab") as f:
+            f.write(blob)
+
+        dates = [str(d["Tradedate"]) for d in docs if d.get("Tradedate") is not None]
+        if dates:
+            first, last = min(dates), max(dates)
+            manifest["first_tradedate"] = min(filter(None, [manifest["first_tradedate"], first]))
+            manifest["last_tradedate"] = max(filter(None, [manifest["last_tradedate"], last]))
+        manifest["records"] += len(docs)
+        manifest["members"] += 1
+        manifest["bytes"] += len(blob)
+        manifest["raw_bytes"] += len(raw)
+        manifest["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        self._write_manifest(day, manifest)
+
+    def write(self, docs: list) -> int:
+        """Blocking: dedup against the index, append per-day batches, then record the ids. Returns docs written."""
+        self._open()
+        by_id = {}
+        for d in docs:
+            if isinstance(d, dict) and (key := archive_key(d)):
+                by_id.setdefault(key, d)
+        new_ids = self.index.filter_new(by_id)
+        if not new_ids:
+            return 0
+
+        by_day = {}
+        for key in new_ids:
+            doc = by_id[key]
+            by_day.setdefault(partition_of(doc), []).append(doc)
+        for day, day_docs in by_day.items():
+            self._append_day(day, day_docs)
+        self.index.add(new_ids)
+        return len(new_ids)
+
+    # ------------------ ASYNC SIDE ------------------
+    def submit(self, docs: list):
+        """Queue a batch on the stream's thread; returns a concurrent.futures.Future of the written count."""
+        # shallow copies: the categorizer and insert_many keep mutating the caller's dicts meanwhile
+        future = self._executor.submit(self.write, [dict(d) for d in docs if isinstance(d, dict)])
+        self._pending = [f for f in self._pending if not f.done()] + [future]
+        return future
+
+    @property
+    def pending(self) -> int:
+        self._pending = [f for f in self._pending if not f.done()]
+        return len(self._pending)
+
+    def close(self):
+        """Finish queued batches, then release the index."""
+        self._executor.shutdown(wait=True)
+        self._pending = []
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+
+    # ------------------ READ ------------------
+    def partitions(self, from_day: str = None, to_day: str = None) -> list:
+        """Archived days (YYYY-MM-DD), optionally limited to [from_day, to_day]."""
+        if not os.path.isdir(self.dir):
+            return []
+        days = sorted(name[: -len(".manifest.json")] for name in os.listdir(self.dir) if name.endswith(".manifest.json"))
+        return [d for d in days if (not from_day or d >= from_day) and (not to_day or d <= to_day)]
+
+    def partition_path(self, day: str):
+        manifest = self.read_manifest(day)
+        return self.data_path(day, manifest["compression"]) if manifest else None
+
+    def iter_partition(self, day: str, errors: list = None):
+        """Committed docs of one day, without touching any other partition."""
+        manifest = self.read_manifest(day)
+        if manifest:
+            yield from iter_records(self.data_path(day, manifest["compression"]), errors, limit=manifest["bytes"])
+
+
+# ------------------ FILE READERS ------------------
+class _BoundedReader(io.RawIOBase):
+    """First `limit` bytes of a binary file, so a torn tail past the manifest is never decompressed."""
+
+    def __init__(self, f, limit: int):
+        self.f = f
+        self.left = limit
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.left <= 0:
+            return 0
+        n = self.f.readinto(memoryview(buffer)[: self.left])
+        self.left -= n
+        return n
+
+
+def iter_lines(path: str, limit: int = None):
+    """
+    Raw lines of a .jsonl / .jsonl.gz / .jsonl.zst file, optionally only its first `limit` bytes.
+    Plain files are memory-mapped, so a multi-GB legacy archive is paged in by the OS instead of buffered by Python.
+    """
+    path = str(path)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size if limit is None else min(limit, os.fstat(f.fileno()).st_size)
+        if size == 0:
+            return
+        source = io.BufferedReader(_BoundedReader(f, size))
+        if path.endswith(".zst"):
+            if zstandard is None:
+                raise ValueError(f"{path} needs the zstandard package")
+            yield from io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(source, read_across_frames=True))
+            return
+        if path.endswith(".gz"):
+            yield from gzip.GzipFile(fileobj=source, mode="rb")
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            while (pos := mm.tell()) < size:
+                yield mm.readline()[: size - pos]
+
+
+def loads(line: bytes):
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+
+def iter_records(path: str, errors: list = None, limit: int = None):
+    """Parsed docs of an archive file; blank lines are skipped, undecodable ones counted in `errors` (if given)."""
+    for line in iter_lines(path, limit):
+        if not line.strip():
+            continue
+        try:
+            yield loads(line)
+        except ValueError:
+            if errors is not None:
+                errors.append(line[:200])
@@ -2,40 +2,151 @@ from datetime import datetime
 from core.base import Base
 import pandas as pd
 import asyncio
-from pymongo.errors import BulkWriteError
-from config.constants import ALLREPORTS_CATEGORY_MAP
+from pymongo import UpdateOne, ReturnDocument
+from config.constants import ALLREPORTS_CATEGORY_MAP, MONGO_WRITE_MODE, REPORT_COUNTERS_SEEDED_MARKER, MONGO_NATIVE_DATETIMES
+from utils.batch_writer import MongoBatchWriter
+from utils.date_parser import TRADEDATE_FORMAT, range_filter, to_stored, to_stored_many
+
+# calendar month -> quarter label used in report ids (FinYear is year - 1 for Q3/Q4)
+QTR_BY_MONTH = {1: "Q3", 2: "Q3", 3: "Q3", 4: "Q4", 5: "Q4", 6: "Q4", 7: "Q1", 8: "Q1", 9: "Q1", 10: "Q2", 11: "Q2", 12: "Q2"}
+
+
+# ---------------- REPORT FORMATTING (pure, runs on the CPU offloader) ----------------
+def prepare_report_frame(df: pd.DataFrame, short_cat: str) -> pd.DataFrame:
+    """Parse Tradedate, derive FinYear/Qtr/base_report_id and order rows for numbering."""
+    # Tradedate may be text or a native datetime (recheck reads while migrating); sort on the parsed value
+    dt_obj = pd.to_datetime(df["Tradedate"], format=TRADEDATE_FORMAT, errors="coerce")
+    order = dt_obj.sort_values(kind="stable").index
+    df, dt_obj = df.loc[order], dt_obj.loc[order]
+    year = dt_obj.dt.year
+    qtr = dt_obj.dt.month.map(QTR_BY_MONTH)
+    fin_year = year - qtr.isin(["Q3", "Q4"]).astype(int)
+
+    base_report_id = df["company"] + "_" + short_cat + "_FY" + year.astype(str) + qtr.astype(str)
+    df = df.assign(dt_obj=dt_obj, Qtr=qtr, FinYear=fin_year, base_report_id=base_report_id)
+    df = df[df["base_report_id"].notna()]
+
+    # groups keep first-appearance order, rows inside a group ascend by dt_obj — one stable sort
+    df = df.assign(group_no=df.groupby("base_report_id", sort=False).ngroup())
+    return df.sort_values(by=["group_no", "dt_obj"], kind="stable", ignore_index=True)
+
+
+def build_report_docs(df: pd.DataFrame, category: str, existing_report_id_mapping: dict, document_date: str) -> list:
+    """Number rows after the existing/reserved count per base_report_id and build AllReports docs."""
+    start_count = df["base_report_id"].map(existing_report_id_mapping).fillna(0).astype(int)
+    df["count"] = start_count + df.groupby("group_no").cumcount() + 1
+    df["report_id"] = df["base_report_id"] + "_" + df["count"].astype(str)
+    ymd = df["dt_obj"].dt.year * 10000 + df["dt_obj"].dt.month * 100 + df["dt_obj"].dt.day
+    df["datecode"] = ymd.astype("Int64").astype(str).where(ymd.notna())  # == strftime("%Y%m%d"), NaN for NaT
+
+    n = len(df)
+
+    def column(name):
+        return df[name].tolist() if name in df else [None] * n
+
+    # column lists zipped straight into records; DataFrame.to_dict boxes every cell and dominated this step
+    columns = {
+        "company": column("company"),
+        "symbolmap": column("symbolmap"),
+        "news_id": column("news_id"),
+        "datecode": column("datecode"),
+        "Year": column("FinYear"),
+        "Qtr": column("Qtr"),
+        "dt_tm": to_stored_many(column("Tradedate")),
+        "url": column("ATTACHMENTURL"),
+        "report_id": column("report_id"),
+        "report_type": [category] * n,
+        "report_line": column("NewsBody"),
+        "count": column("count"),
+        "document_date": [document_date] * n,
+    }
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
 
 class ReportsDivider(Base):
     def __init__(self):
         super().__init__(name="bse_reports_divider", save_time_logs=True)
         self.logger.info("✅ Initialized ReportsDivider")
-        self.mongodb_insert_batch = 1000
+        self.write_mode = MONGO_WRITE_MODE
+        self.writer = MongoBatchWriter(self.logger)
+        self.report_counters_ready = False
+        self.upsert_keys = {self.collection_all_ann.name: "news_id", self.collection_all_reports.name: "report_id"}
+
+    def build_upsert_ops(self, collection, chunk) -> list:
+        key = self.upsert_keys.get(collection.name, "news_id")
+        return [
+            UpdateOne({key: doc[key]}, {"$set": {k: v for k, v in doc.items() if k != "_id"}}, upsert=True)
+            for doc in chunk
+        ]
 
-    async def insert_in_batches(self, collection, docs, category=None):
+    async def insert_in_batches(self, collection, docs, category=None, mode=None):
         if not docs:
             self.logger.info(f"⚠️ No docs to insert for {category or collection.name}")
-            return
-        batch_size = self.mongodb_insert_batch
-        total = len(docs)
-        total_batches = (total + batch_size - 1) // batch_size
-        inserted = 0
-        duplicates = 0
-        for i in range(0, total, batch_size):
-            chunk = docs[i:i + batch_size]
-            try:
-                res = await collection.insert_many(chunk, ordered=False)
-                inserted += len(res.inserted_ids)
-            except BulkWriteError as e:
-                write_errors = e.details.get("writeErrors", [])
-                duplicates += sum(1 for err in write_errors if err.get("code") == 11000)
-                inserted += e.details.get("nInserted", 0)
-            except Exception:
-                self.logger.warning(f"⚠️ Batch {i//batch_size + 1}/{total_batches} → {category or collection.name}: Exception")
-                continue
-            self.logger.info(f"✅ Batch {i//batch_size + 1}/{total_batches} → Inserted {inserted}/{total} (Skipped {duplicates} dups) → {category or collection.name}")
-            await asyncio.sleep(0.5)
-        self.logger.info(f"📦 Done → Inserted {inserted}/{total} (Skipped {duplicates} duplicates) → {category or collection.name}")
-        
+            return True
+        track_news_ids = collection.name == self.collection_all_ann.name
+        stats = await self.writer.write(
+            collection,
+            docs,
+            label=category or collection.name,
+            mode=mode or self.write_mode,
+            build_ops=lambda chunk: self.build_upsert_ops(collection, chunk),
+            on_stored=self.news_id_cache.add_docs if track_news_ids else None,
+        )
+        return stats.ok
+
+    # ---------------- REPORT ID COUNTERS ----------------
+    @staticmethod
+    async def max_report_sequences(collection_reports) -> dict:
+        """base_report_id -> highest _N suffix used in an AllReports collection."""
+        max_seq = {}
+        async for d in collection_reports.find({"report_id": {"$type": "string"}}, {"_id": 0, "report_id": 1}):
+            prefix, _, suffix = d["report_id"].rpartition("_")
+            if prefix and suffix.isdigit():
+                max_seq[prefix] = max(max_seq.get(prefix, 0), int(suffix))
+        return max_seq
+
+    @staticmethod
+    async def raise_report_counters(collection_counters, max_seq: dict, batch_size: int = 1000) -> int:
+        """Move counters up to at least max_seq (never down); returns the number of counters touched."""
+        ops = [UpdateOne({"_id": prefix}, {"$max": {"seq": seq}}, upsert=True) for prefix, seq in max_seq.items()]
+        for i in range(0, len(ops), batch_size):
+            await collection_counters.bulk_write(ops[i:i + batch_size], ordered=False)
+        return len(ops)
+
+    async def seed_report_counters(self, batch_size: int = 1000):
+        """One-time migration: counters start at the highest _N suffix already used per base_report_id."""
+        try:
+            marker = await self.collection_metadata_updates.find_one({"_id": REPORT_COUNTERS_SEEDED_MARKER})
+            if marker:
+                self.report_counters_ready = True
+                return
+            self.logger.info("🔢 Seeding report_id counters from existing AllReports...")
+            max_seq = await self.max_report_sequences(self.collection_all_reports)
+            seeded = await self.raise_report_counters(self.collection_report_counters, max_seq, batch_size)
+            await self.collection_metadata_updates.update_one(
+                {"_id": REPORT_COUNTERS_SEEDED_MARKER},
+                {"$set": {"seeded_at": datetime.now(), "counters": seeded}},
+                upsert=True,
+            )
+            self.report_counters_ready = True
+            self.logger.info(f"✅ Seeded {seeded} report_id counters")
+        except Exception as e:
+            self.logger.error(f"❌ report_id counter seeding failed, falling back to scanning report_ids: {e}")
+
+    async def reserve_report_sequences(self, counts: dict) -> dict:
+        """Atomically reserve a block of `n` numbers per base_report_id; returns the number just before each block."""
+        async def _reserve(base_id, n):
+            doc = await self.collection_report_counters.find_one_and_update(
+                {"_id": base_id},
+                {"$inc": {"seq": n}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return base_id, doc["seq"] - n
+
+        return dict(await asyncio.gather(*(_reserve(base_id, int(n)) for base_id, n in counts.items())))
+
     def build_existing_counts_map(self, category_existing_report_ids: list) -> dict:
         counts_map = {}
         for rid in category_existing_report_ids:
@@ -47,95 +158,103 @@ class ReportsDivider(Base):
         return counts_map
 
 
-    async def format_category_docs(self, df: pd.DataFrame, category: str, short_cat: str, existing_report_id_mapping: dict) -> list:
+    async def format_category_docs(self, df: pd.DataFrame, category: str, short_cat: str, existing_report_id_mapping: dict = None):
+        """
+        existing_report_id_mapping: base_report_id -> numbers already used; None reserves blocks from the counters.
+        Returns None on failure (including a failed reservation) so the caller can mark the batch as not stored.
+        """
         try:
-            df = df.sort_values(by="Tradedate", ascending=True)
-            df["dt_obj"] = pd.to_datetime(df["Tradedate"], errors="coerce")
-            df["month"] = df["dt_obj"].dt.month
-            df["year"] = df["dt_obj"].dt.year
-            df["Qtr"] = pd.cut(
-                df["month"],
-                bins=[0, 3, 6, 9, 12],
-                labels=["Q3", "Q4", "Q1", "Q2"],
-                include_lowest=True
-            )
-            df["FinYear"] = df.apply(lambda x: x["year"] - 1 if x["Qtr"] in ["Q3", "Q4"] else x["year"], axis=1)
-
-            df["base_report_id"] = (df["company"] + "_" + short_cat + "_FY" + df["year"].astype(str) + df["Qtr"].astype(str))
-            final_rows = []
-            for base_id, group in df.groupby("base_report_id", sort=False):
-                start_count = existing_report_id_mapping.get(base_id, 0)
-                group = group.sort_values(by="dt_obj", ascending=True).reset_index(drop=True)
-                group["count"] = range(start_count + 1, start_count + 1 + len(group))
-                group["report_id"] = group["base_report_id"] + "_" + group["count"].astype(str)
-                final_rows.append(group)
-
-            df = pd.concat(final_rows, ignore_index=True)
-            df["datecode"] = df["dt_obj"].dt.strftime("%Y%m%d")
-
-            structured_df = pd.DataFrame({
-                "company": df["company"],
-                "symbolmap": df.get("symbolmap"),
-                "news_id": df.get("news_id"),
-                "datecode": df["datecode"],
-                "Year": df["FinYear"],
-                "Qtr": df["Qtr"],
-                "dt_tm": df["Tradedate"],
-                "url": df.get("ATTACHMENTURL"),
-                "report_id": df["report_id"],
-                "report_type": category,
-                "report_line": df.get("NewsBody"),
-                "count": df["count"],
-                "document_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            })
-            return structured_df.to_dict(orient="records")
+            df = await self.offloader.run(prepare_report_frame, df, short_cat)
+            if existing_report_id_mapping is None:
+                existing_report_id_mapping = await self.reserve_report_sequences(df["base_report_id"].value_counts().to_dict())
+            document_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            return await self.offloader.run(build_report_docs, df, category, existing_report_id_mapping, document_date)
 
         except Exception as e:
             self.logger.error(f"❌ format_category_docs error for {category}: {e}")
-            return []
-        
+            return None
 
-    async def get_category_existing_report_ids(self, category: str, trade_date: str) -> list:
-        if datetime.strptime(trade_date, "%Y-%m-%d %H:%M:%S").date() >= datetime.now().date():
-            ids = await self.collection_all_reports.distinct(
-                "report_id", {"report_type": category, "dt_tm": {"$gte": trade_date}}
-            )
-        else:
-            ids = {
-                d["report_id"] async for d in self.collection_all_reports.find(
-                    {"dt_tm": {"$gte": trade_date}},
-                    {"_id": 0, "report_id": 1}
-                ).sort("dt_tm", -1)
-                if d.get("report_id")
-            }
-        return list(ids)
+    async def get_existing_reports_by_category(self, news_ids: list, trade_date: str, with_report_ids: bool = True,
+                                               chunk_size: int = 5000) -> dict:
+        """
+        report_type -> {"news_ids": set, "report_ids": list} for every ALLREPORTS category.
+        news_ids only covers the batch's own ids; report_ids (counter fallback) every report since trade_date.
+        Plain projected finds streamed into sets: a $group/$addToSet per category would hit the 16 MB document limit.
+        """
+        existing = {category: {"news_ids": set(), "report_ids": []} for category in ALLREPORTS_CATEGORY_MAP}
+        categories = {"$in": list(ALLREPORTS_CATEGORY_MAP)}
+        news_ids = [nid for nid in dict.fromkeys(news_ids) if nid]
+        for i in range(0, len(news_ids), chunk_size):
+            query = {"report_type": categories, "news_id": {"$in": news_ids[i:i + chunk_size]}}
+            async for d in self.collection_all_reports.find(query, {"_id": 0, "report_type": 1, "news_id": 1}):
+                existing[d["report_type"]]["news_ids"].add(d["news_id"])
+        if with_report_ids:
+            query = {"report_type": categories, **range_filter("dt_tm", gte=trade_date)}
+            async for d in self.collection_all_reports.find(query, {"_id": 0, "report_type": 1, "report_id": 1}):
+                if d.get("report_id"):
+                    existing[d["report_type"]]["report_ids"].append(d["report_id"])
+        return existing
+
+    async def reconcile_reports(self, docs: list, chunk_size: int = 5000) -> int:
+        """
+        Replay: drop AllReports rows whose announcement now has another category (or none that maps to a report),
+        so all_reports_runner numbers them again under the new report_type. Returns the rows removed.
+        """
+        category_by_id = {d["news_id"]: d.get("category") for d in docs if d.get("news_id")}
+        news_ids = list(category_by_id)
+        stale = []
+        for i in range(0, len(news_ids), chunk_size):
+            query = {"news_id": {"$in": news_ids[i:i + chunk_size]}}
+            async for d in self.collection_all_reports.find(query, {"_id": 0, "news_id": 1, "report_type": 1}):
+                if d.get("report_type") != category_by_id.get(d["news_id"]):
+                    stale.append(d["news_id"])
+        for i in range(0, len(stale), chunk_size):
+            await self.collection_all_reports.delete_many({"news_id": {"$in": stale[i:i + chunk_size]}})
+        if stale:
+            self.logger.info(f"♻️ Removed {len(stale)} reports whose announcement changed category")
+        return len(stale)
 
     async def all_reports_runner(self, docs, tradedate):
         if not docs:
-            return
+            return True
+        ok = True
         df = pd.DataFrame(docs)
+        # counters already know the next number per base_report_id, so report_ids are only pulled for the fallback
+        existing = await self.get_existing_reports_by_category(
+            df["news_id"].tolist(), tradedate, with_report_ids=not self.report_counters_ready
+        )
+        pending = []
         for category, short_cat in ALLREPORTS_CATEGORY_MAP.items():
-            category_existing_report_ids = await self.get_category_existing_report_ids(category, tradedate)
+            category_existing = existing[category]
+            # only rows that will actually be inserted reserve report_id numbers
             df_filtered = df[
                 (df["category"] == category)
-                & (~df["news_id"].isin(category_existing_report_ids))
-            ]
+                & (~df["news_id"].isin(category_existing["news_ids"]))
+            ].drop_duplicates(subset="news_id")
             if df_filtered.empty:
                 continue
-            existing_report_id_mapping = self.build_existing_counts_map(category_existing_report_ids)
-            structured_docs = await self.format_category_docs(df_filtered, category, short_cat, existing_report_id_mapping)
+            existing_report_id_mapping = None if self.report_counters_ready else self.build_existing_counts_map(category_existing["report_ids"])
+            pending.append((category, self.format_category_docs(df_filtered, category, short_cat, existing_report_id_mapping)))
+
+        # categories are formatted side by side on the offloader, then written one after another
+        formatted = await asyncio.gather(*(coro for _, coro in pending))
+        for (category, _), structured_docs in zip(pending, formatted):
+            if structured_docs is None:
+                ok = False  # nothing stored for this category: keep the cycle / hist day retryable
+                continue
             if structured_docs:
-                await self.insert_in_batches(
+                ok &= await self.insert_in_batches(
                     collection=self.collection_all_reports,
                     docs=structured_docs,
                     category=category,
                 )
+        return ok
 
     async def divide_and_insert_docs(self, docs, tradedate):
         try:
             if not docs:
                 self.logger.info("No docs found for reports_divider")
-                return
+                return True
             
             df = pd.DataFrame(docs)
             all_category_is_general = False
@@ -144,11 +263,16 @@ class ReportsDivider(Base):
                 all_category_is_general = True
             
             annoucement_docs = df.to_dict(orient="records")
-            await self.insert_in_batches(collection=self.collection_all_ann, docs=annoucement_docs)
+            if MONGO_NATIVE_DATETIMES:
+                for doc in annoucement_docs:
+                    doc["Tradedate"] = to_stored(doc.get("Tradedate"))
+            ok = await self.insert_in_batches(collection=self.collection_all_ann, docs=annoucement_docs)
             if not all_category_is_general:
-                await self.all_reports_runner(docs=annoucement_docs, tradedate=tradedate)
+                ok &= await self.all_reports_runner(docs=annoucement_docs, tradedate=tradedate)
+            return ok
 
         except Exception as e:
             self.logger.error(f"❌ process_and_distribute_reports_df failed: {e}")
+            return False
 
 